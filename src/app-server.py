@@ -2,14 +2,21 @@
 Flask Server for TARS-AI Application.
 This script provides a Flask-based API server to handle image captioning
 and audio transcription tasks using whisper models.
+
+Audio can be uploaded as a finished file (/save_audio) or streamed as raw 16 kHz
+int16 PCM in a chunked request while the user is speaking (/stream_audio), in
+which case it is transcribed as it arrives. Uploaded files can be WAV, FLAC or
+Ogg Opus (decoded with PyAV), images any format Pillow reads.
 """
 
 from flask import Flask, request, jsonify
 from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
 import torch
+import time
 import traceback
-from faster_whisper import WhisperModel
+import numpy as np
+from faster_whisper import WhisperModel, decode_audio
 from flask_cors import CORS
 from io import BytesIO
 from datetime import datetime
@@ -84,6 +91,67 @@ blip_processor = None
 blip_model = None
 whisper_model = None
 
+# Streaming transcription
+STREAM_SAMPLE_RATE = 16000  # Whisper's input rate; streamed PCM must already be at this rate
+STREAM_READ_BYTES = 3200    # 100 ms of int16 samples per read from the request body
+STREAM_STEP = 1.0           # Seconds of new audio between incremental passes
+STREAM_COMMIT_MARGIN = 1.0  # Segments ending at least this long before the end of the audio are final
+
+class StreamingTranscriber:
+    """
+    Transcribes an utterance while it is still arriving.
+
+    Every STREAM_STEP seconds of new audio, the part that is not final yet is transcribed
+    again. Segments that end well before the end of the audio received so far are final and
+    are not transcribed again, so when the stream ends only the remaining tail is left.
+    """
+    def __init__(self, model, sample_rate=STREAM_SAMPLE_RATE):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.partial = b""     # Odd trailing byte of the last chunk
+        self.committed = 0     # Samples covered by final segments
+        self.transcribed = 0   # Audio length at the last pass
+        self.step = STREAM_STEP
+        self.segments = []
+        self.passes = 0
+
+    def feed(self, data):
+        """Add a chunk of int16 PCM, transcribing once enough new audio has arrived."""
+        data = self.partial + data
+        usable = len(data) - len(data) % 2
+        self.partial = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+        self.audio = np.concatenate([self.audio, samples])
+        if len(self.audio) - self.transcribed >= self.step * self.sample_rate:
+            started = time.perf_counter()
+            self._transcribe(final=False)
+            # Back off when passes take longer than the audio arrives
+            self.step = max(STREAM_STEP, 2 * (time.perf_counter() - started))
+
+    def _transcribe(self, final):
+        """Transcribe the audio after the last final segment, committing the stable segments."""
+        self.transcribed = len(self.audio)
+        self.passes += 1
+        start = self.committed
+        tail = self.audio[start:]
+        offset = start / self.sample_rate
+        horizon = len(tail) / self.sample_rate - STREAM_COMMIT_MARGIN
+        prompt = " ".join(segment["text"].strip() for segment in self.segments) or None
+
+        segments, _ = self.model.transcribe(tail, beam_size=5, initial_prompt=prompt)
+        for segment in segments:  # Decoded lazily, so stopping early saves work
+            if not final and segment.end > horizon:
+                break
+            self.segments.append({"text": segment.text, "start": offset + segment.start, "end": offset + segment.end})
+            self.committed = start + int(segment.end * self.sample_rate)
+
+    def finish(self):
+        """Transcribe the remaining tail and return all segments."""
+        if len(self.audio) > self.committed:
+            self._transcribe(final=True)
+        return self.segments
+
 # Routes
 @app.route('/caption', methods=['POST'])
 def caption_image():
@@ -95,10 +163,12 @@ def caption_image():
         image_file = request.files['image']
         image_bytes = BytesIO(image_file.read())
         try:
-            image = Image.open(image_bytes)
-            image.verify()
+            Image.open(image_bytes).verify()
+            image_bytes.seek(0)
+            image = Image.open(image_bytes).convert('RGB')  # A verified image must be reopened
         except Exception:
             return jsonify({"error": "Invalid image file"}), 400
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Received {image_bytes.getbuffer().nbytes} bytes of {image_file.mimetype} image ({image.width}x{image.height})")
 
         inputs = blip_processor(image, return_tensors="pt").to(device)
         outputs = blip_model.generate(**inputs, max_new_tokens=100, num_beams=3)
@@ -121,7 +191,12 @@ def save_audio():
         audio_blob = request.files['audio']
         audio_bytes = BytesIO(audio_blob.read())
 
-        segments, _ = whisper_model.transcribe(audio_bytes, beam_size=5)
+        started = time.perf_counter()
+        audio = decode_audio(audio_bytes, sampling_rate=STREAM_SAMPLE_RATE)  # WAV, FLAC or Ogg Opus
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Received {audio_bytes.getbuffer().nbytes} bytes of {audio_blob.mimetype} audio "
+              f"({len(audio) / STREAM_SAMPLE_RATE:.1f}s, decoded in {(time.perf_counter() - started) * 1000:.0f}ms)")
+
+        segments, _ = whisper_model.transcribe(audio, beam_size=5)
 
         transcription = [
             {"text": segment.text, "start": segment.start, "end": segment.end}
@@ -135,6 +210,33 @@ def save_audio():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/stream_audio', methods=['POST'])
+def stream_audio():
+    """Endpoint to transcribe raw 16 kHz int16 PCM while it is being uploaded (chunked request)."""
+    try:
+        sample_rate = int(request.headers.get('X-Sample-Rate', STREAM_SAMPLE_RATE))
+        if sample_rate != STREAM_SAMPLE_RATE:
+            return jsonify({"error": f"Audio must be {STREAM_SAMPLE_RATE} Hz"}), 400
+
+        transcriber = StreamingTranscriber(whisper_model, sample_rate)
+        while True:
+            chunk = request.stream.read(STREAM_READ_BYTES)
+            if not chunk:
+                break
+            transcriber.feed(chunk)
+
+        started = time.perf_counter()
+        transcription = transcriber.finish()
+        final_ms = (time.perf_counter() - started) * 1000
+
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Transcription: {transcription} "
+              f"({len(transcriber.audio) / sample_rate:.1f}s streamed, {transcriber.passes} passes, final pass {final_ms:.0f}ms)")
+        return jsonify({"transcription": transcription})
+    except Exception as e:
+        print("Error occurred during streaming transcription:", traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
 if __name__ == '__main__':
     try:
         blip_processor, blip_model = initialize_blip_model()
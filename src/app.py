@@ -26,7 +26,8 @@ from module_memory import MemoryManager
 from module_stt import STTManager
 from module_tts import update_tts_settings
 from module_btcontroller import *
-from module_main import initialize_managers, wake_word_callback, utterance_callback, post_utterance_callback, start_bt_controller_thread
+from module_main import initialize_managers, wake_word_callback, utterance_callback, partial_callback, idle_callback, start_bt_controller_thread
+from module_tools import tool_registry
 
 # === Constants and Globals ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -68,7 +69,8 @@ if __name__ == "__main__":
     stt_manager = STTManager(config=CONFIG, shutdown_event=shutdown_event)
     stt_manager.set_wake_word_callback(wake_word_callback)
     stt_manager.set_utterance_callback(utterance_callback)
-    stt_manager.set_post_utterance_callback(post_utterance_callback)
+    stt_manager.set_partial_callback(partial_callback)
+    stt_manager.set_idle_callback(idle_callback)
 
     # Pass managers to main module
     initialize_managers(memory_manager, char_manager, stt_manager)
@@ -94,4 +96,11 @@ if __name__ == "__main__":
     finally:
         stt_manager.stop()
         bt_controller_thread.join()
+        for name, stats in tool_registry.stats().items():
+            if stats['calls']:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Tool {name}: {stats['calls']} calls, {stats['timeouts']} timeouts, {stats['errors']} errors, {stats['cache_hits']} reused, {stats['speculation_hits']}/{stats['speculative']} prefetches used, p50 {stats['p50_ms']}ms, p90 {stats['p90_ms']}ms")
+        tool_registry.shutdown()
+        for state, stats in stt_manager.state_stats().items():
+            if stats['entries']:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: State {state}: {stats['entries']} times, {stats['total_s']}s total, mean {stats['mean_ms']}ms, max {stats['max_ms']}ms")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: All threads and executor stopped gracefully.")
\ No newline at end of file
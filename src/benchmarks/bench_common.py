@@ -0,0 +1,199 @@
+"""
+bench_common.py
+
+Shared Helpers for the TARS-AI Benchmarks.
+
+- A null sound device: a stand-in sounddevice module that reads input from an AudioSource
+  and discards playback.
+- Stand-ins for the modules that start a browser, load a camera model or open the
+  Bluetooth controller at import time.
+- Machine information stored with benchmark results.
+"""
+
+# === Standard Libraries ===
+import os
+import time
+import types
+import platform
+import threading
+
+import numpy as np
+
+# === Constants ===
+SAMPLE_RATE = 16000  # STTManager.SAMPLE_RATE
+FAST_SILENCE = 20  # Speed-up of silence reads when not pacing in real time (the capture thread never stops reading)
+
+# === Null Sound Device ===
+class AudioSource:
+    """
+    Feeds utterance samples to the fake input stream and records playback on the null sink.
+    """
+    def __init__(self, realtime=True):
+        """
+        Initialize the AudioSource.
+
+        Parameters:
+        - realtime (bool): Pace reads like a real microphone instead of returning instantly.
+        """
+        self.realtime = realtime
+        self.lock = threading.Lock()
+        self.load(np.zeros(0, dtype=np.int16))
+
+    def load(self, samples: np.ndarray):
+        """
+        Queue an utterance. Reads past its end return silence, paced in real time (or FAST_SILENCE
+        times faster), as the capture thread reads continuously.
+
+        Parameters:
+        - samples (np.ndarray): 16 kHz mono int16 samples.
+        """
+        with self.lock:
+            self.samples = samples
+            self.position = 0
+            self.started = None
+            self.speech_end = None
+            self.first_audio = None
+
+    def read(self, frames: int):
+        """
+        Return the next block of samples, waiting for it to "arrive" when pacing in real time.
+        """
+        with self.lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+                self.speech_end = self.started + len(self.samples) / SAMPLE_RATE
+            block = self.samples[self.position:self.position + frames]
+            self.position += frames
+            due = self.started + self.position / SAMPLE_RATE
+
+        if self.realtime:
+            time.sleep(max(due - time.perf_counter(), 0))
+        elif len(block) == 0:
+            time.sleep(frames / SAMPLE_RATE / FAST_SILENCE)
+        if len(block) < frames:
+            block = np.concatenate([block, np.zeros(frames - len(block), dtype=np.int16)])
+        return block.reshape(-1, 1), False
+
+    def play(self, data):
+        """
+        Null sink: discard audio, noting when the first of it was played.
+        """
+        with self.lock:
+            if self.first_audio is None and len(data):
+                self.first_audio = time.perf_counter()
+
+def make_null_sounddevice(source: AudioSource) -> types.ModuleType:
+    """
+    Build a stand-in for the sounddevice module backed by an AudioSource.
+
+    Parameters:
+    - source (AudioSource): Provides input samples and receives played audio.
+
+    Returns:
+    - module: Module exposing InputStream, OutputStream, play and wait.
+    """
+    sd = types.ModuleType("sounddevice")
+
+    class InputStream:
+        def __init__(self, samplerate=SAMPLE_RATE, channels=1, dtype="int16", **kwargs):
+            self.samplerate = samplerate
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def read(self, frames):
+            return source.read(frames)
+
+    class OutputStream:
+        def __init__(self, samplerate=22050, channels=1, dtype="int16", **kwargs):
+            self.samplerate = samplerate
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def write(self, data):
+            source.play(data)
+
+    sd.InputStream = InputStream
+    sd.OutputStream = OutputStream
+    sd.play = lambda data, samplerate=None, **kwargs: source.play(data)
+    sd.wait = lambda: None
+    return sd
+
+# === Stand-in Modules ===
+def make_stand_in_modules(tool_latency: float) -> dict:
+    """
+    Build replacements for the modules that need a browser, camera or controller at import time.
+
+    Parameters:
+    - tool_latency (float): Seconds each stubbed tool call takes.
+
+    Returns:
+    - dict: {module name: module}.
+    """
+    def tool(result):
+        def call(*args, **kwargs):
+            time.sleep(tool_latency)
+            return result
+        return call
+
+    websearch = types.ModuleType("module_websearch")
+    websearch.search_google = tool("Stub search result: the answer is 42.")
+    websearch.search_google_news = tool("Stub news result: nothing happened today.")
+
+    vision = types.ModuleType("module_vision")
+    vision.describe_camera_view = tool("a cluttered desk with a laptop and a coffee mug")
+    vision.get_image_caption_from_base64 = tool("a cluttered desk with a laptop and a coffee mug")
+
+    btcontroller = types.ModuleType("module_btcontroller")
+    btcontroller.start_controls = lambda: time.sleep(1)
+
+    return {"module_websearch": websearch, "module_vision": vision, "module_btcontroller": btcontroller}
+
+def set_stub_api_keys():
+    """
+    Provide placeholder API keys so load_config() does not fail for backends without a key.
+    """
+    for backend in ("OPENAI", "OOBA", "TABBY"):
+        os.environ.setdefault(f"{backend}_API_KEY", "stub")
+
+# === Machine Information ===
+def read_proc_field(path: str, field: str) -> str:
+    """
+    Return the value of the first "field: value" line of a /proc file, or None.
+    """
+    try:
+        with open(path, "r") as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                if name.strip() == field:
+                    return value.strip()
+    except OSError:
+        pass
+    return None
+
+def machine_info() -> dict:
+    """
+    Describe the machine a benchmark ran on, so results from a Pi 4, Pi 5 or x86 box can be told apart.
+
+    Returns:
+    - dict: Platform, CPU, memory and library versions.
+    """
+    memory = read_proc_field("/proc/meminfo", "MemTotal")
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        # Raspberry Pis report the board as "Model", x86 the CPU as "model name"
+        "cpu": read_proc_field("/proc/cpuinfo", "Model") or read_proc_field("/proc/cpuinfo", "model name") or platform.processor(),
+        "cpus": os.cpu_count(),
+        "memory_mb": int(memory.split()[0]) // 1024 if memory else None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
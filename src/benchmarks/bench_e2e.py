@@ -0,0 +1,271 @@
+"""
+bench_e2e.py
+
+Offline End-to-End Latency Benchmark for TARS-AI.
+
+Runs the real conversational loop (STTManager -> utterance_callback -> intent engine ->
+memory -> LLM -> TTS) on a plain Linux box, without a microphone, speaker, camera or
+remote LLM:
+- Recorded WAV utterances are fed to STTManager through a fake input stream.
+- The sound device is replaced by a null sink that only notes when audio starts playing.
+- The LLM, xttsv2 and STT servers are local stubs with configurable latency (stub_servers.py).
+- Web search, camera and controller modules are replaced by stand-ins with a fixed tool latency.
+
+Per-stage latency comes from module_tracing. End-to-end latency is measured from the end of
+the recorded speech to the first audio written to the null sink.
+
+Memory is written to a temporary database; config.ini is used for everything the benchmark
+does not override.
+
+Usage (from src/):
+    python benchmarks/bench_e2e.py [utterance.wav ...] [--runs 5] [--stt server|vosk] [--llm-latency 0.8]
+
+A WAV file may have a sidecar .txt file with its transcript, which the stub STT server
+returns. Without WAV files a synthetic utterance is used (server STT only, as Vosk
+needs real speech).
+"""
+
+# === Standard Libraries ===
+import os
+import sys
+import json
+import glob
+import wave
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_servers import StubBackends
+from bench_common import SAMPLE_RATE, AudioSource, make_null_sounddevice, make_stand_in_modules, set_stub_api_keys, machine_info
+
+# === Constants ===
+DEFAULT_TRANSCRIPT = "Hey TARS, how are you doing today?"
+
+# === Benchmark Setup ===
+def patch_config(args, stub_url: str, trace_path: str):
+    """
+    Make every module's load_config() point at the stubs. Must run before the TARS modules are imported.
+
+    Parameters:
+    - args (Namespace): Command line arguments.
+    - stub_url (str): Base URL of the stub backends.
+    - trace_path (str): Where the tracer writes turn records.
+    """
+    set_stub_api_keys()
+
+    import module_config
+    load_config = module_config.load_config
+
+    def load_bench_config():
+        config = load_config()
+        config['LLM'].update({
+            "llm_backend": args.backend,
+            "base_url": stub_url,
+            "fallback_urls": [],
+            "api_key": "stub",
+            "fast_url": stub_url if config['LLM']['fast_url'] else "",
+            "response_cache": config['LLM']['response_cache'] and args.response_cache,
+        })
+        config['STT'].update({"use_server": args.stt == "server", "server_url": stub_url})
+        config['TTS'].update({"ttsoption": "xttsv2", "ttsurl": stub_url, "toggle_charvoice": True})
+        config['VISION'].update({"server_hosted": True, "base_url": stub_url})
+        config['EMOTION']['enabled'] = config['EMOTION']['enabled'] and args.emotion
+        config['MEMORY']['digest_enabled'] = False
+        config['TRACING'].update({"enabled": True, "path": trace_path})
+        return config
+
+    module_config.load_config = load_bench_config
+
+def load_utterance(path: str) -> np.ndarray:
+    """
+    Read a 16-bit PCM WAV file as 16 kHz mono int16 samples.
+
+    Parameters:
+    - path (str): WAV file path.
+
+    Returns:
+    - np.ndarray: Samples.
+    """
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        channels, rate = wf.getnchannels(), wf.getframerate()
+
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(int(len(samples) * SAMPLE_RATE / rate)) * rate / SAMPLE_RATE
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+def synthetic_utterance(seconds: float = 1.5) -> np.ndarray:
+    """
+    Generate a speech-loud tone burst, for server STT runs without recorded utterances.
+    """
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    wave_form = sum(np.sin(2 * np.pi * f * t) for f in (180, 360, 720)) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    lead_in = np.zeros(int(0.3 * SAMPLE_RATE))
+    return np.concatenate([lead_in, wave_form * 3000]).astype(np.int16)
+
+def load_utterances(paths: list, transcript: str) -> list:
+    """
+    Collect (name, samples, transcript) for WAV files and directories of WAV files.
+    """
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path])
+
+    utterances = []
+    for file_path in files:
+        text_path = os.path.splitext(file_path)[0] + ".txt"
+        text = transcript
+        if os.path.exists(text_path):
+            with open(text_path, "r") as file:
+                text = file.read().strip()
+        utterances.append((os.path.basename(file_path), load_utterance(file_path), text))
+
+    return utterances or [("synthetic", synthetic_utterance(), transcript)]
+
+def distribution(values: list, percentile) -> dict:
+    """
+    p50/p90/p99 of a list of milliseconds.
+    """
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+    }
+
+# === Main ===
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark for TARS-AI.")
+    parser.add_argument("utterances", nargs="*", help="WAV files or directories of WAV files (16-bit PCM)")
+    parser.add_argument("--runs", type=int, default=5, help="Times each utterance is played")
+    parser.add_argument("--stt", choices=("server", "vosk"), default="server", help="STT path to exercise")
+    parser.add_argument("--backend", choices=("openai", "ooba", "tabby"), default="ooba", help="LLM API to mimic")
+    parser.add_argument("--transcript", default=DEFAULT_TRANSCRIPT, help="Transcript for utterances without a .txt file")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Stub completion latency (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Stub time to first TTS chunk (s)")
+    parser.add_argument("--stt-latency", type=float, default=0.3, help="Stub /save_audio latency (s)")
+    parser.add_argument("--tool-latency", type=float, default=0.5, help="Stubbed search/vision tool latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative random variation of stub latencies")
+    parser.add_argument("--no-realtime", action="store_true", help="Feed audio as fast as possible instead of in real time")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache enabled (repeated runs will hit it)")
+    parser.add_argument("--emotion", action="store_true", help="Keep emotion detection enabled")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"), help="Directory for the JSON report")
+    args = parser.parse_args()
+    args.utterances = [os.path.abspath(path) for path in args.utterances]  # load_config() changes the working directory
+    args.output = os.path.abspath(args.output)
+
+    backends = StubBackends(args.llm_latency, args.tts_latency, args.stt_latency, args.jitter)
+    stub_url = backends.start()
+
+    os.makedirs(args.output, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    workdir = tempfile.mkdtemp(prefix="tars-bench-")
+
+    source = AudioSource(realtime=False)  # Background noise is measured on silence, instantly
+    sys.modules["sounddevice"] = make_null_sounddevice(source)
+    sys.modules.update(make_stand_in_modules(args.tool_latency))
+    patch_config(args, stub_url, os.path.join(workdir, "turns.jsonl"))
+
+    # === TARS Modules (imported after patching) ===
+    from module_config import load_config
+    from module_character import CharacterManager
+    from module_memory import MemoryManager
+    from module_stt import STTManager
+    from module_tts import update_tts_settings
+    from module_tracing import tracer, summarize, percentile
+    import module_main
+
+    CONFIG = load_config()
+
+    class BenchMemoryManager(MemoryManager):
+        """
+        MemoryManager on a throwaway database that never touches the user's memory files.
+        """
+        def init_dynamic_memory(self):
+            self.memory_db_path = os.path.join(workdir, f"{self.char_name}.pickle.gz")
+            super().init_dynamic_memory()
+
+        def load_initial_memory(self, json_file_path):
+            pass
+
+    update_tts_settings(CONFIG['TTS']['ttsurl'])
+    char_manager = CharacterManager(config=CONFIG)
+    memory_manager = BenchMemoryManager(config=CONFIG, char_name=char_manager.char_name, char_greeting=char_manager.char_greeting)
+    stt_manager = STTManager(config=CONFIG, shutdown_event=threading.Event())
+    stt_manager.set_utterance_callback(module_main.utterance_callback)
+    module_main.initialize_managers(memory_manager, char_manager, stt_manager)
+
+    # Keep every turn record the tracer writes
+    records = []
+    end_turn = tracer.end_turn
+    def collect_turn():
+        record = end_turn()
+        if record:
+            records.append(record)
+        return record
+    tracer.end_turn = collect_turn
+
+    utterances = load_utterances(args.utterances, args.transcript)
+    source.realtime = not args.no_realtime
+    end_to_end = []
+
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Benchmarking {len(utterances)} utterance(s) x {args.runs} runs against stubs at {stub_url}")
+    for run in range(args.runs):
+        for name, samples, transcript in utterances:
+            backends.transcripts.clear()
+            backends.transcripts.append(transcript)
+            stt_manager.listen_position = stt_manager.capture.position  # As if the wake word just ended
+            source.load(samples)
+            turns = len(records)
+
+            stt_manager._transcribe_utterance()
+
+            if len(records) > turns and source.first_audio is not None:
+                ms = round((source.first_audio - source.speech_end) * 1000, 1)
+                records[-1]['utterance'] = name
+                records[-1]['speech_end_to_first_audio_ms'] = ms
+                end_to_end.append(ms)
+            else:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Run {run + 1}, {name}: no reply was played")
+
+    summary = summarize(records)
+    if end_to_end:
+        summary['speech_end_to_first_audio'] = distribution(end_to_end, percentile)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "machine": machine_info(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "stub_requests": backends.requests,
+        "summary": summary,
+        "turns": records,
+    }
+    report_path = os.path.join(args.output, f"e2e-{stamp}.json")
+    with open(report_path, "w") as file:
+        json.dump(report, file, indent=2)
+
+    print(f"\n{len(records)} turns, report written to {report_path}\n")
+    print(f"{'stage':<28}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, stats in summary.items():
+        print(f"{name:<28}{stats['count']:>7}{stats['p50']:>10.1f}{stats['p90']:>10.1f}{stats['p99']:>10.1f}")
+
+    memory_manager.stop_consolidation()
+    if module_main.emotion_service:
+        module_main.emotion_service.stop()
+    backends.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+bench_micro.py
+
+Micro-Benchmarks for the TARS-AI CPU Hot Paths.
+
+Times the functions that run on every turn, in-process and without remote services:
+- HyperDB add_document / query / save / load at several database sizes
+- module_engine.predict_class
+- module_main.build_prompt with a stub memory manager
+- module_main.extract_text
+- STTManager.amplify_audio
+- module_tts.play_audio_stream gain/normalize path (into a null sound device)
+
+HyperDB is measured with a cheap deterministic embedding so the numbers describe the database
+itself; the cost of one MiniLM embedding is reported separately. Results are written as JSON
+together with machine information, so runs on a Pi 4, Pi 5 or x86 box and between releases can
+be compared.
+
+Usage (from src/):
+    python benchmarks/bench_micro.py [--sizes 1000,10000,100000] [--only hyperdb,engine,prompt,text,audio]
+                                     [--compare benchmarks/results/micro-<...>.json]
+"""
+
+# === Standard Libraries ===
+import os
+import sys
+import json
+import time
+import zlib
+import types
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_common import AudioSource, make_null_sounddevice, make_stand_in_modules, set_stub_api_keys, machine_info
+
+# === Constants ===
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+SAMPLE_UTTERANCES = [
+    "Hey TARS, how are you doing today?",
+    "What's the weather like in London tomorrow?",
+    "Give me the latest news about space exploration",
+    "What do you see in front of you?",
+    "Tell me a joke about robots",
+    "Goodbye TARS, talk to you later",
+]
+
+# === Helpers ===
+def measure(func, repeat: int = 50, warmup: int = 2) -> dict:
+    """
+    Time repeated calls of a function.
+
+    Parameters:
+    - func (Callable): Function to call without arguments.
+    - repeat (int): Number of timed calls.
+    - warmup (int): Number of untimed calls first.
+
+    Returns:
+    - dict: min, p50, mean, p90 and max in milliseconds, and the number of runs.
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        "runs": repeat,
+        "min": round(samples[0], 4),
+        "p50": round(statistics.median(samples), 4),
+        "mean": round(statistics.fmean(samples), 4),
+        "p90": round(samples[min(int(0.9 * repeat), repeat - 1)], 4),
+        "max": round(samples[-1], 4),
+    }
+
+def result(name: str, params: dict, stats: dict) -> dict:
+    """
+    Build a result entry and print it.
+    """
+    label = name + "".join(f" {key}={value}" for key, value in params.items())
+    print(f"{label:<48}{stats['p50']:>12.3f}{stats['p90']:>12.3f}{stats['runs']:>7}")
+    return {"name": name, "params": params, **stats}
+
+def fake_embedding(documents: list) -> np.ndarray:
+    """
+    Deterministic stand-in for the MiniLM embedding: a random unit vector seeded by the text.
+    """
+    vectors = []
+    for document in documents:
+        text = document if isinstance(document, str) else json.dumps(document, sort_keys=True)
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        vectors.append(vector / np.linalg.norm(vector))
+    return np.array(vectors)
+
+def make_turn(index: int) -> dict:
+    """
+    A conversation turn shaped like the documents MemoryManager stores.
+    """
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "user_input": f"Question number {index}: what do you think about the mission?",
+        "bot_response": f"Answer number {index}: honesty setting at ninety percent, the mission is on track.",
+    }
+
+class StubMemoryManager:
+    """
+    Canned memory with the MemoryManager interface used by build_prompt, so prompt building
+    is timed without HyperDB, an embedding model or a token-count server.
+    """
+    def __init__(self, turns: int = 50):
+        self.documents = [make_turn(i) for i in range(turns)]
+
+    def token_count(self, text: str) -> dict:
+        return {"length": len(text) // 4}
+
+    def format_memory(self, document: dict) -> str:
+        return f"{{user}}: {document['user_input']}\n{{char}}: {document['bot_response']}"
+
+    def get_longterm_memory(self, user_input: str) -> str:
+        return "\n".join(self.format_memory(document) for document in self.documents[10:13])
+
+    def get_shortterm_memories_pairs(self, token_limit: int) -> list:
+        pairs, used = [], 0
+        for document in reversed(self.documents):
+            length = self.token_count(self.format_memory(document))['length']
+            if used + length > token_limit:
+                break
+            pairs.append((document['user_input'], document['bot_response']))
+            used += length
+        return list(reversed(pairs))
+
+    def get_shortterm_memories_tokenlimit(self, token_limit: int) -> str:
+        return "\n".join(f"{{user}}: {ui}\n{{char}}: {br}" for ui, br in self.get_shortterm_memories_pairs(token_limit))
+
+    def get_memory_candidates(self, query: str, top_k: int = 8, recent_turns: int = 6) -> list:
+        count = len(self.documents)
+        recent = range(count - recent_turns, count)
+        similar = range(10, 10 + top_k)
+        return [
+            {
+                "index": i,
+                "document": self.documents[i],
+                "similarity": 0.5 + 0.05 * (i % 8),
+                "recency": 1.0 - (count - 1 - i) / recent_turns if i in recent else 0.0,
+            }
+            for i in sorted(set(recent) | set(similar))
+        ]
+
+# === Benchmarks ===
+def bench_hyperdb(sizes: list) -> list:
+    """
+    HyperDB add_document, query, save and load at each database size, plus one real embedding.
+    """
+    from memory.hyperdb import HyperDB
+
+    embedding_function = HyperDB().embedding_function
+    results = [result("hyperdb.embedding", {"model": "all-MiniLM-L6-v2"},
+                      measure(lambda: embedding_function([SAMPLE_UTTERANCES[0]]), repeat=20))]
+
+    workdir = tempfile.mkdtemp(prefix="tars-bench-")
+    for rows in sizes:
+        db = HyperDB(embedding_function=fake_embedding)
+        db.vectors = np.random.default_rng(rows).standard_normal((rows, EMBEDDING_DIM)).astype(np.float32)
+        db.documents = [make_turn(i) for i in range(rows)]
+        repeat = 20 if rows <= 10000 else 5
+
+        document = make_turn(rows)
+        results.append(result("hyperdb.add_document", {"rows": rows}, measure(lambda: db.add_document(document), repeat=repeat)))
+        results.append(result("hyperdb.query", {"rows": rows}, measure(lambda: db.query(SAMPLE_UTTERANCES[0], top_k=5), repeat=repeat)))
+
+        path = os.path.join(workdir, f"bench-{rows}.pickle.gz")
+        results.append(result("hyperdb.save", {"rows": rows}, measure(lambda: db.save(path), repeat=3, warmup=1)))
+        loader = HyperDB(embedding_function=fake_embedding)
+        results.append(result("hyperdb.load", {"rows": rows}, measure(lambda: loader.load(path), repeat=3, warmup=1)))
+        os.remove(path)
+
+    os.rmdir(workdir)
+    return results
+
+def bench_engine(sizes: list) -> list:
+    """
+    Intent prediction on a rotating set of utterances.
+    """
+    from module_engine import predict_class
+
+    utterances = iter(SAMPLE_UTTERANCES * 1000)
+    return [result("engine.predict_class", {}, measure(lambda: predict_class(next(utterances)), repeat=200, warmup=5))]
+
+def bench_prompt(sizes: list) -> list:
+    """
+    build_prompt for a chat turn, with the configured layout and context packing.
+    """
+    import module_main
+    from module_character import CharacterManager
+    from module_contextpacker import ContextPacker
+
+    memory_manager = StubMemoryManager()
+    module_main.memory_manager = memory_manager
+    module_main.character_manager = CharacterManager(config=module_main.CONFIG)
+    if module_main.CONFIG['LLM']['context_packing']:
+        module_main.context_packer = ContextPacker(module_main.CONFIG, lambda text: memory_manager.token_count(text)['length'])
+
+    params = {
+        "layout": module_main.CONFIG['LLM']['prompt_layout'],
+        "context_packing": module_main.CONFIG['LLM']['context_packing'],
+    }
+    return [result("main.build_prompt", params, measure(lambda: module_main.build_prompt(SAMPLE_UTTERANCES[4]), repeat=100, warmup=3))]
+
+def bench_text(sizes: list) -> list:
+    """
+    extract_text on OpenAI and ooba/tabby shaped responses.
+    """
+    import module_main
+
+    if module_main.character_manager is None:
+        module_main.character_manager = types.SimpleNamespace(char_name="TARS")
+    reply = "TARS:  Affirmative.   Humor setting at seventy  five percent.<|eot_id|>\n\n  Anything else?  " * 4
+    openai_response = {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+    ooba_response = {"choices": [{"text": reply}]}
+
+    return [
+        result("main.extract_text", {"backend": "openai"}, measure(lambda: module_main.extract_text(openai_response, False, "openai"), repeat=1000)),
+        result("main.extract_text", {"backend": "ooba"}, measure(lambda: module_main.extract_text(ooba_response, False, "ooba"), repeat=1000)),
+    ]
+
+def bench_audio(sizes: list) -> list:
+    """
+    STTManager.amplify_audio on one capture block and play_audio_stream on one second of TTS audio.
+    """
+    from module_stt import STTManager
+    from module_tts import play_audio_stream
+
+    block = (np.random.default_rng(0).standard_normal((4000, 1)) * 1000).astype(np.int16)  # One STT read
+    stt = types.SimpleNamespace(amp_gain=4.0)
+    results = [result("stt.amplify_audio", {"frames": 4000}, measure(lambda: STTManager.amplify_audio(stt, block), repeat=1000))]
+
+    audio = (np.random.default_rng(1).standard_normal(22050) * 3000).astype(np.int16).tobytes()
+    chunks = [audio[i:i + 1024] for i in range(0, len(audio), 1024)]  # As streamed by server_tts
+    for gain, normalize in ((1.0, False), (2.0, False), (1.0, True)):
+        results.append(result(
+            "tts.play_audio_stream", {"seconds": 1, "gain": gain, "normalize": normalize},
+            measure(lambda: play_audio_stream(iter(chunks), gain=gain, normalize=normalize), repeat=50),
+        ))
+    return results
+
+BENCHMARKS = {
+    "hyperdb": bench_hyperdb,
+    "engine": bench_engine,
+    "prompt": bench_prompt,
+    "text": bench_text,
+    "audio": bench_audio,
+}
+
+def compare(results: list, baseline_path: str):
+    """
+    Print the p50 change of each benchmark against an earlier results file.
+    """
+    with open(baseline_path, "r") as file:
+        baseline = json.load(file)
+    previous = {(entry['name'], json.dumps(entry['params'], sort_keys=True)): entry for entry in baseline['results']}
+
+    print(f"\nCompared with {baseline_path} ({baseline['machine']['cpu']}, {baseline['timestamp']})")
+    for entry in results:
+        old = previous.get((entry['name'], json.dumps(entry['params'], sort_keys=True)))
+        if old and old['p50'] > 0:
+            change = (entry['p50'] - old['p50']) / old['p50'] * 100
+            label = entry['name'] + "".join(f" {key}={value}" for key, value in entry['params'].items())
+            print(f"{label:<48}{old['p50']:>12.3f}{entry['p50']:>12.3f}{change:>+9.1f}%")
+
+# === Main ===
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the TARS-AI CPU hot paths.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated HyperDB row counts")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"), help="Directory for the JSON results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output)  # load_config() changes the working directory
+    args.compare = os.path.abspath(args.compare) if args.compare else None
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+    # No sound card, browser, camera or controller is needed
+    set_stub_api_keys()
+    sys.modules["sounddevice"] = make_null_sounddevice(AudioSource(realtime=False))
+    sys.modules.update(make_stand_in_modules(0.0))
+
+    print(f"{'benchmark':<48}{'p50 ms':>12}{'p90 ms':>12}{'runs':>7}")
+    results = []
+    for name in selected:
+        results.extend(BENCHMARKS[name](sizes))
+
+    machine = machine_info()
+    report = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "machine": machine,
+        "settings": {"sizes": sizes, "benchmarks": selected},
+        "results": results,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    report_path = os.path.join(args.output, f"micro-{machine['hostname']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(report_path, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {report_path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
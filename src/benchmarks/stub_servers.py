@@ -0,0 +1,168 @@
+"""
+stub_servers.py
+
+Local Stub Backends for TARS-AI Benchmarks.
+
+A single threaded HTTP server that mimics the remote services used during a conversational
+turn, each with a configurable latency:
+- OpenAI /v1/chat/completions, ooba/tabby /v1/completions and their token-count endpoints
+- xttsv2 /set_tts_settings and /tts_stream (streams silent 16-bit PCM)
+- STT server /save_audio and /stream_audio (return queued transcripts) and vision /caption
+
+Only the standard library is used so the stubs run on any Linux box.
+"""
+
+# === Standard Libraries ===
+import json
+import time
+import random
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+class StubBackends:
+    """
+    Local stand-ins for the LLM, TTS, STT and vision servers.
+    """
+    def __init__(self, llm_latency=0.8, tts_latency=0.2, stt_latency=0.3, jitter=0.1,
+                 reply="Affirmative. Humor setting at seventy five percent.", audio_seconds=1.0, port=0):
+        """
+        Initialize the StubBackends.
+
+        Parameters:
+        - llm_latency (float): Seconds before a completion is returned.
+        - tts_latency (float): Seconds before the first TTS audio chunk is streamed.
+        - stt_latency (float): Seconds before /save_audio (or /stream_audio, after the stream ends) returns its transcript.
+        - jitter (float): Relative random variation applied to every latency (0.1 = +/-10%).
+        - reply (str): Text returned by the completion endpoints.
+        - audio_seconds (float): Length of the streamed TTS audio.
+        - port (int): Port to listen on (0 picks a free port).
+        """
+        self.llm_latency = llm_latency
+        self.tts_latency = tts_latency
+        self.stt_latency = stt_latency
+        self.jitter = jitter
+        self.reply = reply
+        self.audio_seconds = audio_seconds
+        self.transcripts = deque()  # Texts returned by /save_audio, one per request
+        self.requests = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL of the stub server.
+        """
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> str:
+        """
+        Start serving in a background thread.
+
+        Returns:
+        - str: Base URL of the stub server.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name="StubBackends", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def delay(self, seconds: float):
+        """
+        Sleep for a latency with jitter applied.
+        """
+        if seconds > 0:
+            time.sleep(max(seconds * random.uniform(1 - self.jitter, 1 + self.jitter), 0))
+
+    def _handler(self):
+        """
+        Build the request handler class bound to this instance.
+        """
+        backends = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = b""
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        body += self.rfile.read(size + 2)[:size]  # Chunk data and its CRLF
+                        if size == 0:
+                            return body
+                length = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(length) if length else b""
+
+            def _count(self, path):
+                backends.requests[path] = backends.requests.get(path, 0) + 1
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                self._count(path)
+                body = self._body()
+
+                if path == "/v1/chat/completions":
+                    backends.delay(backends.llm_latency)
+                    self._json({
+                        "choices": [{"message": {"role": "assistant", "content": backends.reply}}],
+                        "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(backends.reply) // 4},
+                    })
+                elif path == "/v1/completions":
+                    backends.delay(backends.llm_latency)
+                    self._json({"choices": [{"text": backends.reply}]})
+                elif path in ("/v1/internal/token-count", "/v1/token/encode"):
+                    text = json.loads(body or b"{}").get("text", "")
+                    self._json({"length": len(text) // 4})
+                elif path == "/set_tts_settings":
+                    self._json({"status": "ok"})
+                elif path in ("/save_audio", "/stream_audio"):
+                    backends.delay(backends.stt_latency)
+                    text = backends.transcripts.popleft() if backends.transcripts else ""
+                    self._json({"transcription": [{"text": text, "start": 0.0, "end": 1.0}] if text else []})
+                elif path == "/caption":
+                    backends.delay(backends.llm_latency / 2)
+                    self._json({"caption": "a cluttered desk with a laptop and a coffee mug"})
+                else:
+                    self._json({"error": f"Unknown endpoint {path}"}, status=404)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                self._count(path)
+
+                if path == "/tts_stream":
+                    backends.delay(backends.tts_latency)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "audio/x-wav")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+
+                    # Silent 16-bit mono PCM at 22050 Hz, streamed in ~50 ms chunks
+                    chunk = b"\x00\x00" * 1102
+                    for _ in range(int(backends.audio_seconds * 20)):
+                        self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                        time.sleep(0.05)
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self._json({"error": f"Unknown endpoint {path}"}, status=404)
+
+        return Handler
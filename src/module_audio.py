@@ -0,0 +1,453 @@
+"""
+module_audio.py
+
+Audio Capture Module for TARS-AI Application.
+
+A single long-lived capture thread keeps the microphone open and writes 16 kHz mono int16
+samples into a ring buffer. Every consumer (noise measurement, wake word detection,
+transcription) reads from the ring through its own AudioReader, so the device is never
+reopened between stages and audio captured just before a stage starts (the pre-roll) is
+still available to it.
+
+The ring has a single writer and any number of readers. Samples are addressed by their
+absolute position since capture started; the writer publishes its position only after the
+samples are copied (and announces the region it is about to overwrite before copying), so
+readers never wait on a lock to copy audio and can detect a block overwritten mid-copy. A reader that falls more
+than the ring's length behind skips ahead and counts the lost samples.
+
+Decoders read through a ChunkController, which measures their real-time factor and grows the
+chunk size when they fall behind the capture (fewer, larger calls) or shrinks it again when
+they keep up easily (lower latency).
+
+A VoiceActivityDetector turns the stream into speech-start and speech-end events (20 ms frames,
+energy against a continuously tracked noise floor plus spectral shape, and a hangover), so an
+utterance ends a few hundred milliseconds after the user stops instead of after a fixed window.
+
+Usage:
+    capture = AudioCapture(sample_rate=16000)
+    capture.start()
+    reader = capture.reader(preroll=0.5)
+    data, lost = reader.read(4000)
+"""
+
+# === Standard Libraries ===
+import threading
+from datetime import datetime
+
+import numpy as np
+import sounddevice as sd
+
+# === Constants ===
+REOPEN_DELAY = 0.5      # Seconds before reopening a failed input stream (doubled after each failure)
+REOPEN_DELAY_MAX = 5.0  # Longest delay between reopen attempts
+
+class RingBuffer:
+    """
+    Fixed-size ring of int16 samples with one writer and position-tracking readers.
+    """
+    def __init__(self, capacity: int):
+        """
+        Initialize the RingBuffer.
+
+        Parameters:
+        - capacity (int): Number of samples kept.
+        """
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.written = 0   # Absolute position of the next sample to be written
+        self.reserved = 0  # End of the block being written (samples before reserved - capacity are stale)
+        self.condition = threading.Condition()  # Only used to wake up waiting readers
+
+    def write(self, samples: np.ndarray):
+        """
+        Append samples, overwriting the oldest ones.
+
+        Parameters:
+        - samples (np.ndarray): int16 samples.
+        """
+        samples = samples[-self.capacity:]
+        count = len(samples)
+        start = self.written % self.capacity
+        first = min(count, self.capacity - start)
+        self.reserved = self.written + count  # Announce the overwrite before it happens
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:count - first] = samples[first:]
+        self.written = self.reserved  # Publish only after the copy
+
+        with self.condition:
+            self.condition.notify_all()
+
+    def oldest(self) -> int:
+        """
+        Absolute position of the oldest sample still in the ring (and not being overwritten).
+        """
+        return max(self.reserved - self.capacity, 0)
+
+    def copy(self, position: int, count: int) -> np.ndarray:
+        """
+        Copy samples starting at an absolute position (which must still be in the ring).
+
+        Parameters:
+        - position (int): Absolute position of the first sample.
+        - count (int): Number of samples.
+
+        Returns:
+        - np.ndarray: The samples.
+        """
+        start = position % self.capacity
+        first = min(count, self.capacity - start)
+        if first == count:
+            return self.buffer[start:start + count].copy()
+        return np.concatenate([self.buffer[start:], self.buffer[:count - first]])
+
+    def wait(self, position: int, timeout: float = None) -> bool:
+        """
+        Wait until the sample before an absolute position has been written.
+
+        Returns:
+        - bool: Whether it was written before the timeout.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.written >= position, timeout)
+
+class AudioReader:
+    """
+    A consumer's view of the ring buffer, reading forward from a start position.
+    """
+    def __init__(self, ring: RingBuffer, position: int):
+        """
+        Initialize the AudioReader.
+
+        Parameters:
+        - ring (RingBuffer): The shared ring.
+        - position (int): Absolute position of the first sample to read.
+        """
+        self.ring = ring
+        self.position = position
+        self.lost = 0   # Samples overwritten before this reader got to them (overflow)
+        self.waits = 0  # Reads that had to wait for the capture (underflow)
+
+    def read(self, frames: int, timeout: float = 5.0) -> tuple:
+        """
+        Read the next block of samples, waiting for it to be captured.
+
+        Parameters:
+        - frames (int): Number of samples.
+        - timeout (float): Seconds to wait for the capture thread.
+
+        Returns:
+        - tuple: (np.ndarray of int16 samples, bool whether samples were lost), like sounddevice's read().
+        """
+        lost = False
+        if self.ring.written < self.position + frames:
+            self.waits += 1
+        while True:
+            if not self.ring.wait(self.position + frames, timeout):
+                raise TimeoutError("No audio captured, is the microphone connected?")
+            if self._skip_lost():
+                lost = True
+                continue
+            data = self.ring.copy(self.position, frames)
+            if self.ring.oldest() <= self.position:
+                break
+            lost = True  # The writer overwrote the block while it was copied
+
+        self.position += frames
+        return data, lost
+
+    @property
+    def backlog(self) -> int:
+        """
+        Samples captured but not read yet.
+        """
+        return self.ring.written - self.position
+
+    def _skip_lost(self) -> int:
+        """
+        Move past samples that are no longer in the ring.
+        """
+        oldest = self.ring.oldest()
+        if self.position >= oldest:
+            return 0
+        skipped = oldest - self.position
+        self.lost += skipped
+        self.position = oldest
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Audio reader fell behind, {skipped} samples lost.")
+        return skipped
+
+class ChunkController:
+    """
+    Adapts a decoder's chunk size to the capture rate and measures its real-time factor.
+    """
+    def __init__(self, sample_rate: int, size: int = 4000, min_size: int = 1600, max_size: int = 8000):
+        """
+        Initialize the ChunkController.
+
+        Parameters:
+        - sample_rate (int): Samples per second.
+        - size (int): Initial chunk size in samples.
+        - min_size (int): Smallest chunk (lowest latency).
+        - max_size (int): Largest chunk (least overhead per sample).
+        """
+        self.sample_rate = sample_rate
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.audio_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.resizes = 0
+
+    @property
+    def rtf(self) -> float:
+        """
+        Real-time factor: decoding time per second of audio (above 1 the decoder cannot keep up).
+        """
+        return self.decode_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+    def update(self, frames: int, seconds: float, backlog: int):
+        """
+        Account for one decoded chunk and adjust the chunk size.
+
+        Parameters:
+        - frames (int): Samples decoded.
+        - seconds (float): Time spent decoding them.
+        - backlog (int): Samples captured but not read yet.
+        """
+        audio = frames / self.sample_rate
+        self.audio_seconds += audio
+        self.decode_seconds += seconds
+
+        size = self.size
+        if backlog > 2 * self.size:
+            size = min(self.size * 2, self.max_size)  # Falling behind: fewer, larger calls
+        elif backlog < self.size and seconds < 0.5 * audio:
+            size = max(self.size // 2, self.min_size)  # Keeping up easily: lower latency
+        if size != self.size:
+            self.size = size
+            self.resizes += 1
+
+class VoiceActivityDetector:
+    """
+    Streaming voice activity detector producing speech-start and speech-end events.
+
+    Audio is cut into short frames. A frame counts as speech when its energy is well above
+    the tracked noise floor and its spectrum looks like voice (most power in the speech band,
+    not flat like fans or hiss). Speech starts after a few speech frames in a row and ends
+    after a hangover of non-speech frames. The noise floor follows the background between
+    utterances and is kept across reset(), so it tracks the room while TARS is asleep.
+    """
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20, margin_db: float = 9.0,
+                 hangover: float = 0.3, min_speech: float = 0.06, min_floor_db: float = 10.0):
+        """
+        Initialize the VoiceActivityDetector.
+
+        Parameters:
+        - sample_rate (int): Samples per second.
+        - frame_ms (int): Frame length in milliseconds (10-30).
+        - margin_db (float): How far above the noise floor (dB) a frame must be to count as speech.
+        - hangover (float): Seconds of non-speech after which speech has ended.
+        - min_speech (float): Seconds of speech frames in a row before speech has started.
+        - min_floor_db (float): Lowest noise floor (dB of raw int16 samples), so digital silence does not make every click speech.
+        """
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_floor_db = min_floor_db
+        self.start_frames = max(1, round(min_speech * 1000 / frame_ms))
+        self.hangover_frames = max(1, round(hangover * 1000 / frame_ms))
+        self.window = np.hanning(self.frame).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.frame, 1.0 / sample_rate)
+        self.band = (freqs >= 300) & (freqs <= 3400)  # Where most of the voice's energy is
+        self.noise_db = None
+        self.reset()
+
+    def reset(self, position: int = 0):
+        """
+        Start a new utterance (the noise floor is kept).
+
+        Parameters:
+        - position (int): Absolute position of the next sample passed to process().
+        """
+        self.origin = position
+        self.position = position
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+        self.speech_start = None  # Absolute position where the current or last speech started
+        self.speech_end = None    # Absolute position where the last speech ended
+
+    @property
+    def seconds(self) -> float:
+        """
+        Seconds of audio processed since the last reset().
+        """
+        return (self.position - self.origin) / self.sample_rate
+
+    def features(self, frames: np.ndarray) -> tuple:
+        """
+        Compute the per-frame features.
+
+        Parameters:
+        - frames (np.ndarray): float32 array of shape (frames, frame length).
+
+        Returns:
+        - tuple: (energy in dB, share of power in the speech band, spectral flatness), one value per frame.
+        """
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-9)
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2 + 1e-9
+        total = power.sum(axis=1)
+        band_ratio = power[:, self.band].sum(axis=1) / total
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / (total / power.shape[1])
+        return energy_db, band_ratio, flatness
+
+    def _track_noise(self, energy_db: float, speech: bool):
+        """
+        Move the noise floor towards a frame's energy.
+        """
+        if energy_db < self.noise_db:
+            rate = 0.2    # Follow a quieter room quickly
+        elif speech:
+            rate = 0.002  # Creep up under sustained noise so it is eventually no longer speech
+        else:
+            rate = 0.05
+        self.noise_db = max(self.noise_db + rate * (energy_db - self.noise_db), self.min_floor_db)
+
+    def process(self, samples: np.ndarray) -> list:
+        """
+        Feed captured samples and return the events they complete.
+
+        Parameters:
+        - samples (np.ndarray): int16 samples following the previous ones.
+
+        Returns:
+        - list: ("start" or "end", absolute sample position) tuples, in order.
+        """
+        data = np.concatenate([self.remainder, samples.reshape(-1).astype(np.float32)])
+        count = len(data) // self.frame
+        self.remainder = data[count * self.frame:]
+        if count == 0:
+            return []
+
+        energy_db, band_ratio, flatness = self.features(data[:count * self.frame].reshape(count, self.frame))
+        if self.noise_db is None:
+            self.noise_db = max(float(np.min(energy_db)), self.min_floor_db)
+
+        events = []
+        for i in range(count):
+            position = self.position + i * self.frame
+            speech = (energy_db[i] > self.noise_db + self.margin_db
+                      and band_ratio[i] > 0.4 and flatness[i] < 0.5)
+            self._track_noise(float(energy_db[i]), speech)
+
+            if speech:
+                self.silence_run = 0
+                self.speech_run += 1
+                if not self.in_speech and self.speech_run >= self.start_frames:
+                    self.in_speech = True
+                    self.speech_start = position - (self.start_frames - 1) * self.frame
+                    events.append(("start", self.speech_start))
+            else:
+                self.speech_run = 0
+                if self.in_speech:
+                    self.silence_run += 1
+                    if self.silence_run >= self.hangover_frames:
+                        self.in_speech = False
+                        self.silence_run = 0
+                        self.speech_end = position - (self.hangover_frames - 1) * self.frame
+                        events.append(("end", self.speech_end))
+        self.position += count * self.frame
+        return events
+
+class AudioCapture:
+    """
+    Keeps the input device open and fills the ring buffer from a background thread.
+    """
+    def __init__(self, sample_rate: int = 16000, block_size: int = 800, buffer_seconds: float = 30.0):
+        """
+        Initialize the AudioCapture.
+
+        Parameters:
+        - sample_rate (int): Samples per second.
+        - block_size (int): Samples read from the device at a time (800 = 50 ms).
+        - buffer_seconds (float): Length of audio history kept in the ring.
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.ring = RingBuffer(int(buffer_seconds * sample_rate))
+        self.overflows = 0  # Device reads that reported lost input
+        self.reopens = 0    # Times the input stream failed and was reopened
+        self.running = False
+        self.thread = None
+        self.stopped = threading.Event()  # Interrupts the wait between reopen attempts
+        self.error = None   # Last device failure
+
+    def start(self):
+        """
+        Open the input device and start capturing in a background thread.
+        """
+        if self.running:
+            return
+        self.running = True
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._capture_loop, name="AudioCaptureThread", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop capturing and close the device.
+        """
+        self.running = False
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def _capture_loop(self):
+        """
+        Read blocks from the device into the ring until stopped, reopening the stream after a
+        growing delay when the device fails (e.g. a USB microphone that was unplugged).
+        """
+        delay = REOPEN_DELAY
+        while self.running:
+            try:
+                with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype="int16",
+                                    blocksize=self.block_size, latency='high') as stream:
+                    if self.error is not None:
+                        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Audio capture resumed after {self.reopens} reopen attempts")
+                        self.error = None
+                    delay = REOPEN_DELAY
+                    while self.running:
+                        data, overflowed = stream.read(self.block_size)
+                        if overflowed:
+                            self.overflows += 1
+                        self.ring.write(data.reshape(-1))
+            except Exception as e:
+                self.error = e
+                self.reopens += 1
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Audio capture failed, reopening in {delay:.1f}s: {e}")
+                if self.stopped.wait(delay):
+                    break
+                delay = min(delay * 2, REOPEN_DELAY_MAX)
+        self.running = False
+
+    @property
+    def position(self) -> int:
+        """
+        Absolute position of the next sample to be captured.
+        """
+        return self.ring.written
+
+    def reader(self, preroll: float = 0.0, position: int = None) -> AudioReader:
+        """
+        Create a reader starting at a given position, or a little before the current one.
+
+        Parameters:
+        - preroll (float): Seconds of already captured audio to include.
+        - position (int): Absolute position to start at instead (e.g. the end of the wake word).
+
+        Returns:
+        - AudioReader: The reader.
+        """
+        if position is None:
+            position = self.position - int(preroll * self.sample_rate)
+        return AudioReader(self.ring, max(position, self.ring.oldest()))
@@ -0,0 +1,186 @@
+"""
+module_commands.py
+
+Command Matching Module for TARS-AI Application.
+
+Exact voice commands are declared once in COMMANDS and compiled into a single Aho-Corasick
+automaton over normalized text (lowercase, punctuation removed, whole words only). One pass
+over an utterance finds every command it contains, before the intent classifier or the LLM
+is involved.
+
+A command can:
+- force an intent ("intent"), so the classifier is skipped,
+- run a handler registered with command_matcher.on(name, handler),
+- end the turn ("final"), so no reply is generated.
+
+Usage:
+    from module_commands import command_matcher
+    command_matcher.on("shutdown_pc", shutdown)
+    commands = command_matcher.dispatch(text)
+"""
+
+# === Standard Libraries ===
+import re
+from collections import deque
+from datetime import datetime
+from typing import Callable, List
+
+# === Command Registry ===
+COMMANDS = [
+    {"name": "search_google", "phrases": ["search google", "google search"], "intent": "Search"},
+    {"name": "voice_only_on", "phrases": ["voice only mode on"]},
+    {"name": "voice_only_off", "phrases": ["voice only mode off"]},
+    {"name": "shutdown_pc", "phrases": ["shutdown pc", "shut down pc"], "final": True},
+    {"name": "wrong_tool", "phrases": ["wrong tool", "no tool needed"], "final": True},
+]
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for matching: lowercase words separated by single spaces, padded with a
+    space on both sides so phrases only match whole words.
+
+    Parameters:
+    - text (str): Raw text.
+
+    Returns:
+    - str: Normalized text.
+    """
+    return f" {re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()} "
+
+class CommandMatcher:
+    """
+    Aho-Corasick matcher over the phrases of all registered commands.
+    """
+    def __init__(self, commands: List[dict] = None):
+        """
+        Initialize the CommandMatcher.
+
+        Parameters:
+        - commands (List[dict]): Commands with "name", "phrases" and optional "intent" and "final".
+        """
+        self.commands = {}
+        self.handlers = {}
+        self.goto = [{}]     # State -> {character: next state}
+        self.fail = [0]      # State -> longest proper suffix state
+        self.output = [[]]   # State -> names of the commands whose phrase ends here
+        self.compiled = False
+        for command in commands or []:
+            self.add(**command)
+
+    def add(self, name: str, phrases: List[str], intent: str = None, final: bool = False):
+        """
+        Register a command.
+
+        Parameters:
+        - name (str): Unique command name.
+        - phrases (List[str]): Phrases that trigger the command.
+        - intent (str): Intent class forced when the command matches.
+        - final (bool): Whether the command ends the turn.
+        """
+        self.commands[name] = {"name": name, "phrases": list(phrases), "intent": intent, "final": final}
+        for phrase in phrases:
+            state = 0
+            for char in normalize(phrase):
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            if name not in self.output[state]:
+                self.output[state].append(name)
+        self.compiled = False
+
+    def on(self, name: str, handler: Callable[[str], None]):
+        """
+        Register the handler run when a command matches.
+
+        Parameters:
+        - name (str): Command name.
+        - handler (Callable[[str], None]): Receives the original text.
+        """
+        if name not in self.commands:
+            raise KeyError(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Unknown command: {name}")
+        self.handlers[name] = handler
+
+    def compile(self):
+        """
+        Build the failure links (breadth-first over the trie).
+        """
+        queue = deque()
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + [
+                    name for name in self.output[self.fail[next_state]] if name not in self.output[next_state]
+                ]
+        self.compiled = True
+
+    def match(self, text: str) -> List[dict]:
+        """
+        Find every command contained in a text.
+
+        Parameters:
+        - text (str): The user's message.
+
+        Returns:
+        - List[dict]: Matched commands in order of appearance, without duplicates.
+        """
+        if not self.compiled:
+            self.compile()
+
+        matched = []
+        state = 0
+        for char in normalize(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for name in self.output[state]:
+                if name not in matched:
+                    matched.append(name)
+        return [self.commands[name] for name in matched]
+
+    def intent(self, text: str) -> str:
+        """
+        Return the intent forced by a command in the text, or None.
+
+        Parameters:
+        - text (str): The user's message.
+
+        Returns:
+        - str: The forced intent class, or None.
+        """
+        for command in self.match(text):
+            if command['intent']:
+                return command['intent']
+        return None
+
+    def dispatch(self, text: str) -> List[dict]:
+        """
+        Run the handlers of every command in the text.
+
+        Parameters:
+        - text (str): The user's message.
+
+        Returns:
+        - List[dict]: The matched commands.
+        """
+        commands = self.match(text)
+        for command in commands:
+            handler = self.handlers.get(command['name'])
+            if handler:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Running command {command['name']}")
+                handler(text)
+        return commands
+
+# === Globals ===
+command_matcher = CommandMatcher(COMMANDS)
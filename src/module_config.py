@@ -45,6 +45,16 @@ def load_config():
             "use_server": config.getboolean('STT', 'use_server'),
             "server_url": config['STT']['server_url'],
             "vosk_model": config['STT']['vosk_model'],
+            "preroll": config.getfloat('STT', 'preroll', fallback=0.5),
+            "vad_margin": config.getfloat('STT', 'vad_margin', fallback=9.0),
+            "vad_hangover": config.getfloat('STT', 'vad_hangover', fallback=0.3),
+            "no_speech_timeout": config.getfloat('STT', 'no_speech_timeout', fallback=6.0),
+            "max_utterance": config.getfloat('STT', 'max_utterance', fallback=30.0),
+            "stream_audio": config.getboolean('STT', 'stream_audio', fallback=True),
+            "audio_codec": config.get('STT', 'audio_codec', fallback='flac').lower(),
+            "trim_silence": config.getboolean('STT', 'trim_silence', fallback=True),
+            "trim_margin": config.getfloat('STT', 'trim_margin', fallback=0.25),
+            "follow_up_window": config.getfloat('STT', 'follow_up_window', fallback=8.0),
         },
         "CHAR": {
             "character_card_path": config['CHAR']['character_card_path'],
@@ -54,6 +64,11 @@ def load_config():
         "LLM": {
             "llm_backend": config['LLM']['llm_backend'],
             "base_url": config['LLM']['base_url'],
+            "fallback_urls": [url.strip() for url in config.get('LLM', 'fallback_urls', fallback='').split(',') if url.strip()],
+            "request_timeout": config.getfloat('LLM', 'request_timeout', fallback=60.0),
+            "hedge_delay": config.getfloat('LLM', 'hedge_delay', fallback=3.0),
+            "breaker_failures": config.getint('LLM', 'breaker_failures', fallback=3),
+            "breaker_cooldown": config.getfloat('LLM', 'breaker_cooldown', fallback=30.0),
             "api_key": get_api_key(config['LLM']['llm_backend']),
             "openai_model": config['LLM']['openai_model'],
             "contextsize": config.getint('LLM', 'contextsize'),
@@ -63,15 +78,52 @@ def load_config():
             "seed": config.getint('LLM', 'seed'),
             "systemprompt": config['LLM']['systemprompt'],
             "instructionprompt": config['LLM']['instructionprompt'],
+            "prompt_layout": config.get('LLM', 'prompt_layout', fallback='legacy'),
+            "context_packing": config.getboolean('LLM', 'context_packing', fallback=False),
+            "context_budget": config.getint('LLM', 'context_budget', fallback=1024),
+            "context_min_relevance": config.getfloat('LLM', 'context_min_relevance', fallback=0.25),
+            "fast_url": config.get('LLM', 'fast_url', fallback='').strip(),
+            "fast_backend": config.get('LLM', 'fast_backend', fallback='ooba'),
+            "fast_api_key": get_api_key(config.get('LLM', 'fast_backend', fallback='ooba')) if config.get('LLM', 'fast_url', fallback='').strip() else "",
+            "fast_model": config.get('LLM', 'fast_model', fallback=''),
+            "fast_timeout": config.getfloat('LLM', 'fast_timeout', fallback=5.0),
+            "fast_max_words": config.getint('LLM', 'fast_max_words', fallback=6),
+            "fast_max_tokens": config.getint('LLM', 'fast_max_tokens', fallback=80),
+            "fast_history_turns": config.getint('LLM', 'fast_history_turns', fallback=2),
+            "response_cache": config.getboolean('LLM', 'response_cache', fallback=False),
+            "response_cache_threshold": config.getfloat('LLM', 'response_cache_threshold', fallback=0.92),
+            "response_cache_ttl": config.getint('LLM', 'response_cache_ttl', fallback=3600),
+        },
+        "MEMORY": {
+            "digest_enabled": config.getboolean('MEMORY', 'digest_enabled', fallback=False),
+            "digest_span": config.getint('MEMORY', 'digest_span', fallback=6),
+            "digest_keep_recent": config.getint('MEMORY', 'digest_keep_recent', fallback=20),
+        },
+        "INTENT": {
+            "model": config.get('INTENT', 'model', fallback='nb'),
+        },
+        "TOOLS": {
+            "search_timeout": config.getfloat('TOOLS', 'search_timeout', fallback=8.0),
+            "news_timeout": config.getfloat('TOOLS', 'news_timeout', fallback=8.0),
+            "vision_timeout": config.getfloat('TOOLS', 'vision_timeout', fallback=10.0),
+            "late_result_ttl": config.getfloat('TOOLS', 'late_result_ttl', fallback=120.0),
+            "device_result_ttl": config.getfloat('TOOLS', 'device_result_ttl', fallback=5.0),
+            "speculation": config.getboolean('TOOLS', 'speculation', fallback=True),
+            "speculation_threshold": config.getfloat('TOOLS', 'speculation_threshold', fallback=0.9),
         },
         "VISION": {
             "server_hosted": config.getboolean('VISION', 'server_hosted'),
             "base_url": config['VISION']['base_url'],
+            "upload_size": config.getint('VISION', 'upload_size', fallback=384),
+            "upload_quality": config.getint('VISION', 'upload_quality', fallback=85),
         },
         "EMOTION": {
             "enabled": config.getboolean('EMOTION', 'enabled'),
             "emotion_model": config['EMOTION']['emotion_model'],
             "storepath": os.path.join(os.getcwd(), config['EMOTION']['storepath']),
+            "runtime": config.get('EMOTION', 'runtime', fallback='torch'),
+            "queue_size": config.getint('EMOTION', 'queue_size', fallback=4),
+            "batch_size": config.getint('EMOTION', 'batch_size', fallback=4),
         },
         "TTS": {
             "ttsoption": config['TTS']['ttsoption'],
@@ -85,6 +137,12 @@ def load_config():
             "is_talking": config.getboolean('TTS', 'is_talking'),
             "global_timer_paused": config.getboolean('TTS', 'global_timer_paused'),
         },
+        "TRACING": {
+            "enabled": config.getboolean('TRACING', 'enabled', fallback=False),
+            "path": config.get('TRACING', 'path', fallback='traces/turns.jsonl'),
+            "max_bytes": config.getint('TRACING', 'max_bytes', fallback=5242880),
+            "backups": config.getint('TRACING', 'backups', fallback=3),
+        },
         "DISCORD": {
             "TOKEN": config['DISCORD']['TOKEN'],
             "channel_id": config['DISCORD']['channel_id'],
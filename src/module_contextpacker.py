@@ -0,0 +1,116 @@
+"""
+module_contextpacker.py
+
+Context Packing Module for TARS-AI Application.
+
+Selects which snippets (recent history, retrieved memories, tool output) go into the LLM
+prompt. Each candidate is scored by relevance to the user's message and the context window
+is filled greedily by relevance per token up to a target budget, which is kept below the
+model's maximum so prompts stay short and prefill stays fast.
+"""
+
+# === Standard Libraries ===
+from collections import OrderedDict
+from datetime import datetime
+
+# === Constants ===
+RECENCY_WEIGHT = 0.3  # Bonus added to the most recent history turn, decaying with age
+TOKEN_CACHE_SIZE = 2048  # Number of snippet token counts kept between turns
+
+class ContextPacker:
+    """
+    Greedy relevance-per-token packer for the LLM context window.
+
+    Candidates are dictionaries with the keys:
+    - text (str): The snippet as it will appear in the prompt.
+    - source (str): Where it came from ("history", "memory" or "tool").
+    - relevance (float): Similarity to the user's message.
+    - recency (float): 1.0 for the newest history turn down to 0.0 (optional).
+    - order (int): Position used to restore chronological order (optional).
+    - pinned (bool): Always include, ahead of everything else (optional).
+    """
+    def __init__(self, config, token_counter):
+        """
+        Initialize the ContextPacker.
+
+        Parameters:
+        - config (dict): Configuration dictionary.
+        - token_counter (Callable[[str], int]): Returns the token count of a text.
+        """
+        self.config = config
+        self.token_counter = token_counter
+        self.token_budget = config['LLM']['context_budget']
+        self.min_relevance = config['LLM']['context_min_relevance']
+        self.token_cache = OrderedDict()
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count tokens for a snippet, caching results since history snippets repeat every turn.
+
+        Parameters:
+        - text (str): Snippet text.
+
+        Returns:
+        - int: Token count.
+        """
+        if text in self.token_cache:
+            self.token_cache.move_to_end(text)
+            return self.token_cache[text]
+
+        length = self.token_counter(text)
+        self.token_cache[text] = length
+        if len(self.token_cache) > TOKEN_CACHE_SIZE:
+            self.token_cache.popitem(last=False)
+        return length
+
+    def score(self, candidate: dict) -> float:
+        """
+        Score a candidate by relevance, with a bonus for recent history.
+
+        Parameters:
+        - candidate (dict): The candidate snippet.
+
+        Returns:
+        - float: Relevance score.
+        """
+        return candidate.get('relevance', 0.0) + RECENCY_WEIGHT * candidate.get('recency', 0.0)
+
+    def pack(self, candidates: list, max_tokens: int = None) -> list:
+        """
+        Greedily select candidates by score per token until the budget is filled.
+
+        Parameters:
+        - candidates (list): Candidate snippets (see class docstring).
+        - max_tokens (int): Hard upper limit, e.g. what is left of the context window.
+
+        Returns:
+        - list: Selected candidates in their original order, each with a `tokens` key.
+        """
+        budget = self.token_budget if max_tokens is None else min(self.token_budget, max_tokens)
+        used = 0
+        selected = []
+
+        for position, candidate in enumerate(candidates):
+            candidate['tokens'] = self.count_tokens(candidate['text'])
+            candidate.setdefault('order', position)
+
+        # Pinned snippets (tool output) are always included
+        for candidate in candidates:
+            if candidate.get('pinned'):
+                selected.append(candidate)
+                used += candidate['tokens']
+
+        ranked = [
+            c for c in candidates
+            if not c.get('pinned') and self.score(c) >= self.min_relevance
+        ]
+        ranked.sort(key=lambda c: self.score(c) / max(c['tokens'], 1), reverse=True)
+
+        for candidate in ranked:
+            if used + candidate['tokens'] > budget:
+                continue  # A smaller snippet further down may still fit
+            selected.append(candidate)
+            used += candidate['tokens']
+
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Packed {len(selected)}/{len(candidates)} context snippets into {used}/{budget} tokens")
+        return sorted(selected, key=lambda c: c['order'])
@@ -0,0 +1,192 @@
+"""
+module_emotion.py
+
+Emotion Detection Module for TARS-AI Application.
+
+Classifies the emotion of TARS's replies off the critical path. The model is loaded once by
+a single worker thread that reads from a bounded queue, classifies queued texts in batches
+(truncated by the model's own tokenizer) and publishes the results to subscribers.
+If the model fails to load, the worker retries with a growing delay instead of reloading it
+for every reply.
+"""
+
+# === Standard Libraries ===
+import queue
+import threading
+from datetime import datetime
+from typing import Callable
+
+# === Constants ===
+LOAD_RETRY_DELAY = 30.0   # Seconds before retrying a failed model load (doubled after each failure)
+LOAD_RETRY_MAX = 600.0    # Longest delay between load attempts
+
+class EmotionService:
+    """
+    Single-worker emotion classifier with a bounded queue and result subscribers.
+    """
+    def __init__(self, config):
+        """
+        Initialize the EmotionService.
+
+        Parameters:
+        - config (dict): Configuration dictionary.
+        """
+        self.config = config
+        self.model_name = config['EMOTION']['emotion_model']
+        self.runtime = config['EMOTION']['runtime']
+        self.batch_size = config['EMOTION']['batch_size']
+        self.queue = queue.Queue(maxsize=config['EMOTION']['queue_size'])
+        self.subscribers = []
+        self.classifier = None
+        self.latest = None
+        self.running = False
+        self.thread = None
+        self.stopped = threading.Event()  # Interrupts the wait between load attempts
+        self.load_error = None            # Last model load failure
+        self.load_failures = 0
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        """
+        Register a callback for emotion events.
+
+        Parameters:
+        - callback (Callable[[dict], None]): Receives {"text", "emotion", "score", "timestamp"}.
+        """
+        self.subscribers.append(callback)
+
+    def start(self):
+        """
+        Start the worker thread. The model is loaded by the worker, not the caller.
+        """
+        if self.running:
+            return
+        self.running = True
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._worker_loop, name="EmotionThread", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the worker thread.
+        """
+        self.running = False
+        self.stopped.set()
+        try:
+            self.queue.put_nowait(None)  # Wake the worker
+        except queue.Full:
+            pass
+        if self.thread:
+            self.thread.join()
+
+    def submit(self, text: str):
+        """
+        Queue a text for classification without blocking.
+
+        When the queue is full the oldest pending text is dropped, as only recent
+        emotions are of interest. Texts are ignored while the service is stopped
+        (start() is called once at initialization).
+
+        Parameters:
+        - text (str): Text to classify.
+        """
+        if not text or not self.running:
+            return
+        while True:
+            try:
+                self.queue.put_nowait(text)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _load_classifier(self):
+        """
+        Load the text-classification pipeline once, using the configured runtime.
+
+        Runtimes:
+        - torch: the model as published.
+        - int8: dynamically quantized Linear layers for faster CPU inference.
+        - onnx: ONNX Runtime export via optimum (falls back to torch if optimum is not installed).
+        """
+        from transformers import pipeline, AutoTokenizer
+
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Loading emotion model {self.model_name} ({self.runtime})...")
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = self.model_name
+
+        if self.runtime == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+                model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+            except ImportError:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: optimum[onnxruntime] is not installed, using torch for emotions")
+        elif self.runtime == "int8":
+            import torch
+            from transformers import AutoModelForSequenceClassification
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self.classifier = pipeline(task="text-classification", model=model, tokenizer=tokenizer, top_k=None)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Emotion model loaded.")
+
+    def _worker_loop(self):
+        """
+        Classify queued texts in batches and publish the results.
+        """
+        delay = LOAD_RETRY_DELAY
+        while self.running and self.classifier is None:
+            try:
+                self._load_classifier()
+            except Exception as e:
+                self.load_error = e
+                self.load_failures += 1
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Failed to load emotion model ({self.load_failures} attempts), retrying in {delay:.0f}s: {e}")
+                if self.stopped.wait(delay):
+                    return
+                delay = min(delay * 2, LOAD_RETRY_MAX)
+
+        while self.running:
+            text = self.queue.get()
+            if text is None:
+                continue
+
+            # Drain whatever else is waiting into the same batch
+            batch = [text]
+            while len(batch) < self.batch_size:
+                try:
+                    text = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if text is not None:
+                    batch.append(text)
+
+            try:
+                outputs = self.classifier(batch, truncation=True, max_length=self.classifier.tokenizer.model_max_length)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Emotion classification failed: {e}")
+                continue
+
+            for text, scores in zip(batch, outputs):
+                best = max(scores, key=lambda x: x['score'])
+                self._publish({
+                    "text": text,
+                    "emotion": best['label'],
+                    "score": best['score'],
+                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                })
+
+    def _publish(self, event: dict):
+        """
+        Send an emotion event to all subscribers.
+
+        Parameters:
+        - event (dict): The emotion event.
+        """
+        self.latest = event
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Emotion subscriber failed: {e}")
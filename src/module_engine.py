@@ -5,43 +5,155 @@ Core module for TARS-AI responsible for:
 - Predicting user intents and determining required modules.
 - Executing tool-specific functions like web searches and vision analysis.
 
-This is achieved using a pre-trained Naive Bayes classifier and TF-IDF vectorizer.
+This is achieved using a pre-trained Naive Bayes classifier and TF-IDF vectorizer, exported by
+module_engineTrainer as a NumPy artifact so that scikit-learn is not needed at startup.
+Alternatively ([INTENT] model = embedding), intents are classified from the MiniLM sentence
+embedding that memory search computes for the same utterance.
+
+Corrections (log_correction) are appended to the training data and learned immediately: the
+updated model replaces the one in use without a restart.
+
+An utterance can ask for several tools ("What's the weather and what do you see?"): every
+class found in the utterance or one of its clauses is used, and the tools run concurrently on
+the tool registry (module_tools), each with its own deadline.
+
+While the user is still speaking, partial STT hypotheses are classified (prefetch_tools) and a
+confident Vision, Weather or News intent starts its tool early; the final utterance reuses
+the call when it asks for the same thing.
 """
 
 # === Standard Libraries ===
 import os
-import joblib
+import re
+import csv
+import threading
 from datetime import datetime
 
 # === Custom Modules ===
+from module_config import load_config
 from module_websearch import search_google, search_google_news
 from module_vision import describe_camera_view
+from module_tracing import tracer
+from module_commands import command_matcher
+from module_intent import IntentModel, EmbeddingIntentModel
+from module_tools import tool_registry
 
 # === Constants ===
-MODEL_FILENAME = 'engine/pickles/naive_bayes_model.pkl'
-VECTORIZER_FILENAME = 'engine/pickles/module_engine_model.pkl'
+INTENT_MODEL_FILENAME = 'engine/pickles/intent_model.npz'
+EMBEDDING_INTENT_MODEL_FILENAME = 'engine/pickles/intent_embedding_model.npz'
+CORRECTIONS_FILENAME = 'engine/training/corrections.csv'
+INTENT_THRESHOLD = 0.75
+CLAUSE_THRESHOLD = 0.9  # Clauses carry little context, so a tool found in one alone must be more certain
+CLAUSE_PATTERN = re.compile(r"[,;.?!]|\b(?:and|also|then|plus)\b", re.IGNORECASE)
+
+CONFIG = load_config()
+embedding_intent_model = None
+query_embedder = None  # Shared per-utterance sentence embedding, set by set_query_embedder()
+last_prediction = (None, None)  # (user input, tool class) of the latest tool decision
+model_lock = threading.Lock()  # Serializes model updates; predictions never wait for it
+NOTES = {"Goodbye": "*User is leaving the chat politely*"}  # Classes that add a note instead of running a tool
+SPECULATIVE_CLASSES = ("Vision", "Weather", "News")
+last_partial = None  # Previous partial STT hypothesis, to tell when it stops changing
 
 # === Load Models ===
 try:
-    if not os.path.exists(VECTORIZER_FILENAME):
-        raise FileNotFoundError("Vectorizer file not found.")
-    if not os.path.exists(MODEL_FILENAME):
-        raise FileNotFoundError("Model file not found.")
-    nb_classifier = joblib.load(MODEL_FILENAME)
-    tfidf_vectorizer = joblib.load(VECTORIZER_FILENAME)
+    if not os.path.exists(INTENT_MODEL_FILENAME):
+        raise FileNotFoundError("Intent model file not found.")
+    intent_model = IntentModel.load(INTENT_MODEL_FILENAME)
 
 except FileNotFoundError as e:
-    # Attempt to train models if files are missing
+    # Attempt to train models if files are missing (only this needs scikit-learn)
     import module_engineTrainer
     module_engineTrainer.train_text_classifier()
     try:
-        nb_classifier = joblib.load(MODEL_FILENAME)
-        tfidf_vectorizer = joblib.load(VECTORIZER_FILENAME)
+        intent_model = IntentModel.load(INTENT_MODEL_FILENAME)
     except Exception as retry_exception:
         raise RuntimeError("Critical error while loading models.") from retry_exception
 
+if CONFIG['INTENT']['model'] == "embedding":
+    try:
+        if not os.path.exists(EMBEDDING_INTENT_MODEL_FILENAME):
+            raise FileNotFoundError("Embedding intent model file not found.")
+        embedding_intent_model = EmbeddingIntentModel.load(EMBEDDING_INTENT_MODEL_FILENAME)
+
+    except FileNotFoundError as e:
+        import module_engineTrainer
+        module_engineTrainer.train_embedding_classifier()
+        try:
+            embedding_intent_model = EmbeddingIntentModel.load(EMBEDDING_INTENT_MODEL_FILENAME)
+        except Exception as retry_exception:
+            raise RuntimeError("Critical error while loading models.") from retry_exception
+
+
+# === Tools ===
+def traced(stage, function):
+    """
+    Wraps a tool so its duration is recorded as its own stage of the turn.
+
+    Parameters:
+        stage (str): Stage name.
+        function (Callable): The tool.
+
+    Returns:
+        Callable: The wrapped tool.
+    """
+    def run(*args):
+        with tracer.span(stage):
+            return function(*args)
+    return run
+
+tool_registry.register(
+    "Weather", traced("tool_weather", search_google),
+    "*Using tool Web Search* Use the following results from a realtime web search: {result}",
+    timeout=CONFIG['TOOLS']['search_timeout'], cost="network",
+)
+tool_registry.register(
+    "News", traced("tool_news", search_google_news),
+    "*Using tool Web Search* Summarize the news from the following web search results: {result}",
+    timeout=CONFIG['TOOLS']['news_timeout'], cost="network",
+)
+tool_registry.register(
+    "Vision", traced("tool_vision", describe_camera_view),
+    "*Using tool Vision* The following is a summary of what TARS can see: {result}",
+    timeout=CONFIG['TOOLS']['vision_timeout'], cost="device", uses_input=False,
+    result_ttl=CONFIG['TOOLS']['device_result_ttl'],
+)
+tool_registry.register(
+    "Search", traced("tool_search", search_google),
+    "*Using tool Web Search* Use this answer from Google to respond to the user: {result}",
+    timeout=CONFIG['TOOLS']['search_timeout'], cost="network",
+)
+
 
 # === Functions ===
+def set_query_embedder(embedder):
+    """
+    Share the sentence embedding of each utterance with memory search.
+
+    Parameters:
+    - embedder (Callable[[str], np.ndarray]): Returns the (cached) embedding of an utterance.
+    """
+    global query_embedder
+    query_embedder = embedder
+
+def classify(user_input, use_embedding=True):
+    """
+    Classifies a text with the active intent model.
+
+    Parameters:
+        user_input (str): The input text.
+        use_embedding (bool): Use the embedding model if it is active (False for parts of an
+            utterance, which would each need an embedding of their own).
+
+    Returns:
+        tuple: Most likely class and its probability score.
+    """
+    # Read each model once, so a correction swapping it mid-prediction is harmless
+    embedding_model, model = embedding_intent_model, intent_model
+    if use_embedding and embedding_model and query_embedder:
+        return embedding_model.predict(query_embedder(user_input))
+    return model.predict(user_input)
+
 def predict_class(user_input):
     """
     Predicts the class and its confidence score for a given user input.
@@ -52,57 +164,204 @@ def predict_class(user_input):
     Returns:
         tuple: Predicted class and its probability score.
     """
-    query_vector = tfidf_vectorizer.transform([user_input])
-    predictions = nb_classifier.predict(query_vector)
-    predicted_probabilities = nb_classifier.predict_proba(query_vector)
-
-    predicted_class = predictions[0]
-    max_probability = max(predicted_probabilities[0])
+    with tracer.span("intent"):
+        predicted_class, max_probability = classify(user_input)
 
     # Return None if confidence is below threshold
-    if max_probability < 0.75:
+    if max_probability < INTENT_THRESHOLD:
         return None, max_probability
     print(f"TOOL: Using Tool {predicted_class} at {max_probability}")
     return predicted_class, max_probability
 
+def predict_classes(user_input):
+    """
+    Predicts every class above the confidence threshold for a given user input.
+
+    The probabilities of a single prediction are normalized across classes, so at most one
+    class can pass the threshold; the utterance and each of its clauses are classified
+    separately to find the others. Clauses use the TF-IDF model, so the utterance is embedded
+    only once (shared with memory search). A clause can only add a tool class, and only at the
+    stricter CLAUSE_THRESHOLD; commands such as Goodbye or Mute need the whole utterance.
+
+    Parameters:
+        user_input (str): The input text from the user.
+
+    Returns:
+        list: (class, probability) tuples, most confident first.
+    """
+    segments = [user_input]
+    clauses = [clause.strip() for clause in CLAUSE_PATTERN.split(user_input) if len(clause.split()) >= 2]
+    if len(clauses) > 1:
+        segments.extend(clauses)
+
+    found = {}
+    with tracer.span("intent"):
+        for index, segment in enumerate(segments):
+            predicted_class, probability = classify(segment, use_embedding=index == 0)
+            if index > 0 and (predicted_class not in tool_registry.tools or probability < CLAUSE_THRESHOLD):
+                continue
+            if probability >= INTENT_THRESHOLD and probability > found.get(predicted_class, 0.0):
+                found[predicted_class] = probability
+
+    predictions = sorted(found.items(), key=lambda item: item[1], reverse=True)
+    for predicted_class, probability in predictions:
+        print(f"TOOL: Using Tool {predicted_class} at {probability}")
+    return predictions
+
 
-def check_for_module(user_input):
+def log_correction(user_input, label):
+    """
+    Record the correct intent for an utterance and learn it immediately.
+
+    The correction is appended to the corrections file (included in the next full retrain), the
+    intent models are updated incrementally and saved, and the updated models replace the ones
+    in use.
+
+    Parameters:
+        user_input (str): The input text from the user.
+        label (str): The correct class ("chat" if no tool should have been used).
+
+    Returns:
+        bool: Whether the correction was applied.
+    """
+    global intent_model, embedding_intent_model
+
+    if label not in intent_model.classes:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Unknown intent class {label}, correction ignored.")
+        return False
+
+    with model_lock:
+        new_file = not os.path.exists(CORRECTIONS_FILENAME)
+        with open(CORRECTIONS_FILENAME, "a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            if new_file:
+                writer.writerow(["query", "label"])
+            writer.writerow([user_input, label])
+
+        try:
+            updated_model = intent_model.partial_fit([user_input], [label])
+            updated_model.save(INTENT_MODEL_FILENAME)
+            intent_model = updated_model
+
+            if embedding_intent_model and query_embedder:
+                updated_embedding_model = embedding_intent_model.partial_fit([query_embedder(user_input)], [label])
+                updated_embedding_model.save(EMBEDDING_INTENT_MODEL_FILENAME)
+                embedding_intent_model = updated_embedding_model
+        except ValueError as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: {e}")
+            return False
+
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Learned \"{user_input}\" as {label}.")
+    return True
+
+
+def correct_last_prediction(label):
+    """
+    Correct the class of the latest utterance a tool was chosen for.
+
+    Parameters:
+        label (str): The correct class.
+
+    Returns:
+        bool: Whether the correction was applied.
+    """
+    global last_prediction
+    user_input, predicted_class = last_prediction
+    if user_input is None or predicted_class == label:
+        return False
+    last_prediction = (None, None)
+    return log_correction(user_input, label)
+
+
+def detect_intents(user_input):
+    """
+    Finds the intents of an utterance: the one forced by an exact command, or the classifier's.
+
+    Parameters:
+        user_input (str): The input text from the user.
+
+    Returns:
+        list: (class, probability) tuples, most confident first.
+    """
+    # Exact commands skip the classifier
+    forced_class = command_matcher.intent(user_input)
+    if forced_class:
+        return [(forced_class, 1.0)]
+    return predict_classes(user_input)
+
+
+def check_for_module(user_input, predictions=None):
     """
     Determines the appropriate module to handle the user's input based on predictions.
 
     Parameters:
         user_input (str): The input text from the user.
+        predictions (list): Result of detect_intents() for this input, if already known.
 
     Returns:
         str: A response generated by the determined module or a default message if no module is needed.
     """
-    predicted_class, probability = predict_class(user_input)
+    global last_prediction
+
+    if predictions is None:
+        predictions = detect_intents(user_input)
+    predicted_classes = [predicted_class for predicted_class, probability in predictions]
 
-    if "search google" in user_input.lower():
-        predicted_class = "Search"
+    if predicted_classes:
+        last_prediction = (user_input, predicted_classes[0])
 
-    if predicted_class:
-        if predicted_class == "Weather":
-            weather_info = search_google(user_input)
-            return f"*Using tool Web Search* Use the following results from a realtime web search: {weather_info}"
+    with tracer.span("tool"):
+        return run_tools(predicted_classes, user_input)
 
-        elif predicted_class == "News":
-            result = search_google_news(user_input)
-            return f"*Using tool Web Search* Summarize the news from the following web search results: {result}"
 
-        elif predicted_class == "Vision":
-            result = describe_camera_view()
-            return f"*Using tool Vision* The following is a summary of what TARS can see: {result}"
+def run_tools(predicted_classes, user_input):
+    """
+    Runs the tools for all predicted classes concurrently and merges their results.
+
+    Tools that miss their deadline add a "tool unavailable" note instead of holding up the turn.
+
+    Parameters:
+        predicted_classes (list): The predicted classes, most confident first.
+        user_input (str): The input text from the user.
 
-        elif predicted_class == "Search":
-            result = search_google(user_input)
-            return f"*Using tool Web Search* Use this answer from Google to respond to the user: {result}"
+    Returns:
+        str: The tool results formatted for the prompt (one per line), "Mute" or "No_Tool".
+    """
+    if "Mute" in predicted_classes:
+        return "Mute"
 
-        elif predicted_class == "Goodbye":
-            return "*User is leaving the chat politely*"
+    tools = [predicted_class for predicted_class in predicted_classes if predicted_class in tool_registry.tools]
+    tool_results = dict(zip(tools, tool_registry.run(tools, user_input)))
+    tool_registry.settle_speculation()
 
-        elif predicted_class == "Mute":
-            return "Mute"
+    results = [tool_results.get(predicted_class, NOTES.get(predicted_class)) for predicted_class in predicted_classes]
+    results = [result for result in results if result]
 
     # Default response if no suitable module is found
-    return "No_Tool"
\ No newline at end of file
+    return "\n".join(results) if results else "No_Tool"
+
+
+def prefetch_tools(partial_text):
+    """
+    Speculatively starts the tool of a partial STT hypothesis.
+
+    Only the Naive Bayes model is used (tens of microseconds), as this runs in the audio loop.
+    Vision does not depend on the words, so it starts as soon as the intent is clear; search
+    tools wait until the hypothesis stops changing, so their query is likely the final one.
+
+    Parameters:
+        partial_text (str): The hypothesis so far.
+    """
+    global last_partial
+
+    stable = partial_text == last_partial
+    last_partial = partial_text
+    if not CONFIG['TOOLS']['speculation'] or command_matcher.intent(partial_text):
+        return
+
+    predicted_class, probability = intent_model.predict(partial_text)
+    if predicted_class not in SPECULATIVE_CLASSES or probability < CONFIG['TOOLS']['speculation_threshold']:
+        return
+    if tool_registry.tools[predicted_class]['uses_input'] and not stable:
+        return
+    tool_registry.speculate(predicted_class, partial_text)
@@ -4,34 +4,89 @@ module_engineTrainer.py
 Text Classification Training Module for TARS-AI Application.
 
 This module uses labeled training data to build a Naive Bayes-based text classifier with TF-IDF vectorization. 
-The trained model and vectorizer are saved as pickle files for use by other components of the application.
+The trained model and vectorizer are saved as pickle files, and exported together with the calibration
+as a compact NumPy artifact that module_engine loads without scikit-learn (see module_intent).
+Corrections logged at runtime (engine/training/corrections.csv) are merged into the training data,
+overriding the label of the same query.
+
+Model selection mode (python module_engineTrainer.py --select) cross-validates a grid of vectorizer
+settings and linear classifiers in parallel, measures the size and per-prediction latency of each
+exported model on this CPU, and keeps the most accurate model within a latency budget.
 """
 
 # === Standard Libraries ===
 import os
+import json
+import time
+import argparse
+import platform
+import tempfile
+import itertools
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import joblib
-from sklearn.naive_bayes import MultinomialNB
+from sklearn.naive_bayes import MultinomialNB, ComplementNB
+from sklearn.linear_model import LogisticRegression
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.metrics import accuracy_score
 
+# === Custom Modules ===
+from module_intent import IntentModel, EmbeddingIntentModel
+
 # === Constants ===
 DEFAULT_TRAINING_DATA_PATH = 'engine/training/training_data.csv'
+DEFAULT_CORRECTIONS_PATH = 'engine/training/corrections.csv'
 DEFAULT_MODEL_PATH = 'engine/pickles/naive_bayes_model.pkl'
 DEFAULT_VECTORIZER_PATH = 'engine/pickles/module_engine_model.pkl'
+DEFAULT_INTENT_MODEL_PATH = 'engine/pickles/intent_model.npz'
+DEFAULT_EMBEDDING_MODEL_PATH = 'engine/pickles/intent_embedding_model.npz'
+DEFAULT_REPORT_PATH = 'engine/training/model_selection.json'
+DEFAULT_LATENCY_BUDGET_MS = 0.5
+TEMPERATURES = [5, 10, 15, 20, 30, 40, 60, 80, 100]  # Softmax scales tried for the embedding model
 
-def delete_existing_files(nb_classifier_path=DEFAULT_MODEL_PATH, vectorizer_path=DEFAULT_VECTORIZER_PATH):
+# Model selection grid (only settings module_intent can reproduce)
+VECTORIZER_GRID = {
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "sublinear_tf": [False, True],
+    "min_df": [1, 2],
+}
+CLASSIFIER_GRID = {
+    "nb": [{"alpha": alpha} for alpha in (0.01, 0.1, 0.5, 1.0)],
+    "complement_nb": [{"alpha": alpha} for alpha in (0.1, 0.5, 1.0)],
+    "logreg": [{"C": c} for c in (1.0, 10.0, 100.0)],
+}
+ONLINE_CLASSIFIERS = ("nb",)  # Exported with the counts IntentModel.partial_fit needs (corrections, "wrong tool")
+
+def delete_existing_files(nb_classifier_path=DEFAULT_MODEL_PATH, vectorizer_path=DEFAULT_VECTORIZER_PATH, intent_model_path=DEFAULT_INTENT_MODEL_PATH):
     """
-    Delete existing model and vectorizer files if they exist.
+    Delete existing model, vectorizer and intent model files if they exist.
     """
-    for file_path in [nb_classifier_path, vectorizer_path]:
+    for file_path in [nb_classifier_path, vectorizer_path, intent_model_path]:
         if os.path.exists(file_path):
             os.remove(file_path)
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: {file_path} deleted successfully.")
 
+def load_training_data(training_data_path=DEFAULT_TRAINING_DATA_PATH, corrections_path=DEFAULT_CORRECTIONS_PATH):
+    """
+    Load the training data together with the corrections logged at runtime.
+
+    Parameters:
+    - training_data_path (str): Path to the training data CSV file.
+    - corrections_path (str): Path to the corrections CSV file.
+
+    Returns:
+    - DataFrame: Training data; a corrected query keeps only its latest label.
+    """
+    df_train = pd.read_csv(training_data_path)
+    if os.path.exists(corrections_path):
+        corrections = pd.read_csv(corrections_path)
+        df_train = pd.concat([df_train, corrections], ignore_index=True).drop_duplicates(subset=['query'], keep='last')
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: {len(corrections)} corrections merged into the training data.")
+    return df_train
+
 def sort_and_save_data(df):
     """
     Sort the training data by labels and save it as a new CSV file.
@@ -43,7 +98,80 @@ def sort_and_save_data(df):
     sorted_df.to_csv('engine/training/sorted_training_data.csv', index=False)
     # print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Data sorted and saved as 'sorted_training_data.csv'.")
 
-def train_and_validate_model(df_train, nb_classifier_path, vectorizer_path):
+def export_intent_model(vectorizer, classifier, intent_model_path, verbose=True):
+    """
+    Export the vectorizer, classifier and calibration as a NumPy artifact for module_intent.
+
+    Parameters:
+    - vectorizer (TfidfVectorizer): The fitted vectorizer.
+    - classifier: A CalibratedClassifierCV (ensemble=False) of a MultinomialNB or ComplementNB,
+      or a multinomial LogisticRegression.
+    - intent_model_path (str): Path to save the artifact.
+    - verbose (bool): Print where the model was saved.
+
+    Returns:
+    - IntentModel: The exported model.
+    """
+    calibration_a = calibration_b = None
+    if isinstance(classifier, CalibratedClassifierCV):
+        calibrators = classifier.calibrated_classifiers_[0].calibrators
+        calibration_a = np.array([calibrator.a_ for calibrator in calibrators])
+        calibration_b = np.array([calibrator.b_ for calibrator in calibrators])
+        classifier = classifier.calibrated_classifiers_[0].estimator
+
+    # Every supported classifier scores classes as intercept + weights @ tfidf, then applies a softmax
+    statistics = {}
+    if isinstance(classifier, MultinomialNB):
+        intercept, weights = classifier.class_log_prior_, classifier.feature_log_prob_
+        statistics = {"feature_count": classifier.feature_count_, "class_count": classifier.class_count_, "alpha": classifier.alpha}
+    elif isinstance(classifier, ComplementNB):
+        intercept, weights = np.zeros(len(classifier.classes_)), classifier.feature_log_prob_
+    elif isinstance(classifier, LogisticRegression):
+        intercept, weights = classifier.intercept_, classifier.coef_
+    else:
+        raise TypeError(f"Cannot export {type(classifier).__name__} as an intent model")
+
+    model = IntentModel(
+        classes=classifier.classes_.tolist(),
+        vocabulary=vectorizer.get_feature_names_out().tolist(),
+        idf=vectorizer.idf_,
+        class_log_prior=intercept,
+        feature_log_prob=weights,
+        calibration_a=calibration_a,
+        calibration_b=calibration_b,
+        token_pattern=vectorizer.token_pattern,
+        lowercase=vectorizer.lowercase,
+        norm=vectorizer.norm or "",
+        sublinear_tf=vectorizer.sublinear_tf,
+        ngram_range=vectorizer.ngram_range,
+        **statistics,
+    )
+    model.save(intent_model_path)
+    if verbose:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Intent model exported to {intent_model_path} ({os.path.getsize(intent_model_path) / 1024:.1f} KB).")
+    return model
+
+def check_intent_model(model, classifier, vectorizer, queries):
+    """
+    Compare the exported model with scikit-learn on the validation queries.
+
+    Parameters:
+    - model (IntentModel): The exported model.
+    - classifier: The scikit-learn classifier it was exported from.
+    - vectorizer (TfidfVectorizer): The fitted vectorizer.
+    - queries (list): Validation queries.
+    """
+    expected = classifier.predict_proba(vectorizer.transform(queries))
+    start = time.perf_counter()
+    actual = np.array([model.predict_proba(query) for query in queries])
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+
+    difference = np.abs(expected - actual).max()
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Intent model matches scikit-learn within {difference:.2e}, {latency:.3f} ms per prediction.")
+    if difference > 1e-4:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Exported intent model differs from scikit-learn.")
+
+def train_and_validate_model(df_train, nb_classifier_path, vectorizer_path, intent_model_path=DEFAULT_INTENT_MODEL_PATH):
     """
     Train a Naive Bayes classifier with TF-IDF vectorization and validate the model.
 
@@ -51,28 +179,23 @@ def train_and_validate_model(df_train, nb_classifier_path, vectorizer_path):
     - df_train (DataFrame): Raw training data.
     - nb_classifier_path (str): Path to save the trained classifier.
     - vectorizer_path (str): Path to save the vectorizer.
+    - intent_model_path (str): Path to save the NumPy intent model artifact.
     """
     # Split data into training and validation sets
     train_df, val_df = train_test_split(df_train, test_size=0.20, stratify=df_train['label'], random_state=42)
 
-    # Remove duplicates and handle data leakage
+    # Remove duplicates and handle data leakage (train_test_split has already shuffled the data)
     train_df, val_df = clean_data(train_df, val_df)
 
-    # Mix up (shuffle) the data to avoid sequential biases
-    for _ in range(3):
-        train_df = train_df.sample(frac=1).reset_index(drop=True)
-        val_df = val_df.sample(frac=1).reset_index(drop=True)
-
     # Train the model
     vectorizer = TfidfVectorizer()
     train_vectors = vectorizer.fit_transform(train_df['query'])
     val_vectors = vectorizer.transform(val_df['query'])
 
     nb_classifier = MultinomialNB(alpha=0.1)
-    nb_classifier.fit(train_vectors, train_df['label'])
 
-    # Calibrate the classifier
-    calibrated_classifier = CalibratedClassifierCV(nb_classifier, method='sigmoid')
+    # Fit and calibrate the classifier (a single calibration of the full classifier, so it can be exported)
+    calibrated_classifier = CalibratedClassifierCV(nb_classifier, method='sigmoid', ensemble=False)
     calibrated_classifier.fit(train_vectors, train_df['label'])
 
     # Validate the model
@@ -81,10 +204,14 @@ def train_and_validate_model(df_train, nb_classifier_path, vectorizer_path):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Validation Accuracy: {accuracy:.2%}")
 
     # Save the model and vectorizer
-    joblib.dump(nb_classifier, nb_classifier_path)
+    joblib.dump(calibrated_classifier, nb_classifier_path)
     joblib.dump(vectorizer, vectorizer_path)
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Model and vectorizer saved successfully.")
 
+    # Export the scikit-learn-free model used at runtime
+    intent_model = export_intent_model(vectorizer, calibrated_classifier, intent_model_path)
+    check_intent_model(intent_model, calibrated_classifier, vectorizer, val_df['query'].tolist())
+
     return accuracy
 
 def clean_data(train_df, val_df):
@@ -113,12 +240,207 @@ def clean_data(train_df, val_df):
 
     return train_df, val_df
 
+# === Model Selection ===
+def candidate_grid():
+    """
+    Enumerate every vectorizer and classifier combination of the selection grid.
+
+    Returns:
+    - list: Candidates as dicts with "name", "vectorizer", "classifier" and "params".
+    """
+    keys = list(VECTORIZER_GRID)
+    candidates = []
+    for values in itertools.product(*(VECTORIZER_GRID[key] for key in keys)):
+        vectorizer_params = dict(zip(keys, values))
+        for classifier, grid in CLASSIFIER_GRID.items():
+            for params in grid:
+                settings = [f"ngram={vectorizer_params['ngram_range'][1]}", f"sublinear={int(vectorizer_params['sublinear_tf'])}", f"min_df={vectorizer_params['min_df']}"]
+                settings += [f"{key}={value}" for key, value in params.items()]
+                candidates.append({
+                    "name": f"{classifier}({', '.join(settings)})",
+                    "vectorizer": vectorizer_params,
+                    "classifier": classifier,
+                    "params": params,
+                })
+    return candidates
+
+def build_candidate(candidate):
+    """
+    Create the unfitted vectorizer and classifier of a candidate.
+
+    Naive Bayes classifiers get the same sigmoid calibration as the default model; logistic
+    regression probabilities are used as they are.
+
+    Parameters:
+    - candidate (dict): A candidate from candidate_grid().
+
+    Returns:
+    - tuple: (TfidfVectorizer, classifier)
+    """
+    vectorizer = TfidfVectorizer(**candidate['vectorizer'])
+    if candidate['classifier'] == "logreg":
+        return vectorizer, LogisticRegression(max_iter=2000, **candidate['params'])
+
+    estimator = MultinomialNB if candidate['classifier'] == "nb" else ComplementNB
+    return vectorizer, CalibratedClassifierCV(estimator(**candidate['params']), method='sigmoid', ensemble=False)
+
+def cross_validate_candidate(candidate, queries, labels, n_splits):
+    """
+    Stratified k-fold accuracy of a candidate (runs in a worker process).
+
+    Parameters:
+    - candidate (dict): A candidate from candidate_grid().
+    - queries (np.ndarray): Training queries.
+    - labels (np.ndarray): Their labels.
+    - n_splits (int): Number of folds.
+
+    Returns:
+    - tuple: (mean accuracy, standard deviation)
+    """
+    scores = []
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    for train_index, test_index in folds.split(queries, labels):
+        vectorizer, classifier = build_candidate(candidate)
+        classifier.fit(vectorizer.fit_transform(queries[train_index]), labels[train_index])
+        predictions = classifier.predict(vectorizer.transform(queries[test_index]))
+        scores.append(accuracy_score(labels[test_index], predictions))
+    return float(np.mean(scores)), float(np.std(scores))
+
+def measure_latency(model, queries, repeats=3):
+    """
+    Per-prediction latency of an exported model on this CPU (best of several passes).
+
+    Parameters:
+    - model (IntentModel): The exported model.
+    - queries (list): Queries to predict.
+    - repeats (int): Number of passes over the queries.
+
+    Returns:
+    - float: Milliseconds per prediction.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for query in queries:
+            model.predict(query)
+        elapsed = (time.perf_counter() - start) / len(queries) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def select_model(df_train, nb_classifier_path, vectorizer_path, intent_model_path=DEFAULT_INTENT_MODEL_PATH,
+                 latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS, n_jobs=-1, report_path=DEFAULT_REPORT_PATH):
+    """
+    Cross-validate the candidate grid in parallel and keep the most accurate model within the latency budget.
+
+    Every candidate is reported, but only those in ONLINE_CLASSIFIERS can be selected, so that
+    corrections keep updating the model at runtime. A more accurate offline-only candidate is
+    pointed out in the report.
+
+    Accuracy comes from stratified k-fold cross-validation. Size and latency are measured on the
+    exported NumPy model, fitted on all data, one candidate at a time so the timings are not
+    disturbed by the parallel workers.
+
+    Parameters:
+    - df_train (DataFrame): Raw training data.
+    - nb_classifier_path (str): Path to save the selected scikit-learn classifier.
+    - vectorizer_path (str): Path to save the selected vectorizer.
+    - intent_model_path (str): Path to save the NumPy intent model artifact.
+    - latency_budget_ms (float): Largest acceptable time per prediction.
+    - n_jobs (int): Worker processes for cross-validation (-1 for one per CPU).
+    - report_path (str): Path to save the JSON report.
+
+    Returns:
+    - dict: Report entry of the selected model.
+    """
+    df_train = df_train.drop_duplicates(subset=['query'])
+    queries, labels = df_train['query'].to_numpy(), df_train['label'].to_numpy()
+    n_splits = int(min(5, df_train['label'].value_counts().min()))
+    candidates = candidate_grid()
+
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Cross-validating {len(candidates)} models ({n_splits} folds, {len(queries)} queries)...")
+    start = time.time()
+    scores = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(cross_validate_candidate)(candidate, queries, labels, n_splits) for candidate in candidates
+    )
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Cross-validation finished in {time.time() - start:.1f}s.")
+
+    results, fitted = [], {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for candidate, (accuracy, deviation) in zip(candidates, scores):
+            vectorizer, classifier = build_candidate(candidate)
+            classifier.fit(vectorizer.fit_transform(queries), labels)
+            artifact_path = os.path.join(workdir, "candidate.npz")
+            model = export_intent_model(vectorizer, classifier, artifact_path, verbose=False)
+            results.append({
+                "name": candidate['name'],
+                "vectorizer": {key: list(value) if isinstance(value, tuple) else value for key, value in candidate['vectorizer'].items()},
+                "classifier": candidate['classifier'],
+                "params": candidate['params'],
+                "online": candidate['classifier'] in ONLINE_CLASSIFIERS,
+                "accuracy": round(accuracy, 4),
+                "accuracy_std": round(deviation, 4),
+                "size_kb": round(os.path.getsize(artifact_path) / 1024, 1),
+                "latency_ms": round(measure_latency(model, queries), 4),
+            })
+            fitted[candidate['name']] = (vectorizer, classifier)
+
+    # Most accurate online model within the budget, faster first on ties
+    ranking = lambda result: (result['accuracy'], -result['latency_ms'])
+    online = [result for result in results if result['online']]
+    within_budget = [result for result in online if result['latency_ms'] <= latency_budget_ms]
+    if within_budget:
+        selected = max(within_budget, key=ranking)
+    else:
+        selected = min(online, key=lambda result: result['latency_ms'])
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: No model meets the {latency_budget_ms} ms budget, using the fastest.")
+
+    note = None
+    offline = [result for result in results if not result['online'] and result['latency_ms'] <= latency_budget_ms]
+    best_offline = max(offline, key=ranking) if offline else None
+    if best_offline and best_offline['accuracy'] > selected['accuracy']:
+        note = (f"{best_offline['name']} is {best_offline['accuracy'] - selected['accuracy']:.2%} more accurate "
+                f"but cannot learn from corrections online, so it was not selected")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: {note}.")
+
+    print(f"\n{'model':<60}{'accuracy':>10}{'std':>8}{'size KB':>10}{'latency ms':>12}")
+    for result in sorted(results, key=lambda result: -result['accuracy']):
+        marker = "*" if result is selected else (" " if result['online'] else "-")
+        print(f"{marker}{result['name']:<59}{result['accuracy']:>10.2%}{result['accuracy_std']:>8.3f}{result['size_kb']:>10.1f}{result['latency_ms']:>12.4f}")
+    print("* selected, - cannot learn online\n")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "cpu": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "queries": len(queries),
+        "folds": n_splits,
+        "latency_budget_ms": latency_budget_ms,
+        "selected": selected['name'],
+        "note": note,
+        "candidates": results,
+    }
+    with open(report_path, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Selected {selected['name']}: {selected['accuracy']:.2%} accuracy, {selected['latency_ms']:.4f} ms per prediction. Report saved to {report_path}.")
+
+    # Save the selected model
+    vectorizer, classifier = fitted[selected['name']]
+    joblib.dump(classifier, nb_classifier_path)
+    joblib.dump(vectorizer, vectorizer_path)
+    intent_model = export_intent_model(vectorizer, classifier, intent_model_path)
+    check_intent_model(intent_model, classifier, vectorizer, queries.tolist())
+
+    return selected
+
 # === Main Function ===
 def train_text_classifier(
     training_data_path=DEFAULT_TRAINING_DATA_PATH,
     nb_classifier_path=DEFAULT_MODEL_PATH,
     vectorizer_path=DEFAULT_VECTORIZER_PATH,
-    user_input='y'
+    user_input='y',
+    intent_model_path=DEFAULT_INTENT_MODEL_PATH,
+    latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS,
+    n_jobs=-1
 ):
     """
     Train a text classification model using labeled training data.
@@ -127,20 +449,130 @@ def train_text_classifier(
     - training_data_path (str): Path to the training data CSV file.
     - nb_classifier_path (str): Path to save the trained Naive Bayes classifier.
     - vectorizer_path (str): Path to save the TF-IDF vectorizer.
-    - user_input (str): User input to control data preparation ('y' for training, 's' for sorting).
+    - user_input (str): User input to control data preparation ('y' for training, 's' for sorting,
+      'g' for a cross-validated grid search over models).
+    - intent_model_path (str): Path to save the NumPy intent model artifact.
+    - latency_budget_ms (float): Largest acceptable time per prediction in grid search mode.
+    - n_jobs (int): Worker processes for the grid search (-1 for one per CPU).
     """
     # print(f"Using scikit-learn version: {sklearn_version}")
 
     # Remove existing model and vectorizer files
-    delete_existing_files(nb_classifier_path, vectorizer_path)
+    delete_existing_files(nb_classifier_path, vectorizer_path, intent_model_path)
 
     # Load the training data
-    df_train = pd.read_csv(training_data_path)
+    df_train = load_training_data(training_data_path)
 
     # Data preparation based on user input
     if user_input.lower() == 's':
         sort_and_save_data(df_train)
     elif user_input.lower() == 'y':
-        train_and_validate_model(df_train, nb_classifier_path, vectorizer_path)
+        train_and_validate_model(df_train, nb_classifier_path, vectorizer_path, intent_model_path)
+    elif user_input.lower() == 'g':
+        select_model(df_train, nb_classifier_path, vectorizer_path, intent_model_path, latency_budget_ms, n_jobs)
     else:
-        print("Script terminated. Run the script again and type 'y' or 's' when prompted.")
\ No newline at end of file
+        print("Script terminated. Run the script again and type 'y', 's' or 'g' when prompted.")
+
+def fit_centroids(vectors, labels, classes):
+    """
+    Compute the unit-length mean embedding of each class.
+
+    Parameters:
+    - vectors (np.ndarray): Unit-length sentence embeddings.
+    - labels (np.ndarray): Label of each embedding.
+    - classes (list): Class labels.
+
+    Returns:
+    - np.ndarray: Centroids (classes x dimensions).
+    """
+    centroids = np.array([vectors[labels == label].mean(axis=0) for label in classes])
+    return centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+
+def train_embedding_classifier(
+    training_data_path=DEFAULT_TRAINING_DATA_PATH,
+    embedding_model_path=DEFAULT_EMBEDDING_MODEL_PATH,
+    intent_model_path=DEFAULT_INTENT_MODEL_PATH
+):
+    """
+    Train a nearest-centroid intent classifier on MiniLM sentence embeddings and compare it
+    with the Naive Bayes model on the same validation split.
+
+    Parameters:
+    - training_data_path (str): Path to the training data CSV file.
+    - embedding_model_path (str): Path to save the embedding intent model.
+    - intent_model_path (str): Path of the Naive Bayes intent model to compare against.
+
+    Returns:
+    - float: Validation accuracy of the embedding model.
+    """
+    from memory.hyperdb import get_embedding  # The MiniLM model used for memory search
+
+    def embed(queries):
+        vectors = np.asarray(get_embedding(list(queries)), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    df_train = load_training_data(training_data_path)
+    train_df, val_df = train_test_split(df_train, test_size=0.20, stratify=df_train['label'], random_state=42)
+    train_df, val_df = clean_data(train_df, val_df)
+
+    classes = sorted(df_train['label'].unique())
+    train_vectors = embed(train_df['query'])
+    val_vectors = embed(val_df['query'])
+    val_labels = val_df['label'].to_numpy()
+
+    # Pick the softmax temperature that gives the best validation log-likelihood
+    model = EmbeddingIntentModel(classes, fit_centroids(train_vectors, train_df['label'].to_numpy(), classes))
+    best_temperature, best_loss = None, None
+    for temperature in TEMPERATURES:
+        model.temperature = temperature
+        loss = -np.mean([
+            np.log(model.predict_proba(vector)[classes.index(label)] + 1e-12)
+            for vector, label in zip(val_vectors, val_labels)
+        ])
+        if best_loss is None or loss < best_loss:
+            best_temperature, best_loss = temperature, loss
+    model.temperature = best_temperature
+
+    start = time.perf_counter()
+    predictions = [model.predict(vector)[0] for vector in val_vectors]
+    head_latency = (time.perf_counter() - start) / len(val_vectors) * 1000
+    accuracy = accuracy_score(val_labels, predictions)
+
+    start = time.perf_counter()
+    for query in val_df['query'].head(20):
+        embed([query])
+    embed_latency = (time.perf_counter() - start) / min(20, len(val_df)) * 1000
+
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Embedding model validation accuracy: {accuracy:.2%} (temperature {best_temperature})")
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Embedding model latency: {head_latency:.3f} ms with the shared embedding, {embed_latency:.1f} ms to embed an utterance")
+
+    # Compare with the Naive Bayes model (trained on the same split)
+    if os.path.exists(intent_model_path):
+        nb_model = IntentModel.load(intent_model_path)
+        start = time.perf_counter()
+        nb_predictions = [nb_model.predict(query)[0] for query in val_df['query']]
+        nb_latency = (time.perf_counter() - start) / len(val_df) * 1000
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Naive Bayes validation accuracy: {accuracy_score(val_labels, nb_predictions):.2%}, {nb_latency:.3f} ms per prediction")
+
+    # Refit the centroids on all data for use at runtime, keeping the sums for incremental updates
+    all_df = df_train.drop_duplicates(subset=['query'])
+    all_vectors, all_labels = embed(all_df['query']), all_df['label'].to_numpy()
+    model.centroids = fit_centroids(all_vectors, all_labels, classes).astype(np.float32)
+    model.class_sums = np.array([all_vectors[all_labels == label].sum(axis=0) for label in classes], dtype=np.float64)
+    model.class_count = np.array([(all_labels == label).sum() for label in classes], dtype=np.float64)
+    model.save(embedding_model_path)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOAD: Embedding intent model saved to {embedding_model_path}.")
+
+    return accuracy
+
+# === Main ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the TARS-AI intent classifiers.")
+    parser.add_argument("--select", action="store_true", help="Cross-validate a grid of models and keep the best within the latency budget")
+    parser.add_argument("--latency-budget", type=float, default=DEFAULT_LATENCY_BUDGET_MS, help="Largest acceptable time per prediction (ms)")
+    parser.add_argument("--jobs", type=int, default=-1, help="Worker processes for model selection (-1 for one per CPU)")
+    args = parser.parse_args()
+
+    train_text_classifier(user_input='g' if args.select else 'y', latency_budget_ms=args.latency_budget, n_jobs=args.jobs)
+    train_embedding_classifier()
+
@@ -0,0 +1,403 @@
+"""
+module_intent.py
+
+Intent Model Module for TARS-AI Application.
+
+Pure-NumPy inference for the intent classifiers trained by module_engineTrainer:
+- IntentModel: TF-IDF + Naive Bayes. The trainer exports the vectorizer, the class
+  log-probabilities and the sigmoid calibration as one compact .npz artifact, so predictions
+  need neither scikit-learn nor joblib and run in a single pass: the utterance is tokenized
+  once, its sparse TF-IDF vector is multiplied with the log-probability matrix once, and the
+  class and its probability both come from that result. Any linear classifier of the same
+  form (ComplementNB, multinomial logistic regression) is exported the same way.
+- EmbeddingIntentModel: nearest class centroid over the MiniLM sentence embedding that memory
+  search computes for the same utterance, so intent detection adds no model of its own.
+
+Both models keep their training statistics (term counts per class, embedding sums per class),
+so labeled utterances can be learned incrementally with partial_fit(), which returns an
+updated copy that can be swapped in while the old one is still serving predictions.
+"""
+
+# === Standard Libraries ===
+import os
+import re
+import copy
+import numpy as np
+
+# === Constants ===
+FORMAT_VERSION = 1
+
+def save_npz(path: str, **arrays):
+    """
+    Write arrays to a compressed .npz file through a temporary file, so readers never see a partial file.
+
+    Parameters:
+    - path (str): Destination path.
+    - arrays: Arrays to store.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(temp_path, path)
+
+class IntentModel:
+    """
+    TF-IDF + Multinomial Naive Bayes intent classifier with optional sigmoid calibration.
+    """
+    def __init__(self, classes, vocabulary, idf, class_log_prior, feature_log_prob,
+                 calibration_a=None, calibration_b=None, token_pattern=r"(?u)\b\w\w+\b",
+                 lowercase=True, norm="l2", sublinear_tf=False, ngram_range=(1, 1),
+                 feature_count=None, class_count=None, alpha=1.0):
+        """
+        Initialize the IntentModel.
+
+        Parameters:
+        - classes (list): Class labels, in column order of the probability matrices.
+        - vocabulary (list): Terms, in column order of the TF-IDF vector.
+        - idf (np.ndarray): Inverse document frequency per term.
+        - class_log_prior (np.ndarray): Log prior per class (the intercept of other linear models).
+        - feature_log_prob (np.ndarray): Log probability of each term per class (classes x terms;
+          the weights of other linear models).
+        - calibration_a, calibration_b (np.ndarray): Sigmoid calibration per class (None when uncalibrated).
+        - token_pattern (str): Regular expression selecting tokens.
+        - lowercase (bool): Lowercase text before tokenizing.
+        - norm (str): "l2", "l1" or "" for no normalization of the TF-IDF vector.
+        - sublinear_tf (bool): Use 1 + log(tf) instead of tf.
+        - ngram_range (tuple): Smallest and largest word n-gram.
+        - feature_count (np.ndarray): Summed TF-IDF weight of each term per class (for partial_fit).
+        - class_count (np.ndarray): Number of training utterances per class (for partial_fit).
+        - alpha (float): Additive smoothing of the Naive Bayes model.
+        """
+        self.classes = [str(label) for label in classes]
+        self.vocabulary = {str(term): index for index, term in enumerate(vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.feature_log_prob = np.asarray(feature_log_prob, dtype=np.float64)
+        self.calibration_a = None if calibration_a is None or len(calibration_a) == 0 else np.asarray(calibration_a, dtype=np.float64)
+        self.calibration_b = None if calibration_b is None or len(calibration_b) == 0 else np.asarray(calibration_b, dtype=np.float64)
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.feature_count = None if feature_count is None or len(feature_count) == 0 else np.asarray(feature_count, dtype=np.float64)
+        self.class_count = None if class_count is None or len(class_count) == 0 else np.asarray(class_count, dtype=np.float64)
+        self.alpha = float(alpha)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        """
+        Load a model exported with save().
+
+        Parameters:
+        - path (str): Path to the .npz artifact.
+
+        Returns:
+        - IntentModel: The model.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['format_version']) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported intent model format {int(data['format_version'])} in {path}")
+            return cls(
+                classes=data['classes'].tolist(),
+                vocabulary=data['vocabulary'].tolist(),
+                idf=data['idf'],
+                class_log_prior=data['class_log_prior'],
+                feature_log_prob=data['feature_log_prob'],
+                calibration_a=data['calibration_a'],
+                calibration_b=data['calibration_b'],
+                token_pattern=str(data['token_pattern']),
+                lowercase=bool(data['lowercase']),
+                norm=str(data['norm']),
+                sublinear_tf=bool(data['sublinear_tf']),
+                ngram_range=data['ngram_range'].tolist(),
+                feature_count=data['feature_count'] if 'feature_count' in data.files else None,
+                class_count=data['class_count'] if 'class_count' in data.files else None,
+                alpha=float(data['alpha']) if 'alpha' in data.files else 1.0,
+            )
+
+    def save(self, path: str):
+        """
+        Write the model as a compressed .npz artifact, replacing any existing file atomically.
+
+        Parameters:
+        - path (str): Destination path.
+        """
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        save_npz(
+            path,
+            format_version=np.array(FORMAT_VERSION),
+            classes=np.array(self.classes),
+            vocabulary=np.array(vocabulary),
+            idf=self.idf.astype(np.float32),
+            class_log_prior=self.class_log_prior,
+            feature_log_prob=self.feature_log_prob.astype(np.float32),
+            calibration_a=self.calibration_a if self.calibration_a is not None else np.empty(0),
+            calibration_b=self.calibration_b if self.calibration_b is not None else np.empty(0),
+            token_pattern=np.array(self.token_pattern.pattern),
+            lowercase=np.array(self.lowercase),
+            norm=np.array(self.norm or ""),
+            sublinear_tf=np.array(self.sublinear_tf),
+            ngram_range=np.array(self.ngram_range),
+            feature_count=self.feature_count if self.feature_count is not None else np.empty(0),
+            class_count=self.class_count if self.class_count is not None else np.empty(0),
+            alpha=np.array(self.alpha),
+        )
+
+    def tokenize(self, text: str) -> list:
+        """
+        Split text into the terms the vectorizer was trained on (words and word n-grams).
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        - list: Terms.
+        """
+        if self.lowercase:
+            text = text.lower()
+        words = self.token_pattern.findall(text)
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return words
+
+        terms = list(words) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            terms.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return terms
+
+    def vectorize(self, text: str) -> tuple:
+        """
+        Compute the sparse TF-IDF vector of a text.
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        - tuple: (indices, values) of the non-zero terms.
+        """
+        counts = {}
+        for term in self.tokenize(text):
+            index = self.vocabulary.get(term)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            values = 1.0 + np.log(values)
+        values *= self.idf[indices]
+
+        if self.norm == "l2":
+            length = np.sqrt(np.dot(values, values))
+        elif self.norm == "l1":
+            length = np.abs(values).sum()
+        else:
+            length = 0.0
+        if length > 0:
+            values /= length
+        return indices, values
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """
+        Compute the (calibrated, when available) probability of each class.
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        - np.ndarray: Probability per class, in the order of self.classes.
+        """
+        indices, values = self.vectorize(text)
+        joint_log_likelihood = self.class_log_prior + self.feature_log_prob[:, indices] @ values
+        probabilities = np.exp(joint_log_likelihood - joint_log_likelihood.max())
+        probabilities /= probabilities.sum()
+
+        if self.calibration_a is None:
+            return probabilities
+        return self.calibrate(probabilities)
+
+    def calibrate(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        Apply the per-class sigmoid calibration fitted by CalibratedClassifierCV.
+
+        Parameters:
+        - probabilities (np.ndarray): Uncalibrated probability per class.
+
+        Returns:
+        - np.ndarray: Calibrated probability per class.
+        """
+        if len(self.classes) == 2:
+            # Binary problems have a single calibrator for the positive class
+            positive = 1.0 / (1.0 + np.exp(self.calibration_a[0] * probabilities[1] + self.calibration_b[0]))
+            return np.array([1.0 - positive, positive])
+
+        calibrated = 1.0 / (1.0 + np.exp(self.calibration_a * probabilities + self.calibration_b))
+        total = calibrated.sum()
+        if total == 0:
+            return np.full(len(self.classes), 1.0 / len(self.classes))
+        return calibrated / total
+
+    def partial_fit(self, texts: list, labels: list) -> "IntentModel":
+        """
+        Learn additional labeled utterances by updating the Naive Bayes statistics.
+
+        The vocabulary, IDF weights and calibration stay as trained; words the vectorizer has
+        never seen are ignored until the next full retrain.
+
+        Parameters:
+        - texts (list): Utterances.
+        - labels (list): Their classes (must be known classes).
+
+        Returns:
+        - IntentModel: An updated copy; this model is left unchanged.
+        """
+        if self.feature_count is None or self.class_count is None:
+            raise ValueError("Intent model has no training statistics, retrain it with module_engineTrainer")
+
+        feature_count = self.feature_count.copy()
+        class_count = self.class_count.copy()
+        for text, label in zip(texts, labels):
+            row = self.classes.index(label)
+            indices, values = self.vectorize(text)
+            feature_count[row, indices] += values
+            class_count[row] += 1
+
+        # Same estimates as MultinomialNB with fit_prior=True
+        smoothed = feature_count + self.alpha
+        model = copy.copy(self)
+        model.feature_count = feature_count
+        model.class_count = class_count
+        model.feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        model.class_log_prior = np.log(class_count) - np.log(class_count.sum())
+        return model
+
+    def predict(self, text: str) -> tuple:
+        """
+        Predict the class of a text.
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        - tuple: (class label, probability).
+        """
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.classes[best], float(probabilities[best])
+
+class EmbeddingIntentModel:
+    """
+    Nearest-centroid intent classifier over unit-length sentence embeddings.
+    """
+    def __init__(self, classes, centroids, temperature=20.0, class_sums=None, class_count=None):
+        """
+        Initialize the EmbeddingIntentModel.
+
+        Parameters:
+        - classes (list): Class labels, in row order of the centroids.
+        - centroids (np.ndarray): Unit-length mean embedding per class (classes x dimensions).
+        - temperature (float): Scale applied to cosine similarities before the softmax.
+        - class_sums (np.ndarray): Sum of the unit-length training embeddings per class (for partial_fit).
+        - class_count (np.ndarray): Number of training utterances per class (for partial_fit).
+        """
+        self.classes = [str(label) for label in classes]
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.temperature = float(temperature)
+        self.class_sums = None if class_sums is None or len(class_sums) == 0 else np.asarray(class_sums, dtype=np.float64)
+        self.class_count = None if class_count is None or len(class_count) == 0 else np.asarray(class_count, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingIntentModel":
+        """
+        Load a model exported with save().
+
+        Parameters:
+        - path (str): Path to the .npz artifact.
+
+        Returns:
+        - EmbeddingIntentModel: The model.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['format_version']) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported intent model format {int(data['format_version'])} in {path}")
+            return cls(
+                data['classes'].tolist(), data['centroids'], float(data['temperature']),
+                class_sums=data['class_sums'] if 'class_sums' in data.files else None,
+                class_count=data['class_count'] if 'class_count' in data.files else None,
+            )
+
+    def save(self, path: str):
+        """
+        Write the model as a compressed .npz artifact, replacing any existing file atomically.
+
+        Parameters:
+        - path (str): Destination path.
+        """
+        save_npz(
+            path,
+            format_version=np.array(FORMAT_VERSION),
+            classes=np.array(self.classes),
+            centroids=self.centroids,
+            temperature=np.array(self.temperature),
+            class_sums=self.class_sums if self.class_sums is not None else np.empty(0),
+            class_count=self.class_count if self.class_count is not None else np.empty(0),
+        )
+
+    def partial_fit(self, vectors: list, labels: list) -> "EmbeddingIntentModel":
+        """
+        Learn additional labeled utterances by moving the class centroids.
+
+        Parameters:
+        - vectors (list): Sentence embeddings of the utterances.
+        - labels (list): Their classes (must be known classes).
+
+        Returns:
+        - EmbeddingIntentModel: An updated copy; this model is left unchanged.
+        """
+        if self.class_sums is None or self.class_count is None:
+            raise ValueError("Embedding intent model has no training statistics, retrain it with module_engineTrainer")
+
+        class_sums = self.class_sums.copy()
+        class_count = self.class_count.copy()
+        for vector, label in zip(vectors, labels):
+            row = self.classes.index(label)
+            vector = np.asarray(vector, dtype=np.float64)
+            class_sums[row] += vector / (np.linalg.norm(vector) or 1.0)
+            class_count[row] += 1
+
+        model = copy.copy(self)
+        model.class_sums = class_sums
+        model.class_count = class_count
+        model.centroids = (class_sums / np.linalg.norm(class_sums, axis=1, keepdims=True)).astype(np.float32)
+        return model
+
+    def predict_proba(self, vector: np.ndarray) -> np.ndarray:
+        """
+        Compute the probability of each class from a sentence embedding.
+
+        Parameters:
+        - vector (np.ndarray): Sentence embedding of the utterance.
+
+        Returns:
+        - np.ndarray: Probability per class, in the order of self.classes.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        scores = self.temperature * (self.centroids @ vector)
+        probabilities = np.exp(scores - scores.max())
+        return probabilities / probabilities.sum()
+
+    def predict(self, vector: np.ndarray) -> tuple:
+        """
+        Predict the class of an utterance from its sentence embedding.
+
+        Parameters:
+        - vector (np.ndarray): Sentence embedding of the utterance.
+
+        Returns:
+        - tuple: (class label, probability).
+        """
+        probabilities = self.predict_proba(vector)
+        best = int(np.argmax(probabilities))
+        return self.classes[best], float(probabilities[best])
@@ -0,0 +1,207 @@
+"""
+module_llm.py
+
+LLM Client Module for TARS-AI Application.
+
+Sends completion requests to an ordered list of LLM backends with:
+- A per-request deadline, so a hung backend cannot freeze the conversation.
+- Hedged requests: if the primary has not answered after a configurable delay, the next
+  backend is asked as well and the first good answer wins.
+- A circuit breaker that skips backends after repeated failures until a cooldown passes.
+- Per-backend latency percentiles.
+"""
+
+# === Standard Libraries ===
+import json
+import time
+import threading
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+# === Constants ===
+LATENCY_WINDOW = 200  # Number of recent latencies kept per backend for percentiles
+
+class LLMClient:
+    """
+    Multi-endpoint HTTP client for the LLM backends.
+    """
+    def __init__(self, config, urls=None, timeout=None):
+        """
+        Initialize the LLMClient.
+
+        Parameters:
+        - config (dict): Configuration dictionary.
+        - urls (list): Backend URLs in priority order. Defaults to base_url followed by fallback_urls.
+        - timeout (float): Seconds before a request is abandoned. Defaults to request_timeout.
+        """
+        self.config = config
+        self.timeout = timeout if timeout is not None else config['LLM']['request_timeout']
+        self.hedge_delay = config['LLM']['hedge_delay']
+        self.breaker_failures = config['LLM']['breaker_failures']
+        self.breaker_cooldown = config['LLM']['breaker_cooldown']
+        self.lock = threading.Lock()
+
+        urls = urls or [config['LLM']['base_url']] + config['LLM']['fallback_urls']
+        self.backends = [
+            {
+                "url": url.rstrip('/'),
+                "session": requests.Session(),  # Keep-alive avoids a new TCP/TLS handshake per turn
+                "failures": 0,
+                "open_until": 0.0,
+                "requests": 0,
+                "errors": 0,
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+            }
+            for url in dict.fromkeys(urls)
+        ]
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(self.backends), thread_name_prefix="LLMClient")
+
+    def available_backends(self) -> list:
+        """
+        Return the backends whose circuit is closed, in priority order.
+
+        Returns:
+        - list: Backends to try. If every circuit is open, all backends are returned.
+        """
+        now = time.time()
+        with self.lock:
+            ready = [backend for backend in self.backends if backend['open_until'] <= now]
+        return ready or list(self.backends)
+
+    def percentiles(self, backend: dict) -> dict:
+        """
+        Compute latency percentiles for a backend.
+
+        Parameters:
+        - backend (dict): The backend.
+
+        Returns:
+        - dict: p50, p95 and p99 latency in seconds (None without samples).
+        """
+        with self.lock:
+            samples = sorted(backend['latencies'])
+        if not samples:
+            return {"p50": None, "p95": None, "p99": None}
+        pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)]
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+    def stats(self) -> dict:
+        """
+        Return request counts, error counts, circuit state and latency percentiles per backend.
+
+        Returns:
+        - dict: Statistics keyed by backend URL.
+        """
+        now = time.time()
+        return {
+            backend['url']: {
+                "requests": backend['requests'],
+                "errors": backend['errors'],
+                "circuit_open": backend['open_until'] > now,
+                **self.percentiles(backend),
+            }
+            for backend in self.backends
+        }
+
+    def _record(self, backend: dict, latency: float = None, error: Exception = None):
+        """
+        Update the circuit breaker and latency statistics after a request.
+
+        Parameters:
+        - backend (dict): The backend.
+        - latency (float): Seconds taken by a successful request.
+        - error (Exception): The error of a failed request.
+        """
+        with self.lock:
+            backend['requests'] += 1
+            if error is None:
+                backend['failures'] = 0
+                backend['open_until'] = 0.0
+                backend['latencies'].append(latency)
+                return
+
+            backend['errors'] += 1
+            backend['failures'] += 1
+            if backend['failures'] >= self.breaker_failures:
+                backend['open_until'] = time.time() + self.breaker_cooldown
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: LLM backend {backend['url']} failed {backend['failures']} times, skipping it for {self.breaker_cooldown}s")
+
+    def _send(self, backend: dict, path: str, headers: dict, data: dict, deadline: float) -> dict:
+        """
+        Send a single request to one backend.
+
+        Parameters:
+        - backend (dict): The backend.
+        - path (str): API path, e.g. /v1/completions.
+        - headers (dict): Request headers.
+        - data (dict): JSON payload.
+        - deadline (float): Absolute time by which the request must finish.
+
+        Returns:
+        - dict: The JSON response.
+        """
+        start = time.time()
+        try:
+            response = backend['session'].post(
+                f"{backend['url']}{path}", headers=headers, data=json.dumps(data), timeout=max(deadline - start, 0.1)
+            )
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            self._record(backend, error=e)
+            raise
+
+        self._record(backend, latency=time.time() - start)
+        return result
+
+    def post(self, path: str, headers: dict, data: dict) -> dict:
+        """
+        Send a request, hedging and failing over across backends until the deadline.
+
+        Parameters:
+        - path (str): API path, e.g. /v1/completions.
+        - headers (dict): Request headers.
+        - data (dict): JSON payload.
+
+        Returns:
+        - dict: The first successful JSON response, or None if every attempt failed or the deadline passed.
+        """
+        start = time.time()
+        deadline = start + self.timeout
+        queue = self.available_backends()
+        pending = {}
+
+        def launch():
+            backend = queue.pop(0)
+            pending[self.executor.submit(self._send, backend, path, headers, data, deadline)] = backend
+
+        launch()
+        hedge_at = start + self.hedge_delay if self.hedge_delay > 0 else None
+
+        while pending:
+            now = time.time()
+            if now >= deadline:
+                break
+            wait_until = min(deadline, hedge_at) if hedge_at and queue else deadline
+            done, _ = wait(pending, timeout=max(wait_until - now, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                backend = pending.pop(future)
+                if future.exception() is None:
+                    p = self.percentiles(backend)
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: LLM {backend['url']} answered in {time.time() - start:.2f}s (p50 {p['p50']:.2f}s, p95 {p['p95']:.2f}s, p99 {p['p99']:.2f}s)")
+                    return future.result()
+
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: LLM request to {backend['url']} failed: {future.exception()}")
+                if queue:
+                    launch()  # Fail over right away
+
+            if hedge_at and queue and time.time() >= hedge_at:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: LLM slow after {self.hedge_delay}s, hedging to {queue[0]['url']}")
+                launch()
+                hedge_at = None
+
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: No LLM backend answered (deadline {self.timeout}s)")
+        return None
@@ -14,29 +14,48 @@ Integrates modules and manages key functionalities, including:
 import os
 import threading
 import json
-import requests
 import re
+import time
 from datetime import datetime
 import concurrent.futures
 
 # === Custom Modules ===
 from module_config import load_config
 from module_btcontroller import start_controls
-from module_engine import check_for_module
+from module_engine import check_for_module, detect_intents, set_query_embedder, correct_last_prediction, prefetch_tools
+from module_tools import tool_registry
 from module_tts import generate_tts_audio
 from module_vision import get_image_caption_from_base64
 from module_stt import STTManager
+from module_contextpacker import ContextPacker
+from module_responsecache import ResponseCache
+from module_llm import LLMClient
+from module_router import TurnRouter
+from module_emotion import EmotionService
+from module_tracing import tracer
+from module_commands import command_matcher
 
 # === Constants and Globals ===
 character_manager = None
 memory_manager = None
 stt_manager = None
+context_packer = None
+response_cache = None
+turn_router = None
+emotion_service = None
 
 CONFIG = load_config()
 
 # Global Variables (if needed)
 stop_event = threading.Event()
-executor = concurrent.futures.ProcessPoolExecutor(max_workers=4)
+# Threads rather than processes: the work is network-bound and the LLM client's
+# circuit breaker and latency statistics must be shared between turns
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+llm_client = LLMClient(CONFIG)
+fast_llm_client = LLMClient(CONFIG, [CONFIG['LLM']['fast_url']], timeout=CONFIG['LLM']['fast_timeout']) if CONFIG['LLM']['fast_url'] else None
+
+# Running totals for prefix (KV) cache reporting
+prompt_cache_totals = {"prompt_tokens": 0, "cached_tokens": 0}
 
 # === Threads ===
 def start_bt_controller_thread():
@@ -51,27 +70,29 @@ def start_bt_controller_thread():
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Error in BT Controller thread: {e}")
 
 # === Core Functions ===
-def extract_text(json_response, picture):
+def extract_text(json_response, picture, backend=None):
     """
     Extracts text from the JSON response. Handles OpenAI's chat.completion and other structures.
 
     Parameters:
     - json_response (dict): The JSON response from the LLM backend.
     - picture (bool): Whether the response contains a picture or not.
+    - backend (str): Backend type that produced the response. Defaults to the configured llm_backend.
 
     Returns:
     - str: The extracted text content from the response.
     """
     global character_manager
+    backend = backend or CONFIG['LLM']['llm_backend']
     
     try:
         # Determine the correct field for text extraction based on response structure
         if 'choices' in json_response:
-            if CONFIG['LLM']['llm_backend'] == "openai":
+            if backend == "openai":
                 # For OpenAI's chat.completion API
                 text_content = json_response['choices'][0]['message']['content']
                 return text_content
-            elif CONFIG['LLM']['llm_backend'] == "ooba" or CONFIG['LLM']['llm_backend'] == "tabby":
+            elif backend == "ooba" or backend == "tabby":
                 # For other backends like Ooba or Tabby
                 text_content = json_response['choices'][0]['text']
         else:
@@ -91,27 +112,14 @@ def extract_text(json_response, picture):
     except (KeyError, IndexError, TypeError) as error:
         return f"Text content could not be found. Error: {str(error)}"
 
-def set_emotion(text_to_read):
+def print_emotion(event):
     """
-    Function to set the emotion of the character based on the text generated by the AI.
+    Log the emotion detected for a reply.
 
     Parameters:
-    - text_to_read (str): The text generated by the AI.
+    - event (dict): Emotion event published by the EmotionService.
     """
-    from transformers import pipeline
-    global memory_manager
-    
-    sizecheck = memory_manager.token_count(text_to_read)
-    if 'length' in sizecheck:
-        value_to_convert = sizecheck['length']
-    
-    if isinstance(value_to_convert, (int, float)):
-        if value_to_convert <= 511:
-            classifier = pipeline(task="text-classification", model="SamLowe/roberta-base-go_emotions", top_k=None)
-            model_outputs = classifier(text_to_read)
-            emotion = max(model_outputs[0], key=lambda x: x['score'])['label']
-            
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Emotion {emotion}")
+    print(f"[{event['timestamp']}] Emotion {event['emotion']} ({event['score']:.2f})")
 
 def llm_process(userinput, botresponse):
     """
@@ -127,16 +135,32 @@ def llm_process(userinput, botresponse):
     global memory_manager
 
     threading.Thread(target=memory_manager.write_longterm_memory, args=(userinput, botresponse)).start()
-    if CONFIG['EMOTION']['enabled'] == True: #set emotion
-        threading.Thread(target=set_emotion, args=(botresponse,)).start()
+    if emotion_service: #set emotion
+        emotion_service.submit(botresponse)
     return botresponse
 
-def build_prompt(user_prompt):
+def toggle_voice_only(user_prompt):
+    """
+    Handle toggling voice-only mode.
+
+    Parameters:
+    - user_prompt (str): The user's input prompt.
+    """
+    global character_manager
+
+    for command in command_matcher.match(user_prompt):
+        if command['name'] == "voice_only_on":
+            character_manager.voice_only = True
+        elif command['name'] == "voice_only_off":
+            character_manager.voice_only = False
+
+def build_prompt(user_prompt, predictions=None):
     """
     Build the prompt structure for the Large Language Model (LLM) backend.
 
     Parameters:
     - user_prompt (str): The user's input prompt.
+    - predictions (list): Intents already detected for the prompt (see detect_intents).
 
     Returns:
     - str: The formatted prompt for the LLM backend.
@@ -147,13 +171,9 @@ def build_prompt(user_prompt):
     date = now.strftime("%m/%d/%Y")
     time = now.strftime("%H:%M:%S")
 
-    # Handle toggling voice-only mode
-    if "voice only mode on" in user_prompt:
-        character_manager.voice_only = True
-    elif "voice only mode off" in user_prompt:
-        character_manager.voice_only = False
+    toggle_voice_only(user_prompt)
 
-    module_engine = check_for_module(user_prompt)
+    module_engine = check_for_module(user_prompt, predictions)
 
     if module_engine == "Mute":
         #somehow needs to go back to listen for wake word
@@ -175,40 +195,50 @@ def build_prompt(user_prompt):
             else:
                 module_engine = f"*Cannot send a picture something went wrong, inform user*"
  
+    if module_engine != "No_Tool":
+        module_engine = module_engine + "\n"
+    else:
+        module_engine = ""
+
     # Build basic prompt structure
     dtg = f"Current Date: {date}\nCurrent Time: {time}\n"
-    past = memory_manager.get_longterm_memory(user_prompt) # Get past memories
-    # Correct the order and logic of replacements clean up memories and past json crap
-    past = past.replace("\\\\", "\\")  # Reduce double backslashes to single
-    past = past.replace("\\n", "\n")   # Replace escaped newline characters with actual newlines
-    past = past.replace("\\'", "'")    # Replace escaped single quotes with actual single quotes
-    past = past.replace("\'", "'")    # Replace escaped single quotes with actual single quotes
-
     history = ""
+    history_pairs = None
     userInput = user_prompt  # Simulating user input to avoid hanging
 
-    if module_engine != "No_Tool":
-        module_engine = module_engine + "\n"
+    if context_packer:
+        past, history_pairs = pack_context(user_prompt, module_engine)
     else:
-        module_engine = ""
-
-    promptsize = (
-        f"System: {CONFIG['LLM']['systemprompt']}\n\n"
-        f"### Instruction: {CONFIG['LLM']['instructionprompt']}\n"
-        f"{dtg}\n"
-        f"User is: {CONFIG['CHAR']['user_details']}\n\n"
-        f"{character_manager.character_card}\n"
-        f"Past Memories which may be helpful to answer {character_manager.char_name}: {past}\n\n"
-        f"{history}\n"
-        #f"{module_engine}"
-        f"Respond to {CONFIG['CHAR']['user_name']}'s message of: {userInput}\n"
-        f"{module_engine}"
-        f"### Response: {character_manager.char_name}: "
-    )
-    # Calc how much space is avail for chat history
-    remaining = memory_manager.token_count(promptsize).get('length', 0)
-    memallocation = int(CONFIG['LLM']['contextsize'] - remaining)
-    history = memory_manager.get_shortterm_memories_tokenlimit(memallocation)
+        past = memory_manager.get_longterm_memory(user_prompt) # Get past memories
+        # Correct the order and logic of replacements clean up memories and past json crap
+        past = past.replace("\\\\", "\\")  # Reduce double backslashes to single
+        past = past.replace("\\n", "\n")   # Replace escaped newline characters with actual newlines
+        past = past.replace("\\'", "'")    # Replace escaped single quotes with actual single quotes
+        past = past.replace("\'", "'")    # Replace escaped single quotes with actual single quotes
+
+    if CONFIG['LLM']['prompt_layout'] == "stable":
+        return build_stable_prompt(userInput, past, module_engine, date, time, history_pairs)
+
+    if history_pairs is not None:
+        history = '\n'.join([f"{{user}}: {ui}\n{{char}}: {br}" for ui, br in history_pairs])
+    else:
+        promptsize = (
+            f"System: {CONFIG['LLM']['systemprompt']}\n\n"
+            f"### Instruction: {CONFIG['LLM']['instructionprompt']}\n"
+            f"{dtg}\n"
+            f"User is: {CONFIG['CHAR']['user_details']}\n\n"
+            f"{character_manager.character_card}\n"
+            f"Past Memories which may be helpful to answer {character_manager.char_name}: {past}\n\n"
+            f"{history}\n"
+            #f"{module_engine}"
+            f"Respond to {CONFIG['CHAR']['user_name']}'s message of: {userInput}\n"
+            f"{module_engine}"
+            f"### Response: {character_manager.char_name}: "
+        )
+        # Calc how much space is avail for chat history
+        remaining = memory_manager.token_count(promptsize).get('length', 0)
+        memallocation = int(CONFIG['LLM']['contextsize'] - remaining)
+        history = memory_manager.get_shortterm_memories_tokenlimit(memallocation)
 
     prompt = (
         f"System: {CONFIG['LLM']['systemprompt']}\n\n"
@@ -234,79 +264,342 @@ def build_prompt(user_prompt):
 
     return prompt
 
-def get_completion(prompt, istext):
+def pack_context(user_prompt, tool_result):
     """
-    Get the completion from the LLM backend.
+    Select the history and memories for the prompt with the context packer.
+
+    Recent turns and vector-retrieved memories are scored against the user's message and packed
+    into the configured token budget. Tool output is pinned and counts against the budget first.
 
     Parameters:
-    - prompt (str): The prompt to send to the LLM backend.
-    - istext (str): Whether the prompt is text or not.
+    - user_prompt (str): The user's input prompt.
+    - tool_result (str): Output from the module engine, or an empty string.
 
     Returns:
-    - str: The generated completion
+    - tuple: (past, history) where past is the text of the selected memories and history
+      the selected (user_input, bot_response) pairs in chronological order.
     """
-    # Check if the prompt is text or not
-    if istext == "True":
-        prompt = build_prompt(prompt)
+    global character_manager, memory_manager, context_packer
 
-    # Set the header for the request
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {CONFIG['LLM']['api_key']}"
-    }
+    # Everything that is always in the prompt limits how much the packer may use
+    fixed = (
+        f"{CONFIG['LLM']['systemprompt']}\n{CONFIG['LLM']['instructionprompt']}\n"
+        f"{CONFIG['CHAR']['user_details']}\n{character_manager.character_card}\n{user_prompt}"
+    )
+    available = int(CONFIG['LLM']['contextsize'] - memory_manager.token_count(fixed).get('length', 0))
+
+    candidates = []
+    if tool_result:
+        candidates.append({"text": tool_result, "source": "tool", "relevance": 1.0, "pinned": True})
+    for memory in memory_manager.get_memory_candidates(user_prompt):
+        candidates.append({
+            "text": memory_manager.format_memory(memory['document']),
+            "source": "history" if memory['recency'] > 0 else "memory",
+            "relevance": memory['similarity'],
+            "recency": memory['recency'],
+            "order": memory['index'],
+            "document": memory['document'],
+        })
+
+    packed = context_packer.pack(candidates, available)
+
+    past = "\n".join(c['text'] for c in packed if c['source'] == "memory")
+    history = [
+        (c['document']['user_input'], c['document']['bot_response'])
+        for c in packed if c['source'] == "history"
+    ]
+    return past or "No relevant memories found.", history
+
+def clean_prompt_text(text):
+    """
+    Replace placeholders and unescape characters left over from stored memories.
+
+    Parameters:
+    - text (str): The prompt text to clean.
+
+    Returns:
+    - str: The cleaned text.
+    """
+    text = text.replace("{user}", CONFIG['CHAR']['user_name'])
+    text = text.replace("{char}", character_manager.char_name)
+    text = text.replace("\\\\", "\\")
+    text = text.replace("\\n", "\n")
+    text = text.replace("\\'", "'")
+    text = text.replace('\\"', '"')
+    text = text.replace('<END>', '')
+    return text
+
+def build_stable_prompt(user_prompt, past, tool_result, date, time, history=None):
+    """
+    Build the prompt as chat messages ordered from most stable to least stable content.
+
+    The system prompt, instructions and character card never change between turns and the
+    chat history only grows at its end, so they go first where the backend can reuse its
+    prefix (KV) cache. Retrieved memories, tool output and the date/time change every turn
+    and are sent last, together with the user's message.
+
+    Parameters:
+    - user_prompt (str): The user's input prompt.
+    - past (str): Retrieved long-term memories.
+    - tool_result (str): Output from the module engine, or an empty string.
+    - date (str): Current date.
+    - time (str): Current time.
+    - history (list): (user_input, bot_response) pairs already selected by the context packer, or None.
+
+    Returns:
+    - list: Chat messages as {"role": ..., "content": ...} dictionaries.
+    """
+    global character_manager, memory_manager
+
+    system = (
+        f"{CONFIG['LLM']['systemprompt']}\n\n"
+        f"### Instruction: {CONFIG['LLM']['instructionprompt']}\n\n"
+        f"User is: {CONFIG['CHAR']['user_details']}\n\n"
+        f"{character_manager.character_card}"
+    )
+    latest = (
+        f"Past Memories which may be helpful to answer {character_manager.char_name}: {past}\n\n"
+        f"{tool_result}"
+        f"Current Date: {date}\nCurrent Time: {time}\n\n"
+        f"Respond to {CONFIG['CHAR']['user_name']}'s message of: {user_prompt}"
+    )
+
+    if history is None:
+        # Calc how much space is avail for chat history
+        fixed = memory_manager.token_count(system + latest).get('length', 0)
+        memallocation = int(CONFIG['LLM']['contextsize'] - fixed)
+        history = memory_manager.get_shortterm_memories_pairs(memallocation)
+
+    messages = [{"role": "system", "content": clean_prompt_text(system)}]
+    for user_input, bot_response in history:
+        messages.append({"role": "user", "content": clean_prompt_text(user_input)})
+        messages.append({"role": "assistant", "content": clean_prompt_text(bot_response)})
+    messages.append({"role": "user", "content": clean_prompt_text(latest)})
+
+    return messages
+
+def messages_to_prompt(messages):
+    """
+    Flatten chat messages into a single completion prompt for text completion backends.
+
+    The message order is kept, so the flattened prompt shares the same stable prefix.
+
+    Parameters:
+    - messages (list): Chat messages as returned by build_stable_prompt.
+
+    Returns:
+    - str: The formatted prompt for the LLM backend.
+    """
+    global character_manager
+
+    prompt = ""
+    for message in messages[:-1]:
+        if message['role'] == "system":
+            prompt += f"System: {message['content']}\n\n"
+        elif message['role'] == "assistant":
+            prompt += f"{character_manager.char_name}: {message['content']}\n"
+        else:
+            prompt += f"{CONFIG['CHAR']['user_name']}: {message['content']}\n"
+
+    prompt += f"\n{messages[-1]['content']}\n"
+    prompt += f"### Response: {character_manager.char_name}: "
+    return prompt
+
+def report_prompt_cache_stats(json_response):
+    """
+    Report the prefix-cache hit ratio and prompt-processing time from an LLM response, where available.
+
+    Understands OpenAI's `usage.prompt_tokens_details.cached_tokens`, llama.cpp's `timings`
+    (`prompt_n`, `cache_n`, `prompt_ms`) and Tabby's `usage.prompt_time` (seconds).
+    Backends that report none of these are ignored.
+
+    Parameters:
+    - json_response (dict): The JSON response from the LLM backend.
+
+    Returns:
+    - dict: prompt_tokens, cached_tokens and prompt_ms (None when not reported).
+    """
+    usage = json_response.get('usage') or {}
+    timings = json_response.get('timings') or {}
+    details = usage.get('prompt_tokens_details') or {}
+
+    stats = {"prompt_tokens": None, "cached_tokens": None, "prompt_ms": timings.get('prompt_ms')}
+
+    if 'prompt_n' in timings and 'cache_n' in timings:
+        # llama.cpp: prompt_n only counts the tokens that had to be evaluated
+        stats['cached_tokens'] = timings['cache_n']
+        stats['prompt_tokens'] = timings['prompt_n'] + timings['cache_n']
+    elif details.get('cached_tokens') is not None:
+        stats['cached_tokens'] = details['cached_tokens']
+        stats['prompt_tokens'] = usage.get('prompt_tokens')
+
+    if stats['prompt_ms'] is None and usage.get('prompt_time') is not None:
+        stats['prompt_ms'] = usage['prompt_time'] * 1000
+
+    if stats['prompt_tokens']:
+        prompt_cache_totals['prompt_tokens'] += stats['prompt_tokens']
+        prompt_cache_totals['cached_tokens'] += stats['cached_tokens']
+        ratio = stats['cached_tokens'] / stats['prompt_tokens']
+        total_ratio = prompt_cache_totals['cached_tokens'] / prompt_cache_totals['prompt_tokens']
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Prompt cache hit {stats['cached_tokens']}/{stats['prompt_tokens']} tokens ({ratio:.0%}, session {total_ratio:.0%})")
+    if stats['prompt_ms'] is not None:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Prompt processing took {stats['prompt_ms']:.0f} ms")
+
+    return stats
+
+def build_request(prompt, messages, backend, model, max_tokens):
+    """
+    Build the API path and payload for an LLM backend.
 
+    Parameters:
+    - prompt (str): The prompt, used when no chat messages are given.
+    - messages (list): Chat messages, or None.
+    - backend (str): Backend type [openai, ooba, tabby].
+    - model (str): Model name (OpenAI only).
+    - max_tokens (int): Maximum tokens to generate.
+
+    Returns:
+    - tuple: API path and JSON payload.
+    """
     # Handle OpenAI backend
-    if CONFIG['LLM']['llm_backend'] == "openai":
-        url = f"{CONFIG['LLM']['base_url']}/v1/chat/completions"
+    if backend == "openai":
+        path = "/v1/chat/completions"
         data = {
-            "model": CONFIG['LLM']['openai_model'],  # GPT-4 or GPT-3.5-turbo
-            "messages": [
+            "model": model,  # GPT-4 or GPT-3.5-turbo
+            "messages": messages or [
                 {"role": "system", "content": CONFIG['LLM']['systemprompt']},
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": CONFIG['LLM']['max_tokens'],
+            "max_tokens": max_tokens,
             "temperature": CONFIG['LLM']['temperature'],
             "top_p": CONFIG['LLM']['top_p']
         }
     # Handle Ooba backend
-    elif CONFIG['LLM']['llm_backend'] == "ooba":
-        url = f"{CONFIG['LLM']['base_url']}/v1/completions"
+    elif backend == "ooba":
+        path = "/v1/completions"
         data = {
-            "prompt": prompt,
-            "max_tokens": CONFIG['LLM']['max_tokens'],
+            "prompt": messages_to_prompt(messages) if messages else prompt,
+            "max_tokens": max_tokens,
             "temperature": CONFIG['LLM']['temperature'],
             "top_p": CONFIG['LLM']['top_p'],
             "seed": CONFIG['LLM']['seed']
         }
     # Handle Tabby backend
-    elif CONFIG['LLM']['llm_backend'] == "tabby":
-        url = f"{CONFIG['LLM']['base_url']}/v1/completions"
+    elif backend == "tabby":
+        path = "/v1/completions"
         data = {
-            "prompt": prompt,
-            "max_tokens": CONFIG['LLM']['max_tokens'],
+            "prompt": messages_to_prompt(messages) if messages else prompt,
+            "max_tokens": max_tokens,
             "temperature": CONFIG['LLM']['temperature'],
             "top_p": CONFIG['LLM']['top_p']
         }
     else:
-        raise ValueError(f"Unsupported LLM backend: {CONFIG['LLM']['llm_backend']}")
+        raise ValueError(f"Unsupported LLM backend: {backend}")
 
-    # Send the request and get the response
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-    try:
-        response.raise_for_status()  # Handle HTTP errors
-    except requests.exceptions.RequestException as e:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: LLM request failed: {e}")
+    return path, data
+
+def get_completion(prompt, istext, predictions=None):
+    """
+    Get the completion from the LLM backend.
+
+    Parameters:
+    - prompt (str): The prompt to send to the LLM backend.
+    - istext (str): Whether the prompt is text or not.
+    - predictions (list): Intents already detected for a text prompt.
+
+    Returns:
+    - str: The generated completion
+    """
+    # Check if the prompt is text or not
+    if istext == "True":
+        prompt = build_prompt(prompt, predictions)
+
+    # The stable layout returns chat messages instead of a single prompt string
+    messages = prompt if isinstance(prompt, list) else None
+
+    # Set the header for the request
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {CONFIG['LLM']['api_key']}"
+    }
+
+    path, data = build_request(prompt, messages, CONFIG['LLM']['llm_backend'], CONFIG['LLM']['openai_model'], CONFIG['LLM']['max_tokens'])
+
+    # Send the request to the first backend that answers within the deadline
+    with tracer.span("llm"):
+        response_json = llm_client.post(path, headers, data)
+    if response_json is None:
         return None  # Return None for failed requests
 
+    report_prompt_cache_stats(response_json)
+
     # Check if the response is successful
     if istext == "False":
-        text_to_read = extract_text(response.json(), True)
+        text_to_read = extract_text(response_json, True)
     else:
-        text_to_read = extract_text(response.json(), False)
+        text_to_read = extract_text(response_json, False)
     text_to_read = text_to_read.replace('<END>', '') # Without this if may continue on forever (max token)
 
     return(text_to_read)
 
+def build_fast_prompt(user_prompt):
+    """
+    Build a trimmed prompt for the fast model: instructions, personality and the last few turns.
+
+    Parameters:
+    - user_prompt (str): The user's input prompt.
+
+    Returns:
+    - list: Chat messages as {"role": ..., "content": ...} dictionaries.
+    """
+    global character_manager, memory_manager
+
+    toggle_voice_only(user_prompt)
+
+    system = (
+        f"{CONFIG['LLM']['systemprompt']}\n\n"
+        f"### Instruction: {CONFIG['LLM']['instructionprompt']}\n\n"
+        f"Personality: {character_manager.personality}"
+    )
+    recent = memory_manager.get_shortterm_memories_recent(CONFIG['LLM']['fast_history_turns'] * 2)
+    history = [
+        (document['user_input'], document['bot_response'])
+        for document in recent if document.get('user_input') and document.get('bot_response')
+    ][-CONFIG['LLM']['fast_history_turns']:]
+
+    messages = [{"role": "system", "content": clean_prompt_text(system)}]
+    for user_input, bot_response in history:
+        messages.append({"role": "user", "content": clean_prompt_text(user_input)})
+        messages.append({"role": "assistant", "content": clean_prompt_text(bot_response)})
+    messages.append({"role": "user", "content": clean_prompt_text(f"Respond to {CONFIG['CHAR']['user_name']}'s message of: {user_prompt}")})
+
+    return messages
+
+def get_fast_completion(text):
+    """
+    Get a completion for a simple turn from the fast model.
+
+    Parameters:
+    - text (str): The user input text.
+
+    Returns:
+    - str: The generated completion, or None if the fast model failed.
+    """
+    messages = build_fast_prompt(text)
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {CONFIG['LLM']['fast_api_key']}"
+    }
+    path, data = build_request(None, messages, CONFIG['LLM']['fast_backend'], CONFIG['LLM']['fast_model'], CONFIG['LLM']['fast_max_tokens'])
+
+    with tracer.span("llm_fast"):
+        response_json = fast_llm_client.post(path, headers, data)
+    if response_json is None:
+        return None
+
+    text_to_read = extract_text(response_json, False, CONFIG['LLM']['fast_backend'])
+    return text_to_read.replace('<END>', '')
+
 def process_completion(text):
     """
     Process the user input and generate a response using the Large Language Model (LLM) backend.
@@ -317,13 +610,71 @@ def process_completion(text):
     Returns:
     - str: The AI-generated response.
     """
+    global response_cache, turn_router
+
+    # Classify once: the cache, the router and the tool section all use these predictions
+    predictions = detect_intents(text)
+    intent, probability = predictions[0] if predictions else (None, 0.0)
+    needs_tool = any(predicted_class in tool_registry.tools for predicted_class, _ in predictions)
+
+    # Answer repeated small talk from the response cache
+    cacheable = False
+    if response_cache:
+        cacheable = not needs_tool and response_cache.is_cacheable(text, intent)
+        if cacheable:
+            fingerprint = response_cache.fingerprint(
+                CONFIG['LLM']['llm_backend'], CONFIG['LLM']['openai_model'], CONFIG['LLM']['systemprompt'],
+                CONFIG['LLM']['instructionprompt'], CONFIG['CHAR']['user_details'],
+                character_manager.character_card, character_manager.voice_only,
+            )
+            with tracer.span("cache"):
+                cached = response_cache.lookup(text, fingerprint)
+            if cached:
+                return llm_process(text, cached)
+
     # Use the executor directly without 'with' statement
-    future = executor.submit(get_completion, text, "True")
-    botres = future.result()
+    start = time.time()
+    route = turn_router.route(text, intent, probability) if turn_router and not needs_tool else "main"
+    botres = None
+    if route == "fast":
+        botres = executor.submit(get_fast_completion, text).result()
+    fallback = route == "fast" and botres is None
+    if botres is None:
+        future = executor.submit(get_completion, text, "True", predictions)
+        botres = future.result()
+    if turn_router:
+        turn_router.record(route, time.time() - start, fallback)
+    if cacheable and botres:
+        response_cache.store(text, fingerprint, botres, time.time() - start)
     reply = llm_process(text, botres)
     return reply
 
+def summarize_memories(conversation):
+    """
+    Summarize a span of past conversation into a compact digest using the LLM backend.
+
+    Parameters:
+    - conversation (str): The conversation turns to summarize.
+
+    Returns:
+    - str: The summary, or None if the request failed.
+    """
+    prompt = (
+        f"Summarize the following conversation between {CONFIG['CHAR']['user_name']} and {character_manager.char_name} "
+        f"in a few short factual sentences. Keep names, facts, preferences and decisions. Leave out greetings and small talk.\n\n"
+        f"{conversation}\n\n"
+        f"Summary: "
+    )
+    return get_completion(prompt, "False")
+
 # === Callback Functions ===
+def idle_callback():
+    """
+    Use the time spent waiting for the wake word to consolidate older memories.
+    """
+    if CONFIG['MEMORY']['digest_enabled']:
+        memory_manager.start_consolidation(summarize_memories)
+
 def wake_word_callback(wake_response):
     """
     Play initial response when wake word is detected.
@@ -331,8 +682,21 @@ def wake_word_callback(wake_response):
     Parameters:
     - wake_response (str): The response to the wake word.
     """
+    memory_manager.stop_consolidation()
     generate_tts_audio(wake_response, CONFIG['TTS']['ttsoption'], CONFIG['TTS']['azure_api_key'], CONFIG['TTS']['azure_region'], CONFIG['TTS']['ttsurl'], CONFIG['TTS']['toggle_charvoice'], CONFIG['TTS']['tts_voice'])
 
+def partial_callback(partial_text):
+    """
+    Start likely tools while the user is still speaking.
+
+    Parameters:
+    - partial_text (str): The partial transcript so far.
+    """
+    try:
+        prefetch_tools(partial_text)
+    except Exception as e:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Tool prefetch failed: {e}")
+
 def utterance_callback(message):
     """
     Process the recognized message from STTManager and stream audio response to speakers.
@@ -349,11 +713,10 @@ def utterance_callback(message):
         #Print the response
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] USER: {message_dict['text']}")
 
-        # Check for shutdown command
-        if "shutdown pc" in message_dict['text'].lower():
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SHUTDOWN: Shutting down the PC...")
-            os.system('shutdown /s /t 0')
-            return  # Exit function after issuing shutdown command
+        # Run exact commands (e.g. shutdown) before any model is involved
+        commands = command_matcher.dispatch(message_dict['text'])
+        if any(command['final'] for command in commands):
+            return  # The command ended the turn
         
         # Process the message using process_completion
         reply = process_completion(message_dict['text'])  # Process the message
@@ -361,19 +724,43 @@ def utterance_callback(message):
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] TARS: {reply}")
         # Stream TTS audio to speakers
         #print("Fetching TTS audio...")
-        generate_tts_audio(reply, CONFIG['TTS']['ttsoption'], CONFIG['TTS']['azure_api_key'], CONFIG['TTS']['azure_region'], CONFIG['TTS']['ttsurl'], CONFIG['TTS']['toggle_charvoice'], CONFIG['TTS']['tts_voice'])
+        stt_manager.set_state("speaking")
+        with tracer.span("tts"):
+            generate_tts_audio(reply, CONFIG['TTS']['ttsoption'], CONFIG['TTS']['azure_api_key'], CONFIG['TTS']['azure_region'], CONFIG['TTS']['ttsurl'], CONFIG['TTS']['toggle_charvoice'], CONFIG['TTS']['tts_voice'])
 
     except json.JSONDecodeError:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Invalid JSON format. Could not process user message.")
     except Exception as e:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: {e}")
+    finally:
+        tool_registry.settle_speculation()  # Drop tool calls started for words the turn did not use
 
-def post_utterance_callback():
+def shutdown_pc(text):
     """
-    Restart listening for another utterance after handling the current one.
+    Shut down the PC on the "shutdown pc" voice command.
+
+    Parameters:
+    - text (str): The user's message.
     """
-    global stt_manager
-    stt_manager._transcribe_utterance()
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SHUTDOWN: Shutting down the PC...")
+    os.system('shutdown /s /t 0')
+
+command_matcher.on("shutdown_pc", shutdown_pc)
+
+def wrong_tool(text):
+    """
+    Teach the intent classifier that the previous utterance needed no tool.
+
+    Parameters:
+    - text (str): The user's message.
+    """
+    if correct_last_prediction("chat"):
+        reply = "Noted. I will not use a tool for that next time."
+    else:
+        reply = "There is nothing to correct."
+    generate_tts_audio(reply, CONFIG['TTS']['ttsoption'], CONFIG['TTS']['azure_api_key'], CONFIG['TTS']['azure_region'], CONFIG['TTS']['ttsurl'], CONFIG['TTS']['toggle_charvoice'], CONFIG['TTS']['tts_voice'])
+
+command_matcher.on("wrong_tool", wrong_tool)
 
 # === Initialization ===
 def initialize_managers(mem_manager, char_manager, stt_mgr):
@@ -385,7 +772,24 @@ def initialize_managers(mem_manager, char_manager, stt_mgr):
     - char_manager: The CharacterManager instance from app.py.
     - stt_mgr: The STTManager instance from app.py.
     """
-    global memory_manager, character_manager, stt_manager
+    global memory_manager, character_manager, stt_manager, context_packer, response_cache, turn_router, emotion_service
     memory_manager = mem_manager
     character_manager = char_manager
     stt_manager = stt_mgr
+
+    # One sentence embedding per utterance, shared by intent detection, memory search and the response cache
+    set_query_embedder(memory_manager.embed_query)
+
+    if CONFIG['LLM']['context_packing']:
+        context_packer = ContextPacker(CONFIG, lambda text: memory_manager.token_count(text).get('length', 0))
+
+    if CONFIG['LLM']['response_cache']:
+        response_cache = ResponseCache(CONFIG, lambda texts: [memory_manager.embed_query(text) for text in texts])
+
+    if fast_llm_client:
+        turn_router = TurnRouter(CONFIG)
+
+    if CONFIG['EMOTION']['enabled']:
+        emotion_service = EmotionService(CONFIG)
+        emotion_service.subscribe(print_emotion)
+        emotion_service.start()
@@ -10,13 +10,19 @@ Ensures contextual and historical knowledge during interactions.
 import os
 import json
 import requests
-from typing import List
+import threading
+from typing import List, Callable
 from datetime import datetime
+from collections import OrderedDict
 from hyperdb import HyperDB
 import numpy as np
 
 # === Custom Modules ===
 from memory.hyperdb import *
+from module_tracing import tracer
+
+# === Constants ===
+QUERY_CACHE_SIZE = 8  # Recent utterances whose embedding is kept
 
 class MemoryManager:
     """
@@ -30,6 +36,11 @@ class MemoryManager:
         self.hyper_db = HyperDB()
         self.long_mem_use = True
         self.initial_memory_path = os.path.abspath("memory/initial_memory.json")
+        self.db_lock = threading.Lock()  # Guards HyperDB writes from reply and digest threads
+        self.digest_thread = None
+        self.digest_stop = threading.Event()
+        self.query_vectors = OrderedDict()  # Embeddings of recent utterances, shared with intent detection and the response cache
+        self.query_lock = threading.Lock()
         self.init_dynamic_memory()
         self.load_initial_memory(self.initial_memory_path)
 
@@ -64,8 +75,9 @@ class MemoryManager:
             "user_input": user_input,
             "bot_response": bot_response,
         }
-        self.hyper_db.add_document(document)
-        self.hyper_db.save(self.memory_db_path)
+        with self.db_lock:
+            self.hyper_db.add_document(document)
+            self.hyper_db.save(self.memory_db_path)
 
     def get_related_memories(self, query: str) -> str:
         """
@@ -79,7 +91,10 @@ class MemoryManager:
         """
         try:
             # Query the memory database for relevant entries
-            results = self.hyper_db.query(query, top_k=1, return_similarities=False)
+            indices, _ = hyper_SVM_ranking_algorithm_sort(
+                self.hyper_db.vectors, self.embed_query(query), top_k=1, metric=self.hyper_db.similarity_metric
+            )
+            results = [self.hyper_db.documents[index] for index in indices]
             
             if results:
                 memory = results[0]
@@ -96,8 +111,10 @@ class MemoryManager:
                     start = max(start_index - prev_count, 0)
                     end = min(start_index + post_count + 1, len(memory_list))
 
-                    # Retrieve and format the context memories
-                    result = [memory_list[i]['document'] for i in range(start, end)]
+                    # Retrieve and format the context memories, preferring digests over raw turns
+                    if memory.get('digest'):
+                        return [memory]
+                    result = self.prefer_digests([memory_list[i]['document'] for i in range(start, end)])
                     return result
                 else:
                     return f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Could not locate memory in the database. Memory: {memory}"
@@ -120,13 +137,133 @@ class MemoryManager:
         try:
             if self.long_mem_use:
                 # Fetch related memories
-                past = self.get_related_memories(user_input)
-                return str(past) if past else "No relevant memories found."
+                with tracer.span("memory"):
+                    past = self.get_related_memories(user_input)
+                if isinstance(past, list):
+                    past = "\n".join(self.format_memory(document) for document in past)
+                return past if past else "No relevant memories found."
             return f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Long-term memory is disabled."
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Error retrieving long-term memory: {e}")
             return "Error retrieving long-term memory."
 
+    def format_memory(self, document: dict) -> str:
+        """
+        Format a memory document as compact prompt text.
+
+        Parameters:
+        - document (dict): The memory document.
+
+        Returns:
+        - str: The memory without timestamps or key names.
+        """
+        user_input = document.get('user_input', "")
+        bot_response = document.get('bot_response', "")
+        if user_input and bot_response:
+            return f"{{user}}: {user_input}\n{{char}}: {bot_response}"
+        if bot_response:
+            return f"{{char}}: {bot_response}"
+        if document.get('digest'):
+            return f"Summary of earlier conversation: {document['digest']}"
+        return document.get('text', "")
+
+    def prefer_digests(self, documents: List[dict]) -> List[dict]:
+        """
+        Replace raw conversation turns that were consolidated into a digest with that digest.
+
+        Parameters:
+        - documents (List[dict]): Memory documents.
+
+        Returns:
+        - List[dict]: Documents with digested turns swapped for their digest, without duplicates.
+        """
+        result = []
+        for document in documents:
+            if 'digest_index' in document:
+                document = self.hyper_db.documents[document['digest_index']]
+            if not any(document is existing for existing in result):
+                result.append(document)
+        return result
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a user utterance once and reuse the vector for the rest of the turn.
+
+        Intent detection, memory search and the response cache all need the sentence embedding
+        of the same message. MiniLM is uncased, so the text is looked up case-insensitively.
+
+        Parameters:
+        - text (str): The utterance.
+
+        Returns:
+        - np.ndarray: The sentence embedding.
+        """
+        key = text.strip().lower()
+        with self.query_lock:
+            if key in self.query_vectors:
+                self.query_vectors.move_to_end(key)
+                return self.query_vectors[key]
+
+        with tracer.span("embed"):
+            vector = np.asarray(self.hyper_db.embedding_function([key])[0], dtype=np.float32)
+
+        with self.query_lock:
+            self.query_vectors[key] = vector
+            while len(self.query_vectors) > QUERY_CACHE_SIZE:
+                self.query_vectors.popitem(last=False)
+        return vector
+
+    def get_memory_candidates(self, query: str, top_k: int = 8, recent_turns: int = 6) -> List[dict]:
+        """
+        Score memories against a query for context packing.
+
+        The query is embedded once and compared against every stored vector. The result holds
+        the most recent conversation turns and the top_k most similar memories.
+
+        Parameters:
+        - query (str): The input query.
+        - top_k (int): Number of most similar memories to include.
+        - recent_turns (int): Number of most recent conversation turns to include.
+
+        Returns:
+        - List[dict]: Candidates with index, document, similarity and recency (1.0 newest, 0.0 not recent).
+        """
+        documents = self.hyper_db.documents
+        if not documents or self.hyper_db.vectors is None or len(self.hyper_db.vectors) == 0:
+            return []
+
+        try:
+            with tracer.span("memory"):
+                query_vector = self.embed_query(query)
+                similarities = self.hyper_db.similarity_metric(self.hyper_db.vectors, query_vector)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Error scoring memories: {e}")
+            return []
+
+        # Most recent conversation turns, newest first
+        recent = []
+        for index in range(len(documents) - 1, -1, -1):
+            if len(recent) >= recent_turns:
+                break
+            if documents[index].get('user_input') and documents[index].get('bot_response'):
+                recent.append(index)
+        recency = {index: 1.0 - position / len(recent) for position, index in enumerate(recent)}
+
+        # Older turns that were consolidated are represented by their digest
+        top = np.argsort(similarities)[-top_k:][::-1]
+        top = [documents[int(i)].get('digest_index', int(i)) for i in top]
+        indices = sorted(set(recent) | set(top))
+
+        return [
+            {
+                "index": i,
+                "document": documents[i],
+                "similarity": float(similarities[i]),
+                "recency": recency.get(i, 0.0),
+            }
+            for i in indices
+        ]
+
     def get_shortterm_memories_recent(self, max_entries: int) -> List[str]:
         """
         Retrieve the most recent short-term memories.
@@ -141,15 +278,15 @@ class MemoryManager:
         memory_dict = self.hyper_db.dict()
         return [entry['document'] for entry in memory_dict[-max_entries:]] # Retrieve the most recent entries
     
-    def get_shortterm_memories_tokenlimit(self, token_limit: int) -> str:
+    def get_shortterm_memories_pairs(self, token_limit: int) -> List[tuple]:
         """
-        Retrieve short-term memories constrained by a token limit.
+        Retrieve the most recent (user_input, bot_response) pairs constrained by a token limit.
 
         Parameters:
         - token_limit (int): Maximum token limit.
 
         Returns:
-        - str: Concatenated memories formatted for output.
+        - List[tuple]: Conversation pairs in chronological order.
         """
         accumulated_documents = []
         accumulated_length = 0
@@ -170,8 +307,20 @@ class MemoryManager:
             accumulated_documents.append((user_input, bot_response))
             accumulated_length += text_length
 
+        return list(reversed(accumulated_documents))
+
+    def get_shortterm_memories_tokenlimit(self, token_limit: int) -> str:
+        """
+        Retrieve short-term memories constrained by a token limit.
+
+        Parameters:
+        - token_limit (int): Maximum token limit.
+
+        Returns:
+        - str: Concatenated memories formatted for output.
+        """
         formatted_output = '\n'.join(
-            [f"{{user}}: {ui}\n{{char}}: {br}" for ui, br in reversed(accumulated_documents)]
+            [f"{{user}}: {ui}\n{{char}}: {br}" for ui, br in self.get_shortterm_memories_pairs(token_limit)]
         )
         return formatted_output
 
@@ -187,8 +336,88 @@ class MemoryManager:
             "timestamp": current_time,
             "bot_response": toolused
         }
-        self.hyper_db.add_document(document)
-        self.hyper_db.save(self.memory_db_path)
+        with self.db_lock:
+            self.hyper_db.add_document(document)
+            self.hyper_db.save(self.memory_db_path)
+
+    def start_consolidation(self, summarizer: Callable[[str], str]):
+        """
+        Start consolidating older conversation turns into digests in a background thread.
+
+        Meant to be called while TARS is idle. Does nothing if a consolidation is already running.
+
+        Parameters:
+        - summarizer (Callable[[str], str]): Returns a short summary of a conversation span.
+        """
+        if self.digest_thread and self.digest_thread.is_alive():
+            return
+        self.digest_stop.clear()
+        self.digest_thread = threading.Thread(
+            target=self.consolidate_memories, args=(summarizer,), name="MemoryDigestThread", daemon=True
+        )
+        self.digest_thread.start()
+
+    def stop_consolidation(self):
+        """
+        Ask the consolidation thread to stop after the span it is currently summarizing.
+        """
+        self.digest_stop.set()
+
+    def consolidate_memories(self, summarizer: Callable[[str], str]) -> int:
+        """
+        Summarize older, not yet digested conversation spans into compact digest memories.
+
+        Digests are stored in HyperDB alongside the raw turns. Each raw turn keeps a
+        `digest_index` pointing at its digest so retrieval can prefer the digest.
+
+        Parameters:
+        - summarizer (Callable[[str], str]): Returns a short summary of a conversation span.
+
+        Returns:
+        - int: Number of digests written.
+        """
+        span_size = self.config['MEMORY']['digest_span']
+        keep_recent = self.config['MEMORY']['digest_keep_recent']
+        documents = self.hyper_db.documents
+
+        # Only full spans of older turns are consolidated; recent history is left verbatim
+        pending = [
+            i for i, document in enumerate(documents[:max(len(documents) - keep_recent, 0)])
+            if document.get('user_input') and document.get('bot_response') and 'digest_index' not in document
+        ]
+        spans = [pending[i:i + span_size] for i in range(0, len(pending) - span_size + 1, span_size)]
+
+        written = 0
+        for span in spans:
+            if self.digest_stop.is_set():
+                break
+
+            conversation = "\n".join(self.format_memory(documents[i]) for i in span)
+            conversation = conversation.replace("{user}", self.config['CHAR']['user_name']).replace("{char}", self.char_name)
+            try:
+                summary = summarizer(conversation)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Memory digest failed: {e}")
+                break
+            if not summary:
+                break
+
+            digest = {
+                "timestamp": documents[span[-1]].get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+                "digest": summary.strip(),
+                "span": [span[0], span[-1]],
+            }
+            with self.db_lock:
+                self.hyper_db.add_document(digest)
+                digest_index = len(self.hyper_db.documents) - 1
+                for i in span:
+                    documents[i]['digest_index'] = digest_index
+                self.hyper_db.save(self.memory_db_path)
+            written += 1
+
+        if written:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Consolidated {written * span_size} conversation turns into {written} digests")
+        return written
 
     def load_initial_memory(self, json_file_path: str):
         """
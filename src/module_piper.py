@@ -7,6 +7,7 @@ import wave
 import re
 import os
 
+from module_tracing import tracer
 
 script_dir = os.path.dirname(__file__)
 model_path = os.path.join(script_dir, 'tts/TARS.onnx')
@@ -30,6 +31,7 @@ async def play_audio(wav_buffer):
     Play audio from a BytesIO buffer.
     """
     data, samplerate = sf.read(wav_buffer, dtype='float32')
+    tracer.mark("first_audio")
     sd.play(data, samplerate)
     await asyncio.sleep(len(data) / samplerate)  # Wait until playback finishes
 
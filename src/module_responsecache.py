@@ -0,0 +1,158 @@
+"""
+module_responsecache.py
+
+Semantic Response Cache Module for TARS-AI Application.
+
+Caches LLM replies keyed on the sentence embedding of the user's message plus a fingerprint
+of the prompt context (system prompt, character, user details). A new message that is close
+enough to a cached one, under the same context and within the TTL, is answered from the
+cache instead of a full LLM round trip. Tool-driven and time-sensitive messages are never
+cached.
+"""
+
+# === Standard Libraries ===
+import re
+import time
+import hashlib
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Callable, Optional
+
+# === Custom Modules ===
+from module_tools import tool_registry
+
+# === Constants ===
+MAX_ENTRIES = 256
+UNCACHEABLE_INTENTS = ("Mute", "Goodbye")  # Non-tool classes whose turn has side effects or a note
+# Messages whose answer depends on when they are asked
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(time|date|day|today|tonight|tomorrow|yesterday|now|currently|latest|recent|weather|forecast|news|see|look|remember)\b",
+    re.IGNORECASE,
+)
+
+class ResponseCache:
+    """
+    Embedding-keyed cache of LLM replies.
+    """
+    def __init__(self, config, embedding_function: Callable):
+        """
+        Initialize the ResponseCache.
+
+        Parameters:
+        - config (dict): Configuration dictionary.
+        - embedding_function (Callable): Maps a list of texts to a list of vectors (MiniLM).
+        """
+        self.config = config
+        self.embedding_function = embedding_function
+        self.threshold = config['LLM']['response_cache_threshold']
+        self.ttl = config['LLM']['response_cache_ttl']
+        self.entries = []
+        self.lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.saved_seconds = 0.0
+        self.last_embedding = (None, None)  # A miss is followed by a store of the same message
+
+    def fingerprint(self, *context) -> str:
+        """
+        Hash everything that shapes a reply apart from the message itself.
+
+        Parameters:
+        - context: Strings such as the system prompt and character card.
+
+        Returns:
+        - str: Fingerprint of the context.
+        """
+        return hashlib.sha1("\x1f".join(str(part) for part in context).encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, message: str, intent: Optional[str] = None) -> bool:
+        """
+        Check whether a message may be answered from or stored in the cache.
+
+        Parameters:
+        - message (str): The user's message.
+        - intent (str): Class predicted by the intent engine (None or "chat" for small talk).
+
+        Returns:
+        - bool: False for tool-driven or time-sensitive messages.
+        """
+        if intent in tool_registry.tools or intent in UNCACHEABLE_INTENTS:
+            return False
+        return not TIME_SENSITIVE_PATTERN.search(message)
+
+    def embed(self, message: str) -> np.ndarray:
+        """
+        Embed and normalize a message.
+
+        Parameters:
+        - message (str): The user's message.
+
+        Returns:
+        - np.ndarray: Unit-length embedding.
+        """
+        key = message.strip().lower()
+        if self.last_embedding[0] == key:
+            return self.last_embedding[1]
+
+        vector = np.asarray(self.embedding_function([key])[0], dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        self.last_embedding = (key, vector)
+        return vector
+
+    def lookup(self, message: str, fingerprint: str) -> Optional[str]:
+        """
+        Return a cached reply for a similar message under the same context.
+
+        Parameters:
+        - message (str): The user's message.
+        - fingerprint (str): Context fingerprint.
+
+        Returns:
+        - str: The cached reply, or None on a miss.
+        """
+        vector = self.embed(message)
+        now = time.time()
+
+        with self.lock:
+            self.lookups += 1
+            self.entries = [e for e in self.entries if now - e['created'] <= self.ttl]
+            candidates = [e for e in self.entries if e['fingerprint'] == fingerprint]
+            if not candidates:
+                return None
+
+            similarities = np.stack([e['vector'] for e in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            entry = candidates[best]
+            entry['hits'] += 1
+            self.hits += 1
+            self.saved_seconds += entry['latency']
+
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Response cache hit (similarity {similarities[best]:.2f}), saved {entry['latency']:.2f}s. Hit rate {self.hits}/{self.lookups}, {self.saved_seconds:.1f}s saved in total")
+        return entry['reply']
+
+    def store(self, message: str, fingerprint: str, reply: str, latency: float):
+        """
+        Cache a reply.
+
+        Parameters:
+        - message (str): The user's message.
+        - fingerprint (str): Context fingerprint.
+        - reply (str): The LLM's reply.
+        - latency (float): Seconds the LLM took, reported as saved on later hits.
+        """
+        entry = {
+            "vector": self.embed(message),
+            "fingerprint": fingerprint,
+            "reply": reply,
+            "latency": latency,
+            "created": time.time(),
+            "hits": 0,
+        }
+        with self.lock:
+            self.entries.append(entry)
+            if len(self.entries) > MAX_ENTRIES:
+                self.entries.pop(0)
@@ -0,0 +1,98 @@
+"""
+module_router.py
+
+Turn Routing Module for TARS-AI Application.
+
+Decides per user turn whether the reply can come from a small, local "fast" model with a
+trimmed prompt, or needs the main LLM backend with the full context. The decision reuses
+the intent engine's prediction and the length of the message, so it costs next to nothing.
+Routing decisions and per-route latency are recorded.
+"""
+
+# === Standard Libraries ===
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+# === Constants ===
+SIMPLE_INTENTS = (None, "chat")  # Intents that need neither a tool nor the full context
+COMPLEX_PATTERN = re.compile(
+    r"\b(why|how|explain|describe|compare|remember|recall|story|tell me about|what do you think)\b",
+    re.IGNORECASE,
+)
+LATENCY_WINDOW = 200
+
+class TurnRouter:
+    """
+    Routes user turns to the "fast" or "main" LLM.
+    """
+    def __init__(self, config):
+        """
+        Initialize the TurnRouter.
+
+        Parameters:
+        - config (dict): Configuration dictionary.
+        """
+        self.config = config
+        self.max_words = config['LLM']['fast_max_words']
+        self.lock = threading.Lock()
+        self.stats = {
+            route: {"turns": 0, "fallbacks": 0, "latencies": deque(maxlen=LATENCY_WINDOW)}
+            for route in ("fast", "main")
+        }
+
+    def route(self, text: str, intent: str = None, probability: float = 0.0) -> str:
+        """
+        Classify a turn as simple ("fast") or complex ("main").
+
+        Parameters:
+        - text (str): The user's message.
+        - intent (str): Class predicted by the intent engine, None when no tool is needed.
+        - probability (float): Confidence of the intent prediction.
+
+        Returns:
+        - str: "fast" or "main".
+        """
+        words = len(text.split())
+        simple = intent in SIMPLE_INTENTS and words <= self.max_words and not COMPLEX_PATTERN.search(text)
+        route = "fast" if simple else "main"
+
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Routing turn to {route} model ({words} words, intent {intent} at {probability:.2f})")
+        return route
+
+    def record(self, route: str, latency: float, fallback: bool = False):
+        """
+        Record the latency of a routed turn.
+
+        Parameters:
+        - route (str): "fast" or "main".
+        - latency (float): Seconds until the reply was available.
+        - fallback (bool): True if the fast model failed and the main model answered instead.
+        """
+        with self.lock:
+            stats = self.stats[route]
+            stats['turns'] += 1
+            stats['fallbacks'] += int(fallback)
+            stats['latencies'].append(latency)
+            samples = sorted(stats['latencies'])
+
+        p50 = samples[len(samples) // 2]
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: {route} route answered in {latency:.2f}s (p50 {p50:.2f}s over {len(samples)} turns)")
+
+    def summary(self) -> dict:
+        """
+        Return turn counts, fallbacks and median latency per route.
+
+        Returns:
+        - dict: Statistics keyed by route.
+        """
+        with self.lock:
+            return {
+                route: {
+                    "turns": stats['turns'],
+                    "fallbacks": stats['fallbacks'],
+                    "p50": sorted(stats['latencies'])[len(stats['latencies']) // 2] if stats['latencies'] else None,
+                }
+                for route, stats in self.stats.items()
+            }
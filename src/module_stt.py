@@ -6,27 +6,51 @@ Speech-to-Text (STT) Module for TARS-AI Application.
 This module integrates both local and server-based transcription, wake word detection, 
 and voice command handling. It supports custom callbacks to trigger actions upon 
 detecting speech or specific keywords.
+
+All stages read from one persistent audio capture (module_audio), so the microphone is opened
+once and each transcription can start from audio captured just before it (the pre-roll).
+A streaming voice activity detector ends each utterance shortly after the user stops speaking.
+
+The STT thread runs an explicit conversation state machine (see STATES):
+    sleeping --wake word--> listening --speech--> processing --> speaking --> follow_up
+    follow_up --speech--> processing (no wake word needed)
+    listening / follow_up --nothing said before the timeout--> sleeping
+Each state is handled by one call that returns to the loop, so the stack stays flat over long
+conversations, and the time spent in each state is measured (STTManager.state_stats()).
 """
 
 # === Standard Libraries ===
 import os
 import random
-import sounddevice as sd
 from vosk import Model, KaldiRecognizer
-from pocketsphinx import LiveSpeech
+from pocketsphinx import Pocketsphinx
 import threading
 import requests
 from datetime import datetime
 from io import BytesIO
 import time
-import wave
 import numpy as np
+import soundfile as sf
 import json
 from typing import Callable, Optional
 
+# === Custom Modules ===
+from module_tracing import tracer
+from module_audio import AudioCapture, ChunkController, VoiceActivityDetector
+
 #needed to supress warning
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Conversation states, in the order a turn goes through them
+STATES = ("sleeping", "listening", "processing", "speaking", "follow_up")
+
+# Upload codec -> (soundfile format, subtype, file name, MIME type)
+AUDIO_CODECS = {
+    "flac": ("FLAC", "PCM_16", "audio.flac", "audio/flac"),
+    "opus": ("OGG", "OPUS", "audio.ogg", "audio/ogg"),
+    "wav": ("WAV", "PCM_16", "audio.wav", "audio/wav"),
+}
+
 # === Class Definition ===
 class STTManager:
     def __init__(self, config, shutdown_event: threading.Event, amp_gain: float = 4.0):
@@ -43,10 +67,31 @@ class STTManager:
         self.running = False
         self.wake_word_callback: Optional[Callable[[str], None]] = None
         self.utterance_callback: Optional[Callable[[str], None]] = None
+        self.partial_callback: Optional[Callable[[str], None]] = None
         self.amp_gain = amp_gain  # Amplification gain factor
-        self.post_utterance_callback: Optional[Callable] = None
+        self.idle_callback: Optional[Callable] = None
         self.vosk_model = None
-        self.silence_threshold = 10  # Default value; updated dynamically
+        self.wake_time = None  # When the wake word was last heard, for tracing
+        self.wake_decoder = None  # Pocketsphinx keyword spotter, created on first use
+        self.preroll = self.config['STT']['preroll']
+        self.stream_audio = self.config['STT']['stream_audio']
+        self.audio_codec = self.config['STT']['audio_codec']
+        self.stream_end = None  # When the last streamed utterance ended, for tracing
+        self.stream_bytes = 0   # Bytes of the last streamed utterance
+        self.trim_silence = self.config['STT']['trim_silence']
+        self.trim_margin = self.config['STT']['trim_margin']
+        self.trimmed_seconds = 0.0  # Silence kept away from the recognizer this session
+        self.listen_position = None  # Where the next transcription starts in the capture (None: now minus the pre-roll)
+        self.capture = AudioCapture(sample_rate=self.SAMPLE_RATE)
+        self.vad = VoiceActivityDetector(self.SAMPLE_RATE, margin_db=self.config['STT']['vad_margin'],
+                                         hangover=self.config['STT']['vad_hangover'])
+        self.no_speech_timeout = self.config['STT']['no_speech_timeout']
+        self.follow_up_window = self.config['STT']['follow_up_window']
+        self.listen_timeout = self.no_speech_timeout  # Seconds the current utterance waits for speech
+        self.state = None
+        self.state_since = None
+        self.state_counters = {state: {"entries": 0, "seconds": 0.0, "max_seconds": 0.0} for state in STATES}
+        self.max_utterance = self.config['STT']['max_utterance']
         self.WAKE_WORD = self.config['STT']['wake_word']
         self.TARS_RESPONSES = [
             "Yes? What do you need?",
@@ -61,6 +106,7 @@ class STTManager:
             "Online and awaiting your command."
         ]
         self._load_vosk_model()
+        self.capture.start()
         self._measure_background_noise()
 
     def _download_vosk_model(self, url, dest_folder):
@@ -110,44 +156,27 @@ class STTManager:
 
     def _measure_background_noise(self):
         """
-        Measure the background noise level for 2-3 seconds and set the silence threshold.
+        Measure the background noise for 2-3 seconds to seed the VAD's noise floor (which keeps
+        tracking it afterwards).
         """
-        silence_margin = 1.0  # Add a 20% margin to background noise level
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Measuring background noise...")
 
         spinner = ['|', '/', '-', '\\']  # Spinner symbols
         try:
-            background_rms_values = []
-            total_frames = 20  # 20 frames ~ 2-3 seconds
-
-            with sd.InputStream(
-                samplerate=self.SAMPLE_RATE,
-                channels=1,
-                dtype="int16",
-                blocksize=8000,  # Larger block size
-                latency='high',  # High latency to reduce underruns
-            ) as stream:                    
-                for i in range(total_frames):
-                    data, _ = stream.read(4000)
-                    data = self.amplify_audio(data)  # Apply amplification here
-                    if data.size == 0 or not np.isfinite(data).all():
-                        rms = 0  # Assign zero RMS for invalid or empty data
-                    else:
-                        rms = np.sqrt(np.mean(np.square(data)))
-                    background_rms_values.append(rms)
+            total_frames = 10  # 10 frames ~ 2.5 seconds
 
-                    # Display spinner animation
-                    spinner_frame = spinner[i % len(spinner)]  # Rotate spinner symbol
-                    print(f"\r[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Measuring... {spinner_frame}", end="", flush=True)
-                    time.sleep(0.1)  # Simulate processing time for smooth animation
+            reader = self.capture.reader()
+            for i in range(total_frames):
+                data, _ = reader.read(4000)
+                self.vad.process(data)
 
-            # Calculate the threshold
-            background_noise = np.mean(background_rms_values)
-            self.silence_threshold = max(background_noise * silence_margin, 10)  # Avoid setting a very low threshold
+                # Display spinner animation
+                spinner_frame = spinner[i % len(spinner)]  # Rotate spinner symbol
+                print(f"\r[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Measuring... {spinner_frame}", end="", flush=True)
 
             # Clear the spinner and print the result
             print(f"\r{' ' * 40}\r", end="", flush=True)  # Clear the line
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Silence threshold set to: {self.silence_threshold:.2f}")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Noise floor set to: {self.vad.noise_db:.1f} dB")
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Failed to measure background noise: {e}")
@@ -164,11 +193,17 @@ class STTManager:
         """
         self.utterance_callback = callback
 
-    def set_post_utterance_callback(self, callback):
+    def set_partial_callback(self, callback: Callable[[str], None]):
         """
-        Set a callback to execute after the utterance is handled.
+        Set the callback function for partial transcripts while the user is speaking (Vosk only).
         """
-        self.post_utterance_callback = callback
+        self.partial_callback = callback
+
+    def set_idle_callback(self, callback: Callable):
+        """
+        Set a callback to execute when going back to sleep (waiting for the wake word).
+        """
+        self.idle_callback = callback
 
     def start(self):
         """
@@ -187,18 +222,65 @@ class STTManager:
         self.running = False
         self.shutdown_event.set()
         self.thread.join()
+        self.capture.stop()
+
+    def set_state(self, state: str):
+        """
+        Move the conversation to a new state, timing the one it leaves.
+
+        Parameters:
+        - state (str): One of STATES.
+        """
+        if state not in STATES:
+            raise ValueError(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Unknown STT state: {state}")
+        now = time.perf_counter()
+        if self.state is not None:
+            seconds = now - self.state_since
+            counters = self.state_counters[self.state]
+            counters['seconds'] += seconds
+            counters['max_seconds'] = max(counters['max_seconds'], seconds)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: State {self.state} -> {state} after {seconds * 1000:.0f}ms")
+        self.state_counters[state]['entries'] += 1
+        self.state = state
+        self.state_since = now
+
+    def state_stats(self) -> dict:
+        """
+        Time spent in each conversation state.
+
+        Returns:
+        - dict: State -> entries, total seconds and mean/max milliseconds per entry.
+        """
+        report = {}
+        for state, counters in self.state_counters.items():
+            entries = counters['entries']
+            report[state] = {
+                "entries": entries,
+                "total_s": round(counters['seconds'], 1),
+                "mean_ms": round(counters['seconds'] / entries * 1000, 1) if entries else None,
+                "max_ms": round(counters['max_seconds'] * 1000, 1),
+            }
+        return report
 
     def _stt_processing_loop(self):
         """
-        Main loop to detect wake words and process utterances.
+        Run the conversation state machine until stopped (see STATES).
         """
         try:
-            while self.running:
-                if self.shutdown_event.is_set():
-                    break
-                if self._detect_wake_word():
-                    # If wake word detected, transcribe the user utterance
-                    self._transcribe_utterance()
+            self.set_state("sleeping")
+            while self.running and not self.shutdown_event.is_set():
+                if self.state == "sleeping":
+                    if self._detect_wake_word():
+                        self.set_state("listening")
+                    continue
+
+                # listening or follow_up: one utterance, handled before returning here
+                timeout = self.no_speech_timeout if self.state == "listening" else self.follow_up_window
+                if self._transcribe_utterance(timeout) and self.follow_up_window > 0:
+                    self.listen_position = self.capture.position  # Only what is said after the reply
+                    self.set_state("follow_up")
+                else:
+                    self.set_state("sleeping")
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Error in STT processing loop: {e}")
         finally:
@@ -221,18 +303,34 @@ class STTManager:
         Detect the wake word using Pocketsphinx.
         """
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] TARS: Sleeping...")
+        if self.idle_callback:
+            self.idle_callback()
         try:
-            with sd.InputStream(samplerate=self.SAMPLE_RATE, channels=1, dtype="int16") as stream:
-                speech = LiveSpeech(lm=False, keyphrase=self.WAKE_WORD, kws_threshold=1e-20)
-                for phrase in speech:
-                    if self.WAKE_WORD in phrase.hypothesis().lower():
-                        wake_response = random.choice(self.TARS_RESPONSES)
-                        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] TARS: {wake_response}")
-
-                        # If a callback is set, send the wake_response
-                        if self.wake_word_callback:
-                            self.wake_word_callback(wake_response)
-                        return True
+            if self.wake_decoder is None:
+                self.wake_decoder = Pocketsphinx(lm=False, keyphrase=self.WAKE_WORD, kws_threshold=1e-20)
+
+            reader = self.capture.reader()
+            self.wake_decoder.start_utt()
+            while not self.shutdown_event.is_set():
+                data, _ = reader.read(2048)
+                self.vad.process(data)  # Keep the noise floor tracking the room
+                self.wake_decoder.process_raw(data.tobytes(), False, False)
+                hypothesis = self.wake_decoder.hyp()
+                if hypothesis and self.WAKE_WORD in hypothesis.hypstr.lower():
+                    self.wake_decoder.end_utt()
+                    self.wake_time = time.perf_counter()
+                    # Transcribe from just before the end of the wake word
+                    self.listen_position = reader.position - int(self.preroll * self.SAMPLE_RATE)
+                    wake_response = random.choice(self.TARS_RESPONSES)
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] TARS: {wake_response}")
+
+                    # If a callback is set, send the wake_response
+                    if self.wake_word_callback:
+                        self.wake_word_callback(wake_response)
+                        # Skip the spoken wake response, keeping the pre-roll before the user's turn
+                        self.listen_position = max(self.listen_position, self.capture.position - int(self.preroll * self.SAMPLE_RATE))
+                    return True
+            self.wake_decoder.end_utt()
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Wake word detection failed: {e}")
         return False
@@ -243,56 +341,187 @@ class STTManager:
         # self.wake_word_callback(wake_response)
         # return True
 
-    def _transcribe_utterance(self):
+    def _listen_reader(self):
         """
-        Process a user utterance after wake word detection.
+        Create the reader for a transcription, starting at the listen position or the pre-roll.
+        """
+        if self.listen_position is None:
+            return self.capture.reader(self.preroll)
+        reader = self.capture.reader(position=self.listen_position)
+        self.listen_position = None
+        return reader
+
+    def _endpoint(self, data: np.ndarray) -> Optional[str]:
+        """
+        Run the VAD over the next block of an utterance and decide whether to stop listening.
+
+        Parameters:
+        - data (np.ndarray): Raw samples following the previous block (after vad.reset()).
+
+        Returns:
+        - str: None to keep listening, "end" when the user stopped speaking, "no_speech" when
+          nobody spoke within listen_timeout, "limit" at max_utterance seconds.
+        """
+        for event, position in self.vad.process(data):
+            if event == "start":
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Speech detected.")
+            else:
+                # Time from the end of speech to noticing it (hangover plus buffering)
+                tracer.record("stt_endpoint", (self.capture.position - position) / self.SAMPLE_RATE)
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Silence detected.")
+                return "end"
+
+        if self.vad.speech_start is None and self.vad.seconds >= self.listen_timeout:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: No speech heard within {self.listen_timeout}s.")
+            return "no_speech"
+        if self.vad.seconds >= self.max_utterance:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Utterance reached the {self.max_utterance}s limit.")
+            return "limit"
+        return None
+
+    def _transcribe_utterance(self, timeout: float = None) -> bool:
+        """
+        Listen for one utterance and hand it to the utterance callback (which processes it and
+        speaks the reply).
+
+        Parameters:
+        - timeout (float): Seconds to wait for the user to start speaking (default: no_speech_timeout).
+
+        Returns:
+        - bool: Whether the user said something.
         """
         #print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Listening...")
+        heard = False
         try:
+            tracer.begin_turn()
+            if self.wake_time:
+                tracer.record("wake", time.perf_counter() - self.wake_time)
+                self.wake_time = None
+            tracer.start("stt")
+            self.listen_timeout = self.no_speech_timeout if timeout is None else timeout
+
             if self.config['STT']['use_server']:
                 result = self._transcribe_with_server()
             else:
                 result = self._transcribe_with_vosk()
-            
-            # Call post-utterance callback if utterance was detected recently, otherwise return to wake word detection
-            if self.post_utterance_callback and result:
-                if not hasattr(self, 'loopcheck'):
-                    self.loopcheck = 0 
-
-                self.loopcheck += 1
-                if self.loopcheck > 10:
-                    print(f"\r{' ' * 40}\r", end="", flush=True)  # Clear the last line
-                    self._detect_wake_word()
-                    return
-                
-                self.post_utterance_callback()
+
+            if result:
+                heard = bool(json.loads(result).get("text"))
+                if heard:
+                    self.set_state("processing")
+                if self.utterance_callback:
+                    self.utterance_callback(result)
+            tracer.end_turn()
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Utterance transcription failed: {e}")
+        return heard
 
     def _transcribe_with_vosk(self):
         """
         Transcribe audio using the local Vosk model.
+
+        The VAD listens ahead; Vosk only decodes the speech region (see _speech_region()),
+        through a second reader that starts just before speech started.
         """
         recognizer = KaldiRecognizer(self.vosk_model, self.SAMPLE_RATE)
-        with sd.InputStream(
-            samplerate=self.SAMPLE_RATE,
-            channels=1,
-            dtype="int16",
-            blocksize=8000,  # Larger block size
-            latency='high'
-        ) as stream:
-            for _ in range(50):  # Limit duration (~12.5 seconds)
-                data, _ = stream.read(4000)
-                data = self.amplify_audio(data)  # Apply amplification here
-                if recognizer.AcceptWaveform(data.tobytes()):
-                    result = recognizer.Result()
-                    # print(f"[DEBUG] Recognized: {result}")
-                    if self.utterance_callback:
-                        self.utterance_callback(result)
-                    return result
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: No valid transcription within duration limit.")
+        reader = self._listen_reader()
+        self.vad.reset(reader.position)
+        decoder = None  # Reader of the audio passed to Vosk, created when speech starts
+        chunks = ChunkController(self.SAMPLE_RATE)
+        overflows = self.capture.overflows
+
+        # The capture thread keeps filling the ring while this thread decodes
+        while True:
+            data, _ = reader.read(chunks.size)
+            endpoint = self._endpoint(data)
+            if self.vad.speech_start is None:
+                if endpoint:
+                    break  # Nobody spoke
+                continue  # Nothing to decode before the user speaks
+            begin, stop = self._speech_region(reader.position)
+            if decoder is None:
+                decoder = self.capture.reader(position=begin)
+            if not endpoint:
+                stop = reader.position  # The end of speech is not known yet
+            data, _ = decoder.read(max(stop - decoder.position, 0))
+
+            start = time.perf_counter()
+            data = self.amplify_audio(data)  # Apply amplification here
+            accepted = recognizer.AcceptWaveform(data.tobytes())
+            if accepted:
+                result = recognizer.Result()
+            elif endpoint:
+                result = recognizer.FinalResult()  # The VAD heard the end before Vosk's own endpointer
+            chunks.update(len(data), time.perf_counter() - start, reader.backlog)
+
+            if accepted and not endpoint and not json.loads(result).get("text"):
+                continue  # Vosk closed a segment of noise before the user spoke
+            if accepted or endpoint:
+                tracer.stop("stt")
+                self._report_decoder(chunks, reader, overflows)
+                self._report_trim(reader.position - self.vad.origin, int(chunks.audio_seconds * self.SAMPLE_RATE), chunks.rtf)
+                # print(f"[DEBUG] Recognized: {result}")
+                return result
+            if self.partial_callback:
+                partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                if partial:
+                    self.partial_callback(partial)
+        self._report_decoder(chunks, reader, overflows)
         return None
+
+    def _report_decoder(self, chunks, reader, overflows):
+        """
+        Log how well the decoder kept up with the capture during an utterance.
+
+        Parameters:
+        - chunks (ChunkController): The decoder's chunk controller.
+        - reader (AudioReader): The reader it decoded from.
+        - overflows (int): Device overflow count when the utterance started.
+        """
+        tracer.record("stt_decode", chunks.decode_seconds)
+        print(
+            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Decoder RTF {chunks.rtf:.2f} over {chunks.audio_seconds:.1f}s "
+            f"(chunk {chunks.size}, {chunks.resizes} resizes, {reader.waits} underflows, {reader.lost} samples lost, "
+            f"{self.capture.overflows - overflows} device overflows)"
+        )
+
+    def _speech_region(self, end: int) -> tuple:
+        """
+        The part of an utterance worth transcribing: the VAD's speech region plus trim_margin
+        on each side (everything heard, if trimming is disabled or no speech was detected).
+
+        Parameters:
+        - end (int): Absolute position where listening stopped.
+
+        Returns:
+        - tuple: (start, end) absolute positions.
+        """
+        if not self.trim_silence or self.vad.speech_start is None:
+            return self.vad.origin, end
+        margin = int(self.trim_margin * self.SAMPLE_RATE)
+        start = max(self.vad.speech_start - margin, self.vad.origin)
+        if self.vad.in_speech or self.vad.speech_end is None:
+            return start, end  # Cut off at the utterance limit
+        return start, min(self.vad.speech_end + margin, end)
+
+    def _report_trim(self, total: int, kept: int, rtf: float = None):
+        """
+        Log how much silence was trimmed from an utterance before transcription.
+
+        Parameters:
+        - total (int): Samples listened to.
+        - kept (int): Samples transcribed.
+        - rtf (float): The decoder's real-time factor, to estimate the decoding time saved.
+        """
+        trimmed = max(total - kept, 0) / self.SAMPLE_RATE
+        self.trimmed_seconds += trimmed
+        saving = f", ~{trimmed * rtf * 1000:.0f}ms of decoding saved" if rtf else ""
+        print(
+            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Trimmed {trimmed:.1f}s of silence from "
+            f"{total / self.SAMPLE_RATE:.1f}s of audio ({trimmed * self.SAMPLE_RATE / max(total, 1):.0%} less to transcribe{saving}; "
+            f"{self.trimmed_seconds:.0f}s this session)"
+        )
     
         # # STUB: Simulate Vosk transcription
         # test_message = {
@@ -305,59 +534,158 @@ class STTManager:
         # self.utterance_callback(message_json)
         # return True
 
-    def _transcribe_with_server(self):
+    def _record(self, reader, blocks: list, until_speech: bool = False) -> Optional[str]:
         """
-        Transcribe audio by sending it to a server for processing.
+        Read 100 ms blocks of an utterance until the VAD ends it.
+
+        Parameters:
+        - reader (AudioReader): Reader positioned where the utterance starts (after vad.reset()).
+        - blocks (list): Receives the raw blocks read.
+        - until_speech (bool): Also stop as soon as speech has started.
+
+        Returns:
+        - str: The endpoint (see _endpoint()), or None if stopped because speech started.
+        """
+        while not (until_speech and self.vad.speech_start is not None):
+            data, _ = reader.read(1600)  # 100 ms blocks keep the endpoint latency low
+            blocks.append(data)
+            endpoint = self._endpoint(data)
+            if endpoint:
+                return endpoint
+        return None
+
+    def _stream_blocks(self, reader, blocks: list):
+        """
+        Yield the utterance's speech region as it is captured, until the VAD ends the
+        utterance. Used as a chunked request body, so the server receives the audio while the
+        user is still speaking.
+
+        The latest hangover's worth of audio is held back until the VAD has decided whether
+        it is still speech, so trailing silence is trimmed without delaying the endpoint.
+
+        Parameters:
+        - reader (AudioReader): Reader positioned after the recorded blocks (speech has started).
+        - blocks (list): Blocks recorded so far; new blocks are appended to it.
+        """
+        self.stream_bytes = 0
+        sender = self.capture.reader(position=self._speech_region(reader.position)[0])
+        hold = self.vad.hangover_frames * self.vad.frame
+        while True:
+            data, _ = reader.read(1600)
+            blocks.append(data)
+            endpoint = self._endpoint(data)
+            stop = self._speech_region(reader.position)[1] if endpoint else reader.position - hold
+            if stop > sender.position:
+                data, _ = sender.read(stop - sender.position)
+                self.stream_bytes += data.nbytes
+                yield data.tobytes()
+            if endpoint:
+                break
+        self.stream_end = time.perf_counter()
+        self._report_trim(reader.position - self.vad.origin, self.stream_bytes // 2)
+
+    def _encode_audio(self, samples: np.ndarray) -> tuple:
         """
+        Encode an utterance for upload with the configured codec (falling back to WAV).
+
+        Parameters:
+        - samples (np.ndarray): Raw int16 samples.
+
+        Returns:
+        - tuple: (BytesIO with the encoded audio, file name, MIME type).
+        """
+        if self.audio_codec not in AUDIO_CODECS:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Unknown audio codec {self.audio_codec}, using wav.")
+            self.audio_codec = "wav"
+        audio_format, subtype, file_name, mime_type = AUDIO_CODECS[self.audio_codec]
+
+        audio_buffer = BytesIO()
         try:
-            audio_buffer = BytesIO()
-            silent_frames = 0
-            max_silent_frames = 2  # ~1.25 seconds of silence
-            detected_speech = False
+            sf.write(audio_buffer, samples, self.SAMPLE_RATE, format=audio_format, subtype=subtype)
+        except Exception as e:
+            # e.g. a libsndfile built without Opus support
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Cannot encode {self.audio_codec} audio ({e}), using wav.")
+            self.audio_codec = "wav"
+            return self._encode_audio(samples)
+        audio_buffer.seek(0)
+        return audio_buffer, file_name, mime_type
+
+    def _upload_recording(self, blocks: list):
+        """
+        Upload the speech region of a recorded utterance as a compressed file to the server's
+        /save_audio endpoint.
 
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Starting audio recording...")
-            with sd.InputStream(samplerate=self.SAMPLE_RATE, channels=1, dtype="int16") as stream:
-                with wave.open(audio_buffer, "wb") as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(self.SAMPLE_RATE)
-
-                    speech_frames = 0  # Track consecutive speech frames
-                    max_duration_frames = 50  # Limit maximum recording duration (~12.5 seconds)
-                    total_frames = 0
-
-                    while total_frames < max_duration_frames:  # Prevent infinite loops
-                        data, _ = stream.read(4000)
-                        wf.writeframes(data.tobytes())
-
-                        # Calculate RMS (Root Mean Square) energy of the audio data
-                        rms = np.sqrt(np.mean(np.square(data)))
-
-                        if rms > self.silence_threshold:  # Voice detected
-                            if not detected_speech:
-                                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Speech detected.")
-                            detected_speech = True
-                            speech_frames += 1
-                            silent_frames = 0  # Reset silent frames
-                        elif detected_speech:  # Silence detected after speech
-                            silent_frames += 1
-                            if silent_frames > max_silent_frames:
-                                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Silence detected.")
-                                break
-
-                        total_frames += 1
-
-            # Ensure the audio buffer is not empty
-            audio_buffer.seek(0)
-            buffer_size = audio_buffer.getbuffer().nbytes
-            if buffer_size == 0:
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Audio buffer is empty. No audio recorded.")
-                return None
-
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Sent {buffer_size} bytes of audio")
-            files = {"audio": ("audio.wav", audio_buffer, "audio/wav")}
+        Parameters:
+        - blocks (list): Raw blocks of the utterance, from the start of listening.
 
+        Returns:
+        - Response: The server's response.
+        """
+        samples = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+        start, stop = self._speech_region(self.vad.origin + len(samples))
+        self._report_trim(len(samples), stop - start)
+        samples = samples[start - self.vad.origin:stop - self.vad.origin]
+        audio_buffer, file_name, mime_type = self._encode_audio(samples)
+        size = audio_buffer.getbuffer().nbytes
+        files = {"audio": (file_name, audio_buffer, mime_type)}
+
+        start = time.perf_counter()
+        with tracer.span("stt_upload"):
             response = requests.post(f"{self.config['STT']['server_url']}/save_audio", files=files, timeout=10)
+        print(
+            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Sent {size} bytes of {self.audio_codec} audio "
+            f"({len(samples) / self.SAMPLE_RATE:.1f}s, {size / max(samples.nbytes, 1):.0%} of PCM), "
+            f"transcript after {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        return response
+
+    def _transcribe_with_server(self):
+        """
+        Transcribe audio by sending it to a server for processing.
+
+        With stream_audio enabled, the upload starts as soon as the user starts speaking and the
+        server transcribes while the rest arrives; otherwise the utterance is recorded first and
+        uploaded as a compressed file.
+        """
+        try:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Starting audio recording...")
+            reader = self._listen_reader()
+            self.vad.reset(reader.position)
+            blocks = []
+            endpoint = self._record(reader, blocks, until_speech=self.stream_audio)
+            if self.vad.speech_start is None:
+                return None  # Nobody spoke
+
+            response = None
+            if endpoint is None:
+                # Speech started: stream it while the user is still talking
+                self.stream_end = None
+                try:
+                    response = requests.post(
+                        f"{self.config['STT']['server_url']}/stream_audio",
+                        data=self._stream_blocks(reader, blocks),
+                        headers={"Content-Type": "application/octet-stream", "X-Sample-Rate": str(self.SAMPLE_RATE)},
+                        timeout=10,
+                    )
+                except requests.exceptions.RequestException as e:
+                    # The audio is still in blocks, so a failed stream never loses the utterance
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Streaming to the STT server failed ({e}), uploading the recording instead.")
+                if response is not None and response.status_code == 404:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: STT server does not support streaming, uploading recordings instead.")
+                    self.stream_audio = False
+                    response = None
+                elif response is not None and response.status_code != 200:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARN: Streaming to the STT server failed (HTTP {response.status_code}), uploading the recording instead.")
+                    response = None
+                if response is None and self.stream_end is None:
+                    self._record(reader, blocks)  # Finish recording the utterance
+                elif response is not None and self.stream_end:
+                    # Time from the end of the utterance to the transcript
+                    waited = time.perf_counter() - self.stream_end
+                    tracer.record("stt_upload", waited)
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Streamed {self.stream_bytes} bytes of audio, transcript {waited * 1000:.0f}ms after the end of speech")
+            if response is None:
+                response = self._upload_recording(blocks)
 
             # Handle server response
             if response.status_code == 200:
@@ -365,7 +693,7 @@ class STTManager:
                     # Parse the JSON response
                     transcription = response.json().get("transcription", [])
                     if isinstance(transcription, list) and transcription:
-                        raw_text = transcription[0].get("text", "").strip()
+                        raw_text = " ".join(seg.get("text", "").strip() for seg in transcription).strip()
 
                         # Format as Vosk-style JSON
                         formatted_result = {
@@ -383,11 +711,8 @@ class STTManager:
 
                         #print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] USER: {formatted_result['text']}")
 
-                        # If a callback is set, send the formatted JSON
-                        if self.utterance_callback:
-                            self.utterance_callback(json.dumps(formatted_result))  # Send as a JSON string
-
-                        return formatted_result
+                        tracer.stop("stt")
+                        return json.dumps(formatted_result)  # Vosk-style JSON string
                     else:
                         #print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Unexpected transcription format or empty transcription.")
                         return None
@@ -0,0 +1,283 @@
+"""
+module_tools.py
+
+Tool Execution Module for TARS-AI Application.
+
+Tools (web search, news, camera) are registered once with a timeout and a cost class and
+always run on an executor, so a stuck web page or camera can no longer hold up the prompt:
+- Each cost class has its own executor ("local" for in-process work, "network" for remote
+  requests, "device" for hardware that can only serve one request at a time).
+- A tool that misses its deadline is reported to the LLM as unavailable and the turn goes on.
+- The late result is kept for a while, and a repeat of the same request (e.g. on the next
+  turn) uses it, or waits on the call still in flight, instead of starting a new one.
+  Tools whose result goes stale quickly (a camera view) are registered with a shorter TTL.
+- Tools can be started speculatively, before the user has finished speaking (speculate()).
+  A request that matches the speculative call reuses it; the others are cancelled or
+  discarded by settle_speculation().
+- Latency, timeout, error, cache-hit and speculation counts are kept per tool (ToolRegistry.stats()).
+
+Usage:
+    from module_tools import tool_registry
+    tool_registry.register("Search", search_google, "Use this answer: {result}", timeout=8.0, cost="network")
+    results = tool_registry.run(["Search"], user_input)
+"""
+
+# === Standard Libraries ===
+import re
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List
+
+# === Custom Modules ===
+from module_config import load_config
+
+# === Constants ===
+COST_CLASSES = {"local": 2, "network": 4, "device": 1}  # Cost class -> worker threads
+LATENCY_SAMPLES = 100  # Recent latencies kept per tool for the stats
+
+class ToolRegistry:
+    """
+    Runs registered tools with deadlines, keeping late results for the next request.
+    """
+    def __init__(self, late_result_ttl: float = 120.0):
+        """
+        Initialize the ToolRegistry.
+
+        Parameters:
+        - late_result_ttl (float): Seconds a result that missed its deadline stays usable.
+        """
+        self.late_result_ttl = late_result_ttl
+        self.tools = {}
+        self.executors = {
+            cost: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"Tool-{cost}")
+            for cost, workers in COST_CLASSES.items()
+        }
+        self.lock = threading.Lock()
+        self.pending = {}       # Request key -> future of a running call
+        self.keep = set()       # Request keys whose result is kept when the call finishes (missed deadlines)
+        self.late_results = {}  # Request key -> (finished time, result)
+        self.speculative = {}   # Request key -> tool name of calls started before the utterance was final
+        self.counters = {}
+
+    def register(self, name: str, function: Callable, template: str, timeout: float = 10.0,
+                 cost: str = "network", uses_input: bool = True, result_ttl: float = None):
+        """
+        Register a tool.
+
+        Parameters:
+        - name (str): Tool name (the intent class that selects it).
+        - function (Callable): Called with the user's message (or without arguments if uses_input is False).
+        - template (str): Prompt text for the result, with a {result} placeholder.
+        - timeout (float): Seconds the turn waits for the tool.
+        - cost (str): Cost class, one of COST_CLASSES.
+        - uses_input (bool): Whether the result depends on the user's message.
+        - result_ttl (float): Seconds a late result stays usable (defaults to the registry's late_result_ttl).
+        """
+        if cost not in COST_CLASSES:
+            raise ValueError(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Unknown cost class {cost} for tool {name}")
+        if result_ttl is None:
+            result_ttl = self.late_result_ttl
+        self.tools[name] = {
+            "function": function, "template": template, "timeout": timeout, "cost": cost,
+            "uses_input": uses_input, "result_ttl": result_ttl,
+        }
+        self.counters[name] = {
+            "calls": 0, "timeouts": 0, "errors": 0, "cache_hits": 0,
+            "speculative": 0, "speculation_hits": 0, "speculation_wasted": 0,
+            "latencies": deque(maxlen=LATENCY_SAMPLES),
+        }
+
+    def _key(self, name: str, user_input: str) -> tuple:
+        """
+        Identify a request, so that a repeat of it can reuse an earlier call.
+        """
+        if not self.tools[name]['uses_input']:
+            return (name, "")
+        return (name, re.sub(r'[^a-z0-9]+', ' ', user_input.lower()).strip())
+
+    def _call(self, name: str, user_input: str):
+        """
+        Run a tool and record its latency (on the tool's executor).
+        """
+        tool = self.tools[name]
+        start = time.perf_counter()
+        try:
+            return tool['function'](user_input) if tool['uses_input'] else tool['function']()
+        finally:
+            with self.lock:
+                self.counters[name]['latencies'].append(time.perf_counter() - start)
+
+    def _prune_late_results(self):
+        """
+        Drop the late results that outlived their tool's TTL (called with the lock held).
+        """
+        now = time.time()
+        for key, (finished, _) in list(self.late_results.items()):
+            if now - finished > self.tools[key[0]]['result_ttl']:
+                del self.late_results[key]
+
+    def _finished(self, key: tuple, future):
+        """
+        Keep the result of a call that outlived its deadline.
+        """
+        with self.lock:
+            self._prune_late_results()
+            if self.pending.get(key) is not future:
+                return
+            del self.pending[key]
+            if key in self.keep:
+                self.keep.discard(key)
+                if not future.cancelled() and future.exception() is None:
+                    self.late_results[key] = (time.time(), future.result())
+
+    def start(self, name: str, user_input: str):
+        """
+        Start a tool call, or return the call already running or finished for the same request.
+
+        Parameters:
+        - name (str): Tool name.
+        - user_input (str): The user's message.
+
+        Returns:
+        - Future: The tool's result.
+        """
+        key = self._key(name, user_input)
+        with self.lock:
+            if self.speculative.pop(key, None):
+                self.counters[name]['speculation_hits'] += 1
+
+            self._prune_late_results()
+            cached = self.late_results.pop(key, None)
+            if cached:
+                self.counters[name]['cache_hits'] += 1
+                future = Future()
+                future.set_result(cached[1])
+                return future
+
+            future = self.pending.get(key)
+            if future is not None:
+                self.keep.discard(key)  # Someone is waiting for it again
+                self.counters[name]['cache_hits'] += 1
+                return future
+
+            self.counters[name]['calls'] += 1
+            future = self.executors[self.tools[name]['cost']].submit(self._call, name, user_input)
+            self.pending[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return future
+
+    def speculate(self, name: str, user_input: str):
+        """
+        Start a tool for a request that is not final yet, keeping its result for the final request.
+
+        Parameters:
+        - name (str): Tool name.
+        - user_input (str): The (partial) user's message.
+        """
+        key = self._key(name, user_input)
+        with self.lock:
+            self._prune_late_results()
+            if key in self.speculative or key in self.pending or key in self.late_results:
+                return
+            self.speculative[key] = name
+            self.keep.add(key)
+            self.counters[name]['speculative'] += 1
+            self.counters[name]['calls'] += 1
+            future = self.executors[self.tools[name]['cost']].submit(self._call, name, user_input)
+            self.pending[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Prefetching tool {name} for \"{user_input}\"")
+
+    def settle_speculation(self):
+        """
+        Cancel or discard the speculative calls the final request did not use.
+        """
+        with self.lock:
+            for key, name in self.speculative.items():
+                self.keep.discard(key)
+                self.late_results.pop(key, None)
+                future = self.pending.pop(key, None)
+                if future is not None:
+                    future.cancel()  # Only stops calls that have not started; a running call is ignored
+                self.counters[name]['speculation_wasted'] += 1
+            self.speculative.clear()
+
+    def run(self, names: List[str], user_input: str) -> List[str]:
+        """
+        Run tools concurrently and wait for each until its deadline.
+
+        Parameters:
+        - names (List[str]): Registered tool names.
+        - user_input (str): The user's message.
+
+        Returns:
+        - List[str]: The prompt text of each tool, in order; a note for tools that timed out or failed.
+        """
+        start = time.monotonic()
+        futures = [(name, self.start(name, user_input)) for name in names]
+
+        results = []
+        for name, future in futures:
+            tool = self.tools[name]
+            remaining = max(tool['timeout'] - (time.monotonic() - start), 0.0)
+            try:
+                result = future.result(timeout=remaining)
+            except concurrent.futures.TimeoutError:
+                with self.lock:
+                    key = self._key(name, user_input)
+                    if self.pending.get(key) is future:
+                        self.keep.add(key)
+                    self.counters[name]['timeouts'] += 1
+                    timeouts = self.counters[name]['timeouts']
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Tool {name} missed its {tool['timeout']}s deadline ({timeouts} timeouts so far)")
+                results.append(f"*Tool {name} is unavailable right now, tell the user it is taking too long*")
+                continue
+            except Exception as e:
+                with self.lock:
+                    self.counters[name]['errors'] += 1
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Tool {name} failed: {e}")
+                results.append(f"*Tool {name} is unavailable right now, tell the user it failed*")
+                continue
+
+            results.append(tool['template'].format(result=result))
+        return results
+
+    def stats(self) -> dict:
+        """
+        Latency and outcome counts per tool.
+
+        Returns:
+        - dict: Tool name -> calls, timeouts, errors, cache_hits, speculation counts and p50/p90/max latency in ms.
+        """
+        report = {}
+        with self.lock:
+            for name, counters in self.counters.items():
+                latencies = sorted(counters['latencies'])
+                report[name] = {
+                    "calls": counters['calls'],
+                    "timeouts": counters['timeouts'],
+                    "errors": counters['errors'],
+                    "cache_hits": counters['cache_hits'],
+                    "speculative": counters['speculative'],
+                    "speculation_hits": counters['speculation_hits'],
+                    "speculation_wasted": counters['speculation_wasted'],
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "p90_ms": round(latencies[int(len(latencies) * 0.9)] * 1000, 1) if latencies else None,
+                    "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+                }
+        return report
+
+    def shutdown(self):
+        """
+        Stop the executors without waiting for running tools.
+        """
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# === Globals ===
+CONFIG = load_config()
+tool_registry = ToolRegistry(CONFIG['TOOLS']['late_result_ttl'])
@@ -0,0 +1,266 @@
+"""
+module_tracing.py
+
+Latency Tracing Module for TARS-AI Application.
+
+Records how long each stage of a conversational turn takes
+(wake -> STT -> intent -> tool -> memory -> LLM -> TTS) plus the time from the end of the
+user's speech to the first audio played back. Each turn is written as one JSON line to a
+rotating log file.
+
+Usage:
+    from module_tracing import tracer
+    with tracer.span("memory"):
+        ...
+
+Run this module directly to print latency percentiles from the trace log:
+    python module_tracing.py [path/to/turns.jsonl]
+"""
+
+# === Standard Libraries ===
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from datetime import datetime
+
+# === Custom Modules ===
+from module_config import load_config
+
+# === Constants and Globals ===
+CONFIG = load_config()
+
+class Tracer:
+    """
+    Collects stage durations for the turn in progress.
+
+    TARS handles one conversation at a time, so there is a single current turn shared by
+    all threads (STT thread, completion executor, memory and TTS threads).
+    """
+    def __init__(self, config):
+        """
+        Initialize the Tracer.
+
+        Parameters:
+        - config (dict): Configuration dictionary.
+        """
+        self.config = config
+        self.enabled = config['TRACING']['enabled']
+        self.path = config['TRACING']['path']
+        self.lock = threading.Lock()
+        self.turn = None
+        self.logger = None
+
+        if self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            handler = RotatingFileHandler(
+                self.path, maxBytes=config['TRACING']['max_bytes'], backupCount=config['TRACING']['backups']
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger = logging.getLogger("tars.trace")
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            self.logger.addHandler(handler)
+
+    def begin_turn(self):
+        """
+        Start a new turn, discarding any unfinished one.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.turn = {
+                "id": uuid.uuid4().hex[:8],
+                "timestamp": datetime.now().isoformat(timespec='milliseconds'),
+                "start": time.perf_counter(),
+                "stages": {},
+                "open": {},
+                "marks": {},
+            }
+
+    def _add(self, turn, name: str, seconds: float):
+        """
+        Add a duration to a stage of a turn. Repeated stages are summed.
+        """
+        with self.lock:
+            turn['stages'][name] = turn['stages'].get(name, 0.0) + seconds
+            turn['marks'][f"{name}_end"] = time.perf_counter()
+
+    def record(self, name: str, seconds: float):
+        """
+        Add a stage measured outside of span()/start() to the current turn.
+
+        Parameters:
+        - name (str): Stage name.
+        - seconds (float): Duration.
+        """
+        turn = self.turn
+        if turn is not None:
+            self._add(turn, name, seconds)
+
+    def start(self, name: str):
+        """
+        Start a stage that is stopped elsewhere with stop().
+
+        Parameters:
+        - name (str): Stage name.
+        """
+        turn = self.turn
+        if turn is not None:
+            turn['open'][name] = time.perf_counter()
+
+    def stop(self, name: str):
+        """
+        Stop a stage started with start().
+
+        Parameters:
+        - name (str): Stage name.
+        """
+        turn = self.turn
+        if turn is not None and name in turn['open']:
+            self._add(turn, name, time.perf_counter() - turn['open'].pop(name))
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Time the enclosed block as a stage of the current turn.
+
+        Parameters:
+        - name (str): Stage name.
+        """
+        turn = self.turn
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if turn is not None:
+                self._add(turn, name, time.perf_counter() - start)
+
+    def mark(self, name: str):
+        """
+        Record the first time an event happens during the current turn (e.g. "first_audio").
+
+        Parameters:
+        - name (str): Event name.
+        """
+        turn = self.turn
+        if turn is not None:
+            with self.lock:
+                turn['marks'].setdefault(name, time.perf_counter())
+
+    def end_turn(self) -> dict:
+        """
+        Finish the current turn and write its record.
+
+        Turns without a recognized utterance (the STT stage never stopped) are discarded.
+
+        Returns:
+        - dict: The turn record, or None.
+        """
+        with self.lock:
+            turn, self.turn = self.turn, None
+        if turn is None or 'stt_end' not in turn['marks']:
+            return None
+
+        marks = turn['marks']
+        record = {
+            "turn": turn['id'],
+            "timestamp": turn['timestamp'],
+            "total_ms": round((time.perf_counter() - turn['start']) * 1000, 1),
+            "time_to_first_audio_ms": (
+                round((marks['first_audio'] - marks['stt_end']) * 1000, 1) if 'first_audio' in marks else None
+            ),
+            "stages": {name: round(seconds * 1000, 1) for name, seconds in turn['stages'].items()},
+        }
+        self.logger.info(json.dumps(record))
+
+        stages = ", ".join(f"{name} {ms:.0f}ms" for name, ms in record['stages'].items())
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Turn {record['turn']}: {stages}; first audio after {record['time_to_first_audio_ms']}ms")
+        return record
+
+def load_records(path: str) -> list:
+    """
+    Load turn records from a trace log and its rotated backups.
+
+    Parameters:
+    - path (str): Path to the trace log.
+
+    Returns:
+    - list: Turn records, oldest first.
+    """
+    records = []
+    files = [f"{path}.{i}" for i in range(CONFIG['TRACING']['backups'], 0, -1)] + [path]
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    return records
+
+def percentile(values: list, q: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Parameters:
+    - values (list): Sorted values.
+    - q (float): Percentile between 0 and 100.
+
+    Returns:
+    - float: The percentile value.
+    """
+    index = max(math.ceil(q / 100 * len(values)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+def summarize(records: list) -> dict:
+    """
+    Compute p50/p90/p99 per stage, for time-to-first-audio and for the whole turn.
+
+    Parameters:
+    - records (list): Turn records.
+
+    Returns:
+    - dict: {name: {"count", "p50", "p90", "p99"}} in milliseconds.
+    """
+    series = {}
+    for record in records:
+        for name, ms in record['stages'].items():
+            series.setdefault(name, []).append(ms)
+        if record.get('time_to_first_audio_ms') is not None:
+            series.setdefault("time_to_first_audio", []).append(record['time_to_first_audio_ms'])
+        series.setdefault("total", []).append(record['total_ms'])
+
+    summary = {}
+    for name, values in series.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+        }
+    return summary
+
+# === Globals ===
+tracer = Tracer(CONFIG)
+
+# === Main ===
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else CONFIG['TRACING']['path']
+    records = load_records(path)
+    if not records:
+        print(f"No turn records found in {path}")
+        sys.exit(1)
+
+    print(f"{len(records)} turns from {path}\n")
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, stats in summarize(records).items():
+        print(f"{name:<22}{stats['count']:>7}{stats['p50']:>10.1f}{stats['p90']:>10.1f}{stats['p99']:>10.1f}")
@@ -20,6 +20,7 @@ import sounddevice as sd
 import soundfile as sf
 from io import BytesIO
 from module_piper import *
+from module_tracing import tracer
 
 def update_tts_settings(ttsurl):
     """
@@ -83,6 +84,7 @@ def play_audio_stream(tts_stream, samplerate=22050, channels=1, gain=1.0, normal
                     audio_data = np.clip(audio_data * gain, -32768, 32767).astype('int16')
 
                     # Write the adjusted audio data to the stream
+                    tracer.mark("first_audio")
                     stream.write(audio_data)
                 else:
                     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Received empty chunk.")
@@ -119,6 +121,7 @@ def azure_tts(text, azure_api_key, azure_region, tts_voice):
         """
 
         # Perform speech synthesis
+        synthesizer.synthesis_started.connect(lambda evt: tracer.mark("first_audio"))
         result = synthesizer.speak_ssml_async(ssml).get()
 
         # Check for errors
@@ -171,6 +174,7 @@ def alltalk_tts(text, ttsurl, tts_voice):
         # Read and play the audio using sounddevice
         #print("Playing audio...")
         data, samplerate = sf.read(wav_data, dtype='float32')
+        tracer.mark("first_audio")
         sd.play(data, samplerate)
         sd.wait()  # Wait for playback to finish
 
@@ -191,6 +195,7 @@ def local_tts(text):
             f'espeak-ng -s 140 -p 50 -v en-us+m3 "{text}" --stdout | '
             f'sox -t wav - -c 1 -t wav - gain 0.0 reverb 30 highpass 500 lowpass 3000 | aplay'
         )
+        tracer.mark("first_audio")
         os.system(command)
     except Exception as e:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Local TTS generation failed: {e}")
@@ -6,9 +6,13 @@ Vision Processing Module for TARS-AI Application.
 This module handles image capture and caption generation, supporting both server-hosted 
 and on-device processing modes. It utilizes the BLIP model for on-device inference and 
 communicates with a server endpoint for remote processing.
+
+Images for the server are captured at the caption model's input resolution (the camera's
+ISP does the scaling) and re-encoded as JPEG if larger, so uploads stay small over Wi-Fi.
 """
 # === Standard Libraries ===
 import subprocess
+import time
 import traceback
 from PIL import Image
 from transformers import BlipProcessor, BlipForConditionalGeneration
@@ -31,6 +35,8 @@ device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 processor = None
 model = None
 
+UPLOAD_ASPECT = 4 / 3  # Camera aspect ratio, kept when scaling images for upload
+
 # === Helper Functions ===
 
 def initialize_blip_model():
@@ -58,16 +64,21 @@ def capture_image() -> BytesIO:
     """
     try:
         # Adjust resolution based on whether the server is hosted or on-device
-        width = "2592" if CONFIG['VISION']['server_hosted'] == 'True' else "320"
-        height = "1944" if CONFIG['VISION']['server_hosted'] == 'True' else "240"
-        
+        if CONFIG['VISION']['server_hosted']:
+            # Capture at the caption model's input size instead of full sensor resolution
+            height = CONFIG['VISION']['upload_size']
+            width = round(height * UPLOAD_ASPECT)
+        else:
+            width, height = 320, 240
+
         # Capture the image directly to stdout
         command = [
             "libcamera-still",
             "--output", "-",  # Output to stdout
             "--timeout", "300",  # 0.3-second timeout for capture
-            "--width", width,
-            "--height", height
+            "--width", str(width),
+            "--height", str(height),
+            "--quality", str(CONFIG['VISION']['upload_quality']),
         ]
         process = subprocess.run(command, stdout=subprocess.PIPE, check=True)
         #print(height)
@@ -78,6 +89,31 @@ def capture_image() -> BytesIO:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Image capture failed:", traceback.format_exc())
         raise e
 
+def prepare_image_for_upload(image_bytes: BytesIO) -> BytesIO:
+    """
+    Downscale an image to the caption model's input size and re-encode it as JPEG, unless it
+    is already that small.
+
+    Parameters:
+    - image_bytes (BytesIO): The image in memory.
+
+    Returns:
+    - BytesIO: The image to upload.
+    """
+    size = CONFIG['VISION']['upload_size']
+    image = Image.open(image_bytes)
+    if min(image.size) <= size and image.format == 'JPEG':
+        image_bytes.seek(0)
+        return image_bytes
+
+    scale = size / min(image.size)
+    if scale < 1:
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.BILINEAR)
+    resized = BytesIO()
+    image.convert('RGB').save(resized, format='JPEG', quality=CONFIG['VISION']['upload_quality'])
+    resized.seek(0)
+    return resized
+
 def send_image_to_server(image_bytes: BytesIO) -> str:
     """
     Send an image to the server for captioning and return the generated caption.
@@ -89,8 +125,12 @@ def send_image_to_server(image_bytes: BytesIO) -> str:
     - str: Generated caption from the server.
     """
     try:
+        image_bytes = prepare_image_for_upload(image_bytes)
+        size = image_bytes.getbuffer().nbytes
         files = {'image': ('image.jpg', image_bytes, 'image/jpeg')}
+        start = time.perf_counter()
         response = requests.post(f"{CONFIG['VISION']['base_url']}/caption", files=files)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] STAT: Sent {size} bytes of image, caption after {(time.perf_counter() - start) * 1000:.0f}ms")
 
         if response.status_code == 200:
             return response.json().get("caption", "No caption returned")
@@ -138,7 +178,7 @@ def describe_camera_view() -> str:
         # Capture the image
         image_bytes = capture_image()
 
-        if CONFIG['VISION']['server_hosted'] == 'True':
+        if CONFIG['VISION']['server_hosted']:
             # Use server-hosted vision processing
             return send_image_to_server(image_bytes)
         else: